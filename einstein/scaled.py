@@ -0,0 +1,169 @@
+"""
+Einstein-style puzzles of any size: `size` houses, and `size` values in each of
+the 5 categories (color, nation, drink, cigar, pet). Each value is in exactly
+one house, and each house has exactly one value of each category. The clues
+are drawn at random from a hidden solution, until it is the only one.
+
+The "exactly one" constraints are encoded with each of the encodings of
+`pkg.pysat.cardinality`, or with the native at-most-one constraints of the
+solver, to compare their sizes, parse times and solve times:
+
+    python3 -m einstein.scaled --sizes 5,10,15,20
+"""
+import argparse
+import functools
+import os
+import random
+import tempfile
+import time
+from pkg.pysat import branch_heuristics as solvers
+from pkg.pysat import cardinality
+from pkg.pysat import restarts
+from pkg.pysat import solver
+from pkg.pysat.dimacs import read_dimacs
+
+CATEGORIES = 5
+ENCODINGS = cardinality.ENCODINGS + ['native']
+
+
+def variable(size, house, category, value):
+    """ The variable of "house has value of category", houses from 1, values from 0 """
+    return house + size * (category * size + value)
+
+
+def groups(size):
+    """ The lists of variables of which exactly one is TRUE """
+    for category in range(CATEGORIES):
+        for value in range(size):
+            yield [variable(size, house, category, value) for house in range(1, size + 1)]
+        for house in range(1, size + 1):
+            yield [variable(size, house, category, value) for value in range(size)]
+
+
+def clue(rng, size, solution):
+    """
+    Draws a clue from a solution, like the ones of the original puzzle: 2
+    values are in the same house, in neighbor houses, or in a house and the one
+    on its right, or (less often) a value is in a given house.
+        :param solution: category, house - 1 -> value
+        :returns: list of clauses
+    """
+    def x(house, category, value):
+        return variable(size, house, category, value)
+
+    kind = rng.choices(['same', 'neighbor', 'left', 'house'], [5, 3, 2, 1])[0]
+    c1, c2 = rng.sample(range(CATEGORIES), 2)
+    h1 = rng.randrange(size) + 1
+    v1 = solution[c1][h1 - 1]
+    if kind == 'house':
+        return [[x(h1, c1, v1)]]
+    clauses = []
+    if kind == 'same':
+        v2 = solution[c2][h1 - 1]
+        for house in range(1, size + 1):
+            clauses.append([-x(house, c1, v1), x(house, c2, v2)])
+            clauses.append([x(house, c1, v1), -x(house, c2, v2)])
+    elif kind == 'neighbor':
+        h2 = h1 + 1 if h1 == 1 or (h1 < size and rng.random() < 0.5) else h1 - 1
+        v2 = solution[c2][h2 - 1]
+        for house in range(1, size + 1):
+            clauses.append([-x(house, c1, v1)] +
+                           [x(h, c2, v2) for h in (house - 1, house + 1) if 1 <= h <= size])
+    elif h1 < size:
+        v2 = solution[c2][h1]  # the value in the house on the right
+        for house in range(1, size + 1):
+            clauses.append([-x(house, c1, v1)] + ([x(house + 1, c2, v2)] if house < size else []))
+    return clauses
+
+
+@functools.lru_cache()
+def clues(size, seed=0):
+    """
+    Draws clues from a random solution until it is the only one, like the
+    original puzzle. Each clue is added to the same incremental solver, which
+    looks for another solution under an assumption.
+        :returns: tuple of clauses
+    """
+    rng = random.Random(seed)
+    solution = [rng.sample(range(size), size) for _ in range(CATEGORIES)]
+    s = solvers.VariableStateIndependentDecayingSumSolver.from_clauses(
+        [group for group in groups(size)], restart=restarts.GlucoseRestart())
+    for group in groups(size):
+        s.add_at_most_one(group)
+    other = variable(size, size, CATEGORIES - 1, size - 1) + 1
+    s.add_clause([-other] + [-variable(size, house, category, solution[category][house - 1])
+                             for category in range(CATEGORIES) for house in range(1, size + 1)])
+    clauses = []
+    while s.solve([other]):
+        for clause in clue(rng, size, solution):
+            clauses.append(clause)
+            s.add_clause(clause)
+    return tuple(clauses)
+
+
+def puzzle(size, encoding, seed=0):
+    """
+    Encodes a puzzle.
+        :param size: number of houses
+        :param encoding: one of `ENCODINGS`
+        :returns: (clauses, at-most-one constraints, empty unless native)
+    """
+    pool = cardinality.VarPool(variable(size, size, CATEGORIES - 1, size - 1))
+    formula = list(clues(size, seed))
+    at_most_ones = []
+    for group in groups(size):
+        if encoding == 'native':
+            formula.append(group)
+            at_most_ones.append(group)
+        else:
+            formula.extend(cardinality.exactly_one(group, pool, encoding))
+    return formula, at_most_ones
+
+
+def write_cnf(filename, clauses):
+    variables = set(abs(lit) for clause in clauses for lit in clause)
+    with open(filename, 'w') as f:
+        f.write('p cnf {} {}\n'.format(len(variables), len(clauses)))
+        for clause in clauses:
+            f.write(' '.join(map(str, clause)) + ' 0\n')
+
+
+def measure(size, encoding, seed=0):
+    """
+    Writes a puzzle to a DIMACS file, then parses and solves it.
+        :returns: dict of the sizes and times
+    """
+    clauses, at_most_ones = puzzle(size, encoding, seed=seed)
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'puzzle.cnf')
+        write_cnf(filename, clauses)
+        start = time.perf_counter()
+        cnf, variables = read_dimacs(filename)
+        parsed = time.perf_counter()
+        s = solvers.VariableStateIndependentDecayingSumSolver(
+            clauses=cnf, restart=restarts.GlucoseRestart())
+    for group in at_most_ones:
+        s.add_at_most_one(group)
+    built = time.perf_counter()
+    sat = s.solve()
+    assert sat and all(sum(s.assigns[var] == 1 for var in group) == 1 for group in groups(size))
+    return {'size': size, 'encoding': encoding, 'variables': len(variables),
+            'clauses': len(clauses), 'literals': sum(map(len, clauses)),
+            'parse': parsed - start, 'build': built - parsed, 'solve': time.perf_counter() - built,
+            'conflicts': s.conflict_count}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compares the encodings of scaled Einstein puzzles.')
+    parser.add_argument('--sizes', default='5,10,15,20', help='comma separated numbers of houses')
+    parser.add_argument('--encodings', default=','.join(ENCODINGS), help='comma separated encodings')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the clues')
+    args = parser.parse_args()
+    solver.logger.setLevel('WARNING')
+    print('| houses | encoding | variables | clauses | literals | parse (s) | build (s) | solve (s) | conflicts |')
+    print('| -----: | -------- | --------: | ------: | -------: | --------: | --------: | --------: | --------: |')
+    for size in map(int, args.sizes.split(',')):
+        for encoding in args.encodings.split(','):
+            result = measure(size, encoding, args.seed)
+            print('| {size} | {encoding} | {variables} | {clauses} | {literals} | {parse:.3f} | {build:.3f}'
+                  ' | {solve:.3f} | {conflicts} |'.format(**result), flush=True)
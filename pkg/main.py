@@ -3,9 +3,27 @@ SAT solver using CDCL
 """
 
 import argparse
+import json
 import os
+import signal
+import time
 from pkg.pysat import solver
 from pkg.pysat import branch_heuristics as solvers
+from pkg.pysat import restarts
+from pkg.pysat import preprocess
+from pkg.pysat import portfolio
+from pkg.pysat.cache import ResultCache
+from pkg.pysat.checkpoint import Checkpoint
+from pkg.pysat import sharing
+from pkg.pysat import cubes
+from pkg.pysat import service
+from pkg.pysat.budget import Budget
+from pkg.pysat.models import BLOCKING, ModelEnumerator
+from pkg.utils import profiling
+try:
+    from pkg.pysat import evaluate, local_search
+except ImportError:  # NumPy is only needed by local search and --verify
+    evaluate = local_search = None
 
 
 if __name__ == '__main__':
@@ -27,7 +45,215 @@ if __name__ == '__main__':
              ': OrderedChoiceSolver '
              '| RandomChoiceSolver '
              '| FrequentVarsFirstSolver (default) '
-             '| DynamicLargestIndividualSumSolver')
+             '| DynamicLargestIndividualSumSolver '
+             '| VariableStateIndependentDecayingSumSolver')
+    parser.add_argument(
+        '--restart',
+        default='none',
+        choices=sorted(restarts.STRATEGIES),
+        help='restart strategy (default: none)')
+    parser.add_argument(
+        '--no-phase-saving',
+        action='store_true',
+        help='pick the value of branching variables without reusing their last value')
+    parser.add_argument(
+        '--detect-xors',
+        action='store_true',
+        help='look for the XOR constraints encoded in the clauses, and propagate them'
+             ' by Gaussian elimination')
+    parser.add_argument(
+        '--simplify',
+        default='',
+        help='comma separated simplification stages to run before search'
+             ' (' + ','.join(preprocess.STAGES) + '), or all')
+    parser.add_argument(
+        '--binary-cache',
+        action='store_true',
+        help='load the formula from a binary .cnfb file next to the DIMACS file,'
+             ' written on the first run')
+    parser.add_argument(
+        '--portfolio',
+        type=int,
+        nargs='?',
+        const=os.cpu_count(),
+        metavar='N',
+        help='race N configurations (heuristics, random seed and restart strategy)'
+             ' in parallel processes, and output the first answer'
+             ' (default N: the number of CPUs)')
+    parser.add_argument(
+        '--share',
+        action='store_true',
+        help='with --portfolio, the configurations share their short learnt clauses'
+             ' through shared memory')
+    parser.add_argument(
+        '--share-size',
+        type=int,
+        default=sharing.MAX_SIZE,
+        metavar='N',
+        help='with --share, the longest learnt clause shared (default: {})'.format(sharing.MAX_SIZE))
+    parser.add_argument(
+        '--share-lbd',
+        type=int,
+        default=sharing.MAX_LBD,
+        metavar='N',
+        help='with --share, the largest LBD of a learnt clause shared (default: {})'.format(
+            sharing.MAX_LBD))
+    parser.add_argument(
+        '--cubes',
+        type=int,
+        metavar='N',
+        help='split the formula into N cubes by lookahead, and solve them in'
+             ' parallel processes (cube and conquer)')
+    parser.add_argument(
+        '--cube-time-limit',
+        type=float,
+        default=10,
+        metavar='SECONDS',
+        help='with --cubes, a cube still running after SECONDS is split again,'
+             ' and its parts get twice the time (default: 10)')
+    parser.add_argument(
+        '--write-jobs',
+        metavar='DIR',
+        help='with --cubes, write the jobs of the cubes as JSON files to DIR'
+             ' instead of solving them, each can then be run with --job')
+    parser.add_argument(
+        '--job',
+        action='store_true',
+        help='the file is a job written by --write-jobs: solve it, and print'
+             ' the result as JSON')
+    parser.add_argument(
+        '--local-search',
+        nargs='?',
+        const='probsat',
+        choices=['probsat', 'walksat'],
+        help='solve by stochastic local search instead of CDCL (default: probsat),'
+             ' which never answers UNSAT; needs NumPy')
+    parser.add_argument(
+        '--walks',
+        type=int,
+        default=32,
+        metavar='N',
+        help='with --local-search or --hybrid, the number of random walks run together'
+             ' (default: 32)')
+    parser.add_argument(
+        '--max-flips',
+        type=int,
+        metavar='N',
+        help='with --local-search, stop after N flips in each walk, and answer UNKNOWN')
+    parser.add_argument(
+        '--hybrid',
+        type=int,
+        nargs='?',
+        const=1000,
+        metavar='FLIPS',
+        help='run local search first, and when its best assignment has not improved'
+             ' for FLIPS flips (default: 1000), solve by CDCL from the phases of'
+             ' that assignment')
+    parser.add_argument(
+        '--verify',
+        metavar='ANSWERS',
+        help='check the models on the v lines of ANSWERS (one model per line, as'
+             ' printed by --all) against the formula, all at once; needs NumPy')
+    parser.add_argument(
+        '--all',
+        action='store_true',
+        help='enumerate all the models, printed one per v line as they are found')
+    parser.add_argument(
+        '--max-models',
+        type=int,
+        metavar='N',
+        help='enumerate up to N models (implies --all)')
+    parser.add_argument(
+        '--project',
+        metavar='VARS',
+        help='with --all, tell models apart by these variables only: comma'
+             ' separated variables and ranges, e.g. 1-25,30')
+    parser.add_argument(
+        '--blocking',
+        default='decisions',
+        choices=BLOCKING,
+        help='with --all, how a found model is excluded: by flipping its'
+             ' decisions (default), or by a clause negating the whole model')
+    parser.add_argument(
+        '--max-conflicts',
+        type=int,
+        metavar='N',
+        help='stop after N conflicts, and answer UNKNOWN')
+    parser.add_argument(
+        '--max-propagations',
+        type=int,
+        metavar='N',
+        help='stop after N propagations, and answer UNKNOWN')
+    parser.add_argument(
+        '--time-limit',
+        type=float,
+        metavar='SECONDS',
+        help='stop after SECONDS of search, and answer UNKNOWN')
+    parser.add_argument(
+        '--max-learnt-memory',
+        type=float,
+        metavar='MB',
+        help='stop when the learnt clauses take more than MB megabytes, and answer UNKNOWN')
+    parser.add_argument(
+        '--checkpoint',
+        metavar='FILE',
+        help='save the learnt clauses, the heuristics state and the statistics to FILE'
+             ' periodically during search, and when it stops with UNKNOWN')
+    parser.add_argument(
+        '--checkpoint-interval',
+        type=float,
+        default=60,
+        metavar='SECONDS',
+        help='with --checkpoint, the seconds between 2 checkpoints (default: 60)')
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='with --checkpoint, resume the search from FILE if it exists')
+    parser.add_argument(
+        '--cache',
+        metavar='DIR',
+        help='look for the answer in a cache of the formulas solved before, in DIR,'
+             ' and store it there when it is not found')
+    parser.add_argument(
+        '--cache-size',
+        type=float,
+        default=100,
+        metavar='MB',
+        help='with --cache, the least recently used answers are deleted beyond MB'
+             ' megabytes (default: 100)')
+    parser.add_argument(
+        '--progress',
+        type=float,
+        default=0,
+        metavar='SECONDS',
+        help='print a line of statistics every SECONDS during search')
+    parser.add_argument(
+        '--stats',
+        metavar='FILE',
+        help='write the statistics of the run (counters, learnt clauses, time per phase)'
+             ' to a JSON file')
+    parser.add_argument(
+        '--profile',
+        metavar='FILE',
+        help='profile the run with cProfile, and write the stats to FILE')
+    parser.add_argument(
+        '--flamegraph',
+        metavar='FILE',
+        help='profile the run by sampling stacks, and write them to FILE in the'
+             ' collapsed format of flame graph tools')
+    parser.add_argument(
+        '--serve',
+        nargs='?',
+        const='-',
+        metavar='SOCKET',
+        help='run as a service: read jobs (JSON objects, one per line) from the Unix'
+             ' socket SOCKET, or from stdin if none is given, and write their results'
+             ' as they complete; no formula file is given')
+    parser.add_argument(
+        '--workers',
+        type=int,
+        metavar='N',
+        help='with --serve, the number of worker processes (default: the number of CPUs)')
     parser.add_argument(
         '--loglevel',
         default='WARNING',
@@ -36,11 +262,185 @@ if __name__ == '__main__':
 
     args = parser.parse_args()
 
+    def parse_variables(text):
+        variables = []
+        for part in text.split(','):
+            first, _, last = part.partition('-')
+            variables.extend(range(int(first), int(last or first) + 1))
+        return variables
+
+    solver.logger.setLevel(args.loglevel)
+    if args.serve:
+        pool = service.WorkerPool(args.workers)
+        try:
+            if args.serve == '-':
+                service.serve_stdio(pool)
+            else:
+                service.serve_socket(pool, args.serve)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            pool.close()
+        exit()
+
     if args.filename is None:
         parser.print_help()
         exit()
+    stages = preprocess.STAGES if args.simplify == 'all' else list(filter(None, args.simplify.split(',')))
+    if not set(stages) <= set(preprocess.STAGES):
+        parser.error('unknown simplification stages: {}'.format(args.simplify))
+    options = dict(phase_saving=not args.no_phase_saving,
+                   binary_cache=args.binary_cache,
+                   simplify=stages,
+                   progress=args.progress,
+                   find_xors=args.detect_xors)
+    enumerate_models = args.all or args.max_models is not None
+    if enumerate_models and stages:
+        parser.error('--all cannot be used with --simplify')
+    if args.resume and not args.checkpoint:
+        parser.error('--resume needs --checkpoint')
+    if args.checkpoint and (stages or enumerate_models):
+        parser.error('--checkpoint cannot be used with --simplify or --all')
+    if args.cache and enumerate_models:
+        parser.error('--cache cannot be used with --all')
+    if args.share and (not args.portfolio or stages):
+        parser.error('--share needs --portfolio, and cannot be used with --simplify')
+    try:
+        projection = parse_variables(args.project) if args.project else None
+    except ValueError:
+        parser.error('invalid variables: {}'.format(args.project))
+    if (args.local_search or args.hybrid is not None) and local_search is None:
+        parser.error('--local-search and --hybrid need NumPy')
+    if args.verify and evaluate is None:
+        parser.error('--verify needs NumPy')
+    if args.hybrid is not None and args.no_phase_saving:
+        parser.error('--hybrid needs phase saving')
+    if args.verify:
+        with open(args.verify) as f:
+            models = [[int(lit) for lit in line.split()[1:] if lit != '0']
+                      for line in f if line.startswith('v ')]
+        clauses, _ = solver.Solver.read_file(args.filename, args.binary_cache)
+        counts = evaluate.Evaluator.from_clauses(clauses).violated_counts(
+            evaluate.assignments_from_models(models))
+        for i in counts.nonzero()[0]:
+            print('c model {}: {} clauses violated'.format(i + 1, counts[i]))
+        print('c Verified: {} of {} models satisfy the formula'.format(
+            len(models) - len(counts.nonzero()[0]), len(models)))
+        exit(1 if counts.any() else 0)
+    if args.job:
+        print(json.dumps(cubes.solve_job(cubes.read_job(args.filename))))
+        exit()
+    if args.cubes:
+        start_time = time.time()
+        splitter = cubes.Splitter(args.filename, binary_cache=args.binary_cache)
+        jobs = [cubes.make_job(args.filename, cube, args.heuristics, args.restart,
+                               phase_saving=not args.no_phase_saving,
+                               binary_cache=args.binary_cache)
+                for cube in splitter.cubes(args.cubes)]
+        if args.write_jobs:
+            for name in cubes.write_jobs(jobs, args.write_jobs):
+                print(name)
+            exit()
+        sat, answer, solved = cubes.conquer(splitter, jobs, time_limit=args.cube_time_limit)
+        print(answer if sat else splitter.solver.output_answer(False, time.time() - start_time))
+        print('c Cubes: {} generated, {} refuted by lookahead, {} solved'.format(
+            len(jobs), splitter.refuted, solved))
+        exit()
+    if args.portfolio:
+        exchange = sharing.ClauseExchange(args.portfolio, max_size=args.share_size,
+                                          max_lbd=args.share_lbd) if args.share else None
+        try:
+            config, _, _, answer = portfolio.race(
+                args.filename, portfolio.configurations(args.portfolio), exchange=exchange, **options)
+            print(answer)
+            print('c Portfolio winner: {} (of {} configurations)'.format(
+                portfolio.describe(config), args.portfolio))
+            if exchange is not None:
+                print('c Sharing: {exported} clauses exported, {imported} imported,'
+                      ' {useful} useful'.format(**exchange.totals()))
+        finally:
+            if exchange is not None:
+                exchange.close()
+        exit()
+    budget = Budget(conflicts=args.max_conflicts,
+                    propagations=args.max_propagations,
+                    seconds=args.time_limit,
+                    learnt_memory=args.max_learnt_memory * 1e6
+                    if args.max_learnt_memory is not None else None)
 
-    solver.logger.setLevel(args.loglevel)
-    solver = getattr(solvers, args.heuristics)(args.filename)
-    _, _, answer = solver.run()
+    def enumerate_all(s):
+        start_time = time.time()
+        models = ModelEnumerator(s, projection, args.blocking, args.max_models)
+        print('c pysat enumerating the models of {}'.format(args.filename))
+        for model in models:
+            print('v ' + ' '.join(map(str, model)), flush=True)
+        if models.complete:
+            status = 'all'
+        elif models.count == args.max_models:
+            status = 'limit reached'
+        else:
+            status = 'stopped: {}'.format(s.stop_reason)
+        sat = True if models.count else (False if models.complete else None)
+        return os.linesep.join([
+            's {}'.format({True: 'SATISFIABLE', False: 'UNSATISFIABLE'}.get(sat, 'UNKNOWN')),
+            'c Models: {} ({})'.format(models.count, status),
+            'c Done (time: {:.2f} s, picked: {} times, restarted: {} times)'.format(
+                time.time() - start_time, s.branching_count, s.restart_count)])
+
+    if args.local_search and args.hybrid is None:
+        start_time = time.time()
+        try:
+            walker = local_search.LocalSearch(args.filename, args.local_search, walks=args.walks,
+                                              binary_cache=args.binary_cache)
+        except ValueError as e:  # XOR clauses
+            parser.error('--local-search: {}'.format(e))
+        signal.signal(signal.SIGINT, lambda signum, frame: walker.interrupt())
+        sat = walker.solve(max_flips=args.max_flips, seconds=args.time_limit)
+        print(walker.output_answer(sat, time.time() - start_time))
+        exit()
+
+    checkpoint = Checkpoint(args.checkpoint, args.checkpoint_interval) if args.checkpoint else None
+
+    def run():
+        s = getattr(solvers, args.heuristics)(
+            args.filename,
+            restart=restarts.STRATEGIES[args.restart](),
+            budget=budget,
+            checkpoint=checkpoint,
+            cache=ResultCache(args.cache, args.cache_size * 1024 * 1024) if args.cache else None,
+            **options)
+        # Ctrl-C stops the search, and the answer is UNKNOWN
+        signal.signal(signal.SIGINT, lambda signum, frame: s.interrupt())
+        if checkpoint is not None:
+            # so is a termination, to checkpoint before a restart
+            signal.signal(signal.SIGTERM, lambda signum, frame: s.interrupt())
+            if args.resume and os.path.exists(args.checkpoint):
+                checkpoint.load(s)
+        if args.hybrid is not None:
+            if s.cnf.xors:
+                parser.error('--hybrid does not support XOR clauses')
+            start_time = time.time()
+            walker = local_search.LocalSearch.from_clauses(
+                s.cnf, algorithm=args.local_search or 'probsat', walks=args.walks)
+            walker.filename = args.filename
+            if walker.solve(stall=args.hybrid) and not enumerate_models:
+                return s, walker.output_answer(True, time.time() - start_time)
+            walker.seed_phases(s)
+        if enumerate_models:
+            return s, enumerate_all(s)
+        sat, _, answer = s.run()
+        if sat is None and checkpoint is not None:
+            checkpoint.save(s)
+            answer += os.linesep + 'c Checkpoint: {} ({} learnt clauses, {} conflicts)'.format(
+                args.checkpoint, len(s.learnts), s.conflict_count)
+        return s, answer
+
+    if args.profile:
+        solver, answer = profiling.profile(run, args.profile)
+    elif args.flamegraph:
+        solver, answer = profiling.profile(run, args.flamegraph, flamegraph=True)
+    else:
+        solver, answer = run()
     print(answer)
+    if args.stats:
+        solver.stats.dump(args.stats)
@@ -0,0 +1,76 @@
+"""
+Clause arena: all the clauses of the solver in one flat int buffer
+"""
+from array import array
+
+HEADER = 2  # each clause is stored as: size, flags, literals...
+LEARNT = 1
+DELETED = 2
+
+
+class ClauseArena:
+    """
+    Stores clauses back to back in one int32 array. A clause is referenced by the
+    offset of its header (the clause reference), its literals start at offset
+    `cref + HEADER` and keep their order, so the first 2 can be the watched ones.
+    Deleted clauses stay in place until `compact` is called.
+    """
+
+    def __init__(self):
+        self.lits = array('i')
+        self.wasted = 0  # number of ints taken by deleted clauses
+
+    def __len__(self):
+        return len(self.lits)
+
+    def __getitem__(self, cref):
+        """ Returns the literals of a clause, as an int array """
+        start = cref + HEADER
+        return self.lits[start:start + self.lits[cref]]
+
+    def add(self, clause, learnt=False):
+        """
+        Appends a clause to the arena
+            :param clause: list of int
+            :param learnt: whether the clause is learnt
+            :returns: the clause reference
+        """
+        cref = len(self.lits)
+        self.lits.append(len(clause))
+        self.lits.append(LEARNT if learnt else 0)
+        self.lits.extend(clause)
+        return cref
+
+    def size(self, cref):
+        return self.lits[cref]
+
+    def is_learnt(self, cref):
+        return self.lits[cref + 1] & LEARNT != 0
+
+    def is_deleted(self, cref):
+        return self.lits[cref + 1] & DELETED != 0
+
+    def delete(self, cref):
+        self.lits[cref + 1] |= DELETED
+        self.wasted += HEADER + self.lits[cref]
+
+    def crefs(self):
+        """ Iterates the references of the clauses that are not deleted """
+        lits, cref, end = self.lits, 0, len(self.lits)
+        while cref < end:
+            if not lits[cref + 1] & DELETED:
+                yield cref
+            cref += HEADER + lits[cref]
+
+    def compact(self):
+        """
+        Moves the clauses that are not deleted to a new buffer, without gaps.
+            :returns: dict, old clause reference -> new clause reference
+        """
+        old, lits, moved = self.lits, array('i'), {}
+        for cref in self.crefs():
+            moved[cref] = len(lits)
+            lits.extend(old[cref:cref + HEADER + old[cref]])
+        self.lits = lits
+        self.wasted = 0
+        return moved
@@ -1,8 +1,10 @@
 import operator
 import random
+from array import array
 
 from pkg.pysat.solver import Solver
 from pkg.utils.constants import UNASSIGN, TRUE, FALSE
+from pkg.utils.heap import IndexedHeap
 
 
 class OrderedChoiceSolver(Solver):
@@ -15,12 +17,13 @@ class RandomChoiceSolver(Solver):
         Picks an unassigned variable randomly
         :return: int
         """
-        return random.choice(list(self.all_unassigned_vars())), \
-               random.sample([TRUE, FALSE], 1)[0]
+        var = random.choice(list(self.all_unassigned_vars()))
+        return var, self.pick_phase(var)
 
 
 class FrequentVarsFirstSolver(Solver):
     def preprocess(self):
+        super().preprocess()
         vs = {x: 0 for x in self.vars}
         for clause in self.cnf:
             for v in clause:
@@ -30,8 +33,11 @@ class FrequentVarsFirstSolver(Solver):
             sorted(vs.items(), key=operator.itemgetter(1), reverse=True)]
 
     def pick_branching_variable(self):
-        return next(filter(lambda v: self.assigns[v] == UNASSIGN, self.vars_order_frequency)), \
-               random.sample([TRUE, FALSE], 1)[0]
+        var = next(filter(lambda v: self.assigns[v] == UNASSIGN, self.vars_order_frequency))
+        return var, self.pick_phase(var)
+
+    def on_new_vars(self, variables):
+        self.vars_order_frequency.extend(variables)
 
 
 class DynamicLargestIndividualSumSolver(Solver):
@@ -41,27 +47,106 @@ class DynamicLargestIndividualSumSolver(Solver):
         C(x,n) = # unresolved clauses in which x appears negatively
     find a variable a such that C(a,p) is max, a variable b such that C(b,n) is max
     if C(a,p) > C(b,n), assign a to TRUE, else assign b to FALSE
+
+    A clause is unresolved as long as one of its literals is unassigned (see
+    `compute_clause`), so for an unassigned x, C(x,p) and C(x,n) are simply the
+    occurrence counts of x and -x. They are counted once, and the unassigned
+    variables are kept in 2 heaps ordered by C(x,p) and C(x,n), ties broken by
+    the smaller variable.
     """
 
-    def all_unresolved_clauses(self):
-        return filter(lambda c: self.compute_clause(c) == UNASSIGN, self.cnf)
+    def preprocess(self):
+        super().preprocess()
+        self.pos_counts = [0] * len(self.assigns)
+        self.neg_counts = [0] * len(self.assigns)
+        for clause in self.cnf:
+            for v in clause:
+                if v > 0:
+                    self.pos_counts[v] += 1
+                else:
+                    self.neg_counts[-v] += 1
+        self.pos_order = IndexedHeap(self.pos_counts, self.all_unassigned_vars())
+        self.neg_order = IndexedHeap(self.neg_counts, self.all_unassigned_vars())
+
+    def on_backtrack(self, variables):
+        for v in variables:
+            self.pos_order.push(v)
+            self.neg_order.push(v)
+
+    def on_new_vars(self, variables):
+        grow = len(self.assigns) - len(self.pos_counts)
+        self.pos_counts.extend([0] * grow)
+        self.neg_counts.extend([0] * grow)
+        for order in (self.pos_order, self.neg_order):
+            order.grow(len(self.assigns))
+            for v in variables:
+                order.push(v)
+
+    def top_unassigned(self, order):
+        while self.assigns[order.top()] != UNASSIGN:
+            order.pop()
+        return order.top()
 
     def pick_branching_variable(self):
-        v_pos = {x: 0 for x in self.vars if self.assigns[x] == UNASSIGN}
-        v_neg= {x: 0 for x in self.vars if self.assigns[x] == UNASSIGN}
-        for clause in self.all_unresolved_clauses():
-            for v in clause:
-                try:
-                    if v > 0:
-                        v_pos[v] += 1
-                    else:
-                        v_neg[abs(v)] += 1
-                except KeyError:
-                    pass
-
-        pos_count = max(v_pos.items(), key=operator.itemgetter(1))
-        neg_count = max(v_neg.items(), key=operator.itemgetter(1))
-        if pos_count[1] > neg_count[1]:
-            return pos_count[0], TRUE
+        pos_var = self.top_unassigned(self.pos_order)
+        neg_var = self.top_unassigned(self.neg_order)
+        if self.pos_counts[pos_var] > self.neg_counts[neg_var]:
+            return pos_var, TRUE
         else:
-            return neg_count[0], FALSE
+            return neg_var, FALSE
+
+
+class VariableStateIndependentDecayingSumSolver(Solver):
+    """
+    VSIDS, in its exponential (EVSIDS) form:
+        every variable involved in a conflict has its activity bumped by an
+        increment, and the increment grows by 1 / decay after each conflict,
+        which decays all the older bumps relatively
+    pick the unassigned variable with the highest activity, kept in a heap
+    """
+
+    decay = 0.95
+    rescale_limit = 1e100
+
+    def preprocess(self):
+        super().preprocess()
+        self.activity = [0.0] * len(self.assigns)
+        self.activity_inc = 1.0
+        self.order = IndexedHeap(self.activity, self.var_order)
+
+    def on_conflict(self, variables):
+        activity, order = self.activity, self.order
+        for v in variables:
+            activity[v] += self.activity_inc
+            order.update(v)
+            if activity[v] > self.rescale_limit:
+                # rescaling keeps the order, so the heap needs no update
+                for x in self.var_order:
+                    activity[x] /= self.rescale_limit
+                self.activity_inc /= self.rescale_limit
+        self.activity_inc /= self.decay
+
+    def on_backtrack(self, variables):
+        for v in variables:
+            self.order.push(v)
+
+    def heuristics_state(self):
+        return {'activity_inc': self.activity_inc}, array('d', self.activity)
+
+    def restore_heuristics(self, scalars, values):
+        self.activity_inc = scalars['activity_inc']
+        size = min(len(self.activity), len(values))
+        self.activity[:size] = values[:size].tolist()
+        self.order.rebuild(self.all_unassigned_vars())
+
+    def on_new_vars(self, variables):
+        self.activity.extend([0.0] * (len(self.assigns) - len(self.activity)))
+        self.order.grow(len(self.assigns))
+        for v in variables:
+            self.order.push(v)
+
+    def pick_branching_variable(self):
+        var = self.order.pop()
+        while self.assigns[var] != UNASSIGN:
+            var = self.order.pop()
+        return var, self.pick_phase(var)
@@ -0,0 +1,49 @@
+"""
+Resource budgets for the CDCL solver
+"""
+import time
+
+
+class Budget:
+    """
+    Limits of one call to `Solver.solve`: numbers of conflicts and propagations,
+    wall-clock seconds, and memory of the learnt clauses in bytes. The counts
+    start from 0 at each call, a limit of None is no limit.
+    """
+
+    def __init__(self, conflicts=None, propagations=None, seconds=None, learnt_memory=None):
+        self.conflicts = conflicts
+        self.propagations = propagations
+        self.seconds = seconds
+        self.learnt_memory = learnt_memory
+        self.limits = None
+
+    def start(self, solver):
+        """ Records the limits of a call, from the current counters of `solver` """
+        stats = solver.stats
+        self.limits = (
+            stats.conflicts + self.conflicts if self.conflicts is not None else float('inf'),
+            stats.propagations + self.propagations if self.propagations is not None else float('inf'),
+            time.perf_counter() + self.seconds if self.seconds is not None else float('inf'),
+            self.learnt_memory if self.learnt_memory is not None else float('inf'))
+
+    def exceeded(self, solver):
+        """
+        Checks the limits, after a conflict and before a decision.
+            :returns: the name of the exhausted resource, or None
+        """
+        conflicts, propagations, deadline, memory = self.limits
+        stats = solver.stats
+        if stats.conflicts >= conflicts:
+            return 'conflicts'
+        if stats.propagations >= propagations:
+            return 'propagations'
+        if solver.learnt_ints * solver.arena.lits.itemsize > memory:
+            return 'learnt memory'
+        if time.perf_counter() >= deadline:
+            return 'time'
+        return None
+
+    def expired(self):
+        """ Checks the time limit alone, between the passes of preprocessing """
+        return self.limits is not None and time.perf_counter() >= self.limits[2]
@@ -0,0 +1,204 @@
+"""
+Persistent cache of solver results, addressed by the content of the formula
+"""
+import hashlib
+import json
+import os
+import time
+from array import array
+from collections import namedtuple
+from pkg.utils.constants import TRUE
+from pkg.utils.logger import set_logger
+
+logger = set_logger()
+
+MAX_BYTES = 100 * 1024 * 1024
+MAX_ROUNDS = 32  # rounds of color refinement
+
+# exact: key of the clause set, renamed: key of the clause set with canonical
+# variables (None when they could not be found), labels: variable -> canonical variable
+Fingerprint = namedtuple('Fingerprint', ['exact', 'renamed', 'labels'])
+
+
+def canonical_clauses(clauses):
+    """
+    The clause set of a formula: each clause as its sorted distinct literals,
+    without tautologies, sorted and without duplicates. The order of the clauses
+    and of their literals do not change it.
+        :param clauses: iterable of clauses (iterable of int)
+        :returns: list of tuple of int
+    """
+    result = set()
+    for clause in clauses:
+        lits = frozenset(clause)
+        if not any(-lit in lits for lit in lits):
+            result.add(tuple(sorted(lits)))
+    return sorted(result)
+
+
+def clauses_key(clauses):
+    """ The SHA-256 of canonical clauses, in DIMACS order: literals, then 0 """
+    digest = hashlib.sha256()
+    for clause in clauses:
+        digest.update(array('i', clause + (0,)).tobytes())
+    return digest.hexdigest()
+
+
+def refine(clauses, variables):
+    """
+    Colors the variables by color refinement (1-dimensional Weisfeiler-Leman):
+    a variable starts with the sizes of the clauses it is in, positively and
+    negatively, and then gets at each round the multisets of the colors of the
+    clauses it is in, a clause being colored by the colors and signs of its
+    literals, until the number of colors stops growing. The colors do not
+    depend on the numbering of the variables.
+        :param clauses: list of tuple of int
+        :param variables: list of int
+        :returns: dict of variable -> color (int)
+    """
+    occurrences = dict((var, ([], [])) for var in variables)
+    for i, clause in enumerate(clauses):
+        for lit in clause:
+            occurrences[abs(lit)][lit < 0].append(i)
+    colors = dict((var, hash((tuple(sorted(len(clauses[i]) for i in pos)),
+                              tuple(sorted(len(clauses[i]) for i in neg)))))
+                  for var, (pos, neg) in occurrences.items())
+    count = len(set(colors.values()))
+    for _ in range(MAX_ROUNDS):
+        if count == len(variables):
+            break
+        clause_colors = [hash(tuple(sorted((colors[abs(lit)], lit > 0) for lit in clause)))
+                         for clause in clauses]
+        colors = dict((var, hash((colors[var], tuple(sorted(clause_colors[i] for i in pos)),
+                                  tuple(sorted(clause_colors[i] for i in neg)))))
+                      for var, (pos, neg) in occurrences.items())
+        refined = len(set(colors.values()))
+        if refined == count:
+            break
+        count = refined
+    return colors
+
+
+def fingerprint(clauses):
+    """
+    Computes the keys of a formula. The exact key is the same for formulas
+    whose clauses differ only in order. The renamed key is also the same for
+    formulas whose variables are numbered differently: the variables are
+    renumbered by their colors after refinement, which is only possible when
+    all the colors are different (else there is no renamed key). Formulas with
+    the same renamed key are the same up to the renumbering, so the answer of
+    one holds for the other.
+        :param clauses: iterable of clauses (iterable of int)
+        :returns: Fingerprint
+    """
+    clauses = canonical_clauses(clauses)
+    exact = 'exact-' + clauses_key(clauses)
+    variables = sorted(set(abs(lit) for clause in clauses for lit in clause))
+    colors = refine(clauses, variables)
+    if len(set(colors.values())) < len(variables):
+        return Fingerprint(exact, None, None)
+    labels = dict((var, i + 1) for i, var in enumerate(sorted(variables, key=colors.get)))
+    renamed = canonical_clauses([labels[abs(lit)] * (1 if lit > 0 else -1) for lit in clause]
+                                for clause in clauses)
+    return Fingerprint(exact, 'renamed-' + clauses_key(renamed), labels)
+
+
+class ResultCache:
+    """
+    Stores the results of solved formulas in a directory, a JSON file per key
+    (see `fingerprint`) with the answer, the model and the statistics of the
+    run, under both keys, the model of the renamed key being numbered with the
+    canonical variables. A model found in the cache is still checked against
+    the formula before it is used, in case the file was damaged. The least
+    recently used files are deleted once the directory takes more than
+    `max_bytes`.
+    """
+
+    def __init__(self, directory, max_bytes=MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, key + '.json')
+
+    def read(self, key):
+        try:
+            with open(self.path(key)) as f:
+                entry = json.load(f)
+            os.utime(self.path(key))
+            return entry
+        except (OSError, ValueError):
+            return None
+
+    def write(self, key, entry):
+        tmp = '{}.{}.tmp'.format(self.path(key), os.getpid())
+        with open(tmp, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp, self.path(key))
+
+    def lookup(self, solver, fp):
+        """
+        Finds the answer of a solver's formula, and its model once it is checked
+        to satisfy the formula. The solver itself is not changed.
+            :param fp: the Fingerprint of the formula of the solver
+            :returns: (sat, the key kind: exact or renamed, the entry, the model:
+                      a literal per variable, or None if UNSAT), or None
+        """
+        for kind, key in (('exact', fp.exact), ('renamed', fp.renamed)):
+            entry = key and self.read(key)
+            if not entry:
+                continue
+            if not entry['sat']:
+                return False, kind, entry, None
+            model = entry['model']
+            if kind == 'renamed':
+                variables = dict((label, var) for var, label in fp.labels.items())
+                model = [variables.get(abs(lit), 0) * (1 if lit > 0 else -1) for lit in model]
+            model = self.check(solver, model)
+            if model is not None:
+                return True, kind, entry, model
+            logger.warning('cached model of %s does not satisfy the formula', key)
+        return None
+
+    @staticmethod
+    def check(solver, model):
+        """
+        Completes a model of the formula of a solver, the variables missing from
+        it being FALSE.
+            :returns: a literal per variable of the solver, or None if it does
+                      not satisfy the formula
+        """
+        values = set(lit for lit in model if lit > 0)
+        model = [var if var in values else -var for var in solver.var_order]
+        true = set(model)
+        if all(any(lit in true for lit in clause) for clause in solver.cnf):
+            return model
+        return None
+
+    def store(self, solver, fp, sat):
+        """ Stores the answer of a solver, SAT or UNSAT, with its model and statistics """
+        entry = {'sat': sat, 'stats': solver.stats.as_dict(), 'time': time.time()}
+        model = [var if solver.assigns[var] == TRUE else -var for var in solver.var_order] if sat else []
+        self.write(fp.exact, dict(entry, model=model))
+        if fp.renamed:
+            self.write(fp.renamed, dict(entry, model=[
+                fp.labels[abs(lit)] * (1 if lit > 0 else -1) for lit in model if abs(lit) in fp.labels]))
+        self.evict()
+
+    def evict(self):
+        """ Deletes the least recently used files, down to `max_bytes` """
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                stat = os.stat(os.path.join(self.directory, name))
+                files.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in files)
+        for _, size, name in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass  # evicted by another process
+            total -= size
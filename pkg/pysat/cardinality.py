@@ -0,0 +1,168 @@
+"""
+CNF encodings of cardinality constraints: at most / at least / exactly k of a
+list of literals are TRUE
+"""
+from itertools import combinations
+
+ENCODINGS = ['pairwise', 'seqcounter', 'commander', 'totalizer']
+
+
+class VarPool:
+    """ Hands out the auxiliary variables of the encodings, after the last one used """
+
+    def __init__(self, top=0):
+        """
+            :param top: the largest variable used by the formula so far
+        """
+        self.top = top
+
+    def new(self):
+        self.top += 1
+        return self.top
+
+
+def at_most_k(lits, k, pool, encoding='seqcounter'):
+    """
+    Encodes "at most k of the literals are TRUE".
+        :param lits: list of int
+        :param k: int
+        :param pool: VarPool of the auxiliary variables
+        :param encoding: one of `ENCODINGS`:
+                         - pairwise: a clause per k + 1 literals, without
+                           auxiliary variables, quadratic for k = 1
+                         - seqcounter: a sequential counter (Sinz 2005), about
+                           2nk clauses and nk variables
+                         - commander: groups of k + 2 literals with k commander
+                           variables each, recursively on the commanders
+                           (Frisch & Giannaros 2010)
+                         - totalizer: a tree of unary adders (Bailleux &
+                           Boufkhad 2003), counting up to k + 1
+        :returns: list of clauses (list of int)
+    """
+    lits = list(lits)
+    if k < 0:
+        return [[]]
+    if k >= len(lits):
+        return []
+    if k == 0:
+        return [[-lit] for lit in lits]
+    if encoding == 'pairwise':
+        return [[-lit for lit in subset] for subset in combinations(lits, k + 1)]
+    if encoding == 'seqcounter':
+        return _sequential_counter(lits, k, pool)
+    if encoding == 'commander':
+        return _commander(lits, k, pool, exact=False)
+    if encoding == 'totalizer':
+        outputs, clauses = _totalizer(lits, k + 1, pool)
+        return clauses + [[-outputs[k]]]
+    raise ValueError('unknown encoding: {}'.format(encoding))
+
+
+def at_least_k(lits, k, pool, encoding='seqcounter'):
+    """ Encodes "at least k of the literals are TRUE", see `at_most_k` """
+    lits = list(lits)
+    if k <= 0:
+        return []
+    if k == 1:
+        return [lits]
+    return at_most_k([-lit for lit in lits], len(lits) - k, pool, encoding)
+
+
+def exactly_k(lits, k, pool, encoding='seqcounter'):
+    """ Encodes "exactly k of the literals are TRUE", see `at_most_k` """
+    lits = list(lits)
+    if not 0 < k < len(lits):
+        return at_most_k(lits, k, pool, encoding) + at_least_k(lits, k, pool, encoding)
+    if encoding == 'commander':
+        return _commander(lits, k, pool, exact=True)
+    if encoding == 'totalizer':
+        # one counter for both bounds
+        outputs, clauses = _totalizer(lits, k + 1, pool)
+        return clauses + [[outputs[k - 1]], [-outputs[k]]]
+    return at_most_k(lits, k, pool, encoding) + at_least_k(lits, k, pool, encoding)
+
+
+def at_most_one(lits, pool, encoding='seqcounter'):
+    return at_most_k(lits, 1, pool, encoding)
+
+
+def exactly_one(lits, pool, encoding='seqcounter'):
+    return exactly_k(lits, 1, pool, encoding)
+
+
+def _sequential_counter(lits, k, pool):
+    """
+    The register s[i][j] is TRUE when at least j + 1 of the first i + 1
+    literals are TRUE, and a literal cannot be TRUE when k are before it.
+    """
+    n = len(lits)
+    registers = [[pool.new() for _ in range(k)] for _ in range(n - 1)]
+    clauses = [[-lits[0], registers[0][0]]]
+    clauses.extend([-registers[0][j]] for j in range(1, k))
+    for i in range(1, n - 1):
+        s, previous = registers[i], registers[i - 1]
+        clauses.append([-lits[i], s[0]])
+        clauses.append([-previous[0], s[0]])
+        for j in range(1, k):
+            clauses.append([-lits[i], -previous[j - 1], s[j]])
+            clauses.append([-previous[j], s[j]])
+        clauses.append([-lits[i], -previous[k - 1]])
+    clauses.append([-lits[n - 1], -registers[n - 2][k - 1]])
+    return clauses
+
+
+def _commander(lits, k, pool, exact):
+    """
+    Splits the literals into groups of k + 2, each with k commander variables
+    telling how many of its literals are TRUE (in unary, commanders are TRUE
+    first), then constrains the commanders the same way, until there are too
+    few literals for the commanders to be fewer, which get a direct encoding.
+    """
+    size = k + 2
+    base = 'pairwise' if k == 1 else 'seqcounter'
+    if len(lits) <= size or k * -(-len(lits) // size) >= len(lits):
+        return (exactly_k if exact else at_most_k)(lits, k, pool, base)
+    clauses = []
+    commanders = []
+    for start in range(0, len(lits), size):
+        group = lits[start:start + size]
+        heads = [pool.new() for _ in range(min(k, len(group)))]
+        # as many TRUE literals in the group as TRUE commanders
+        clauses.extend(exactly_k(group + [-c for c in heads], len(heads), pool, base))
+        clauses.extend([-heads[j + 1], heads[j]] for j in range(len(heads) - 1))
+        commanders.extend(heads)
+    return clauses + _commander(commanders, k, pool, exact)
+
+
+def _totalizer(lits, limit, pool):
+    """
+    Builds a totalizer tree over the literals: each node has output variables
+    o[j], TRUE iff at least j + 1 of its literals are TRUE, up to `limit`.
+        :returns: (outputs of the root, clauses)
+    """
+    if len(lits) == 1:
+        return list(lits), []
+    middle = len(lits) // 2
+    left, clauses = _totalizer(lits[:middle], limit, pool)
+    right, more = _totalizer(lits[middle:], limit, pool)
+    clauses.extend(more)
+    outputs = [pool.new() for _ in range(min(limit, len(lits)))]
+    for i in range(len(left) + 1):
+        for j in range(len(right) + 1):
+            # at least i on the left and j on the right: at least i + j
+            if 0 < i + j <= len(outputs):
+                clause = [outputs[i + j - 1]]
+                if i:
+                    clause.append(-left[i - 1])
+                if j:
+                    clause.append(-right[j - 1])
+                clauses.append(clause)
+            # at most i on the left and j on the right: at most i + j
+            if i + j < len(outputs):
+                clause = [-outputs[i + j]]
+                if i < len(left):
+                    clause.append(left[i])
+                if j < len(right):
+                    clause.append(right[j])
+                clauses.append(clause)
+    return outputs, clauses
@@ -0,0 +1,120 @@
+"""
+Checkpoints of a CDCL search: the learnt clauses, the level 0 assignments, the
+state of the heuristics and the statistics, saved to a binary file to resume
+the search later
+"""
+import json
+import os
+import struct
+import time
+import zlib
+from array import array
+from pkg.utils.exceptions import FileFormatError
+from pkg.utils.logger import set_logger
+
+logger = set_logger()
+
+MAGIC = b'CKPT'
+VERSION = 1
+# magic, version, byte order mark, fingerprint of the formula, size of the metadata
+HEADER = struct.Struct('=4sIiIq')
+
+
+def fingerprint(cnf):
+    """ A CRC32 of the clauses of a formula (a ClauseBuffer), and of its XOR clauses """
+    crc = zlib.crc32(cnf.lits, zlib.crc32(cnf.starts))
+    return zlib.crc32(repr(cnf.xors).encode(), crc) if cnf.xors else crc
+
+
+def write_checkpoint(filename, snapshot, cnf):
+    """
+    Writes a snapshot of a solver (see `Solver.snapshot`): a header, the
+    metadata as JSON, then the arrays back to back in native byte order, their
+    type codes and lengths being in the metadata. The file is written to a
+    temporary file first, synced, then renamed, so that a crash while writing
+    leaves the previous checkpoint.
+        :param snapshot: (metadata dict, dict of name -> array)
+        :param cnf: the formula of the solver
+    """
+    meta, arrays = snapshot
+    meta = dict(meta, arrays=[(name, data.typecode, len(data)) for name, data in arrays.items()])
+    encoded = json.dumps(meta).encode()
+    tmp = '{}.{}.tmp'.format(filename, os.getpid())
+    with open(tmp, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 1, fingerprint(cnf), len(encoded)))
+        f.write(encoded)
+        for data in arrays.values():
+            data.tofile(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, filename)
+
+
+def read_checkpoint(filename, cnf):
+    """
+    Reads a checkpoint written by `write_checkpoint`.
+        :param cnf: the formula of the solver to resume, it must be the one
+                    the checkpoint was made from
+        :raises FileFormatError: when the file is not a valid checkpoint of the formula
+        :returns: (metadata dict, dict of name -> array)
+    """
+    with open(filename, 'rb') as f:
+        data = f.read()
+    if len(data) < HEADER.size:
+        raise FileFormatError('{} is not a checkpoint.'.format(filename))
+    magic, version, order, crc, size = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION or order != 1:
+        raise FileFormatError('{} is not a checkpoint of this machine.'.format(filename))
+    if crc != fingerprint(cnf):
+        raise FileFormatError('{} is a checkpoint of another formula.'.format(filename))
+    pos = HEADER.size
+    meta = json.loads(data[pos:pos + size].decode())
+    pos += size
+    arrays = {}
+    for name, typecode, length in meta.pop('arrays'):
+        arrays[name] = array(typecode)
+        end = pos + length * arrays[name].itemsize
+        if end > len(data):
+            raise FileFormatError('{} is truncated.'.format(filename))
+        arrays[name].frombytes(data[pos:end])
+        pos = end
+    return meta, arrays
+
+
+class Checkpoint:
+    """
+    Saves the state of a solver to a file every `interval` seconds of search,
+    and when asked to. The checks are made after conflicts, like the budget.
+    """
+
+    def __init__(self, filename, interval=60):
+        """
+            :param filename: the checkpoint file
+            :param interval: seconds between 2 checkpoints, None for none but
+                             the ones asked for with `save`
+        """
+        self.filename = filename
+        self.interval = interval
+        self.next = float('inf')
+        self.saved = 0
+
+    def start(self):
+        """ Schedules the first checkpoint of a call to `Solver.solve` """
+        self.next = time.perf_counter() + self.interval if self.interval else float('inf')
+
+    def due(self):
+        return time.perf_counter() >= self.next
+
+    def save(self, solver):
+        start = time.perf_counter()
+        write_checkpoint(self.filename, solver.snapshot(), solver.cnf)
+        self.saved += 1
+        self.start()
+        logger.info('checkpoint %s: %s learnt clauses saved in %.2f s', self.filename,
+                    len(solver.learnts), time.perf_counter() - start)
+
+    def load(self, solver):
+        """ Resumes a solver from the file (see `Solver.resume`) """
+        solver.resume(read_checkpoint(self.filename, solver.cnf))
+        logger.info('resumed from %s: %s learnt clauses, %s conflicts so far', self.filename,
+                    len(solver.learnts), solver.stats.conflicts)
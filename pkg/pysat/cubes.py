@@ -0,0 +1,242 @@
+"""
+Cube and conquer: a formula is split into cubes (partial assignments) by
+lookahead, and each cube is solved as an independent job
+"""
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from multiprocessing.connection import wait
+from pkg.pysat import branch_heuristics as solvers
+from pkg.pysat import restarts
+from pkg.pysat.solver import Solver
+from pkg.utils.constants import FALSE, UNASSIGN
+from pkg.utils.logger import set_logger
+
+logger = set_logger()
+
+
+class Splitter:
+    """
+    Splits a formula into cubes with lookahead: under a cube, each candidate
+    variable is assigned both ways and propagated, and the variable whose 2
+    branches assign the most variables (the product of both counts) is split
+    on. A branch that conflicts is a failed literal, its negation is added to
+    the cube; a cube whose both branches fail is refuted.
+    """
+
+    def __init__(self, filename, candidates=50, binary_cache=False):
+        """
+            :param filename: the DIMACS CNF file to split
+            :param candidates: number of variables looked ahead on per split,
+                               the ones occurring the most in the formula
+            :param binary_cache: whether to use the binary cache of the file
+        """
+        self.solver = Solver(filename, binary_cache=binary_cache)
+        self.candidates = candidates
+        counts = dict.fromkeys(self.solver.vars, 0)
+        for lit in self.solver.cnf.lits:
+            counts[abs(lit)] += 1
+        self.order = sorted(counts, key=lambda v: -counts[v])
+        self.refuted = 0  # cubes found UNSAT while splitting
+
+    def decide(self, lit):
+        """
+        Assigns a literal on a new decision level, and propagates it.
+            :returns: False on conflict, else True
+        """
+        solver = self.solver
+        solver.trail_lim.append(len(solver.trail))
+        solver.level += 1
+        if solver.compute_value(lit) == UNASSIGN:
+            solver.assign(lit)
+        return solver.compute_value(lit) != FALSE and solver.unit_propagate() is None
+
+    def enter(self, cube):
+        """
+        Assigns the literals of a cube, from level 0.
+            :returns: False if the cube is refuted by propagation, else True
+        """
+        solver = self.solver
+        solver.backtrack(0)
+        if solver.empty:
+            return False
+        for lit in solver.units:
+            if solver.compute_value(lit) == FALSE:
+                return False
+            if solver.compute_value(lit) == UNASSIGN:
+                solver.assign(lit)
+        if solver.unit_propagate() is not None:
+            return False
+        return all(self.decide(lit) for lit in cube)
+
+    def split(self, cube):
+        """
+        Splits a cube in 2 on the best lookahead variable.
+            :param cube: list of int
+            :returns: list of the sub-cubes, empty if the cube is refuted, or
+                      [cube] if it cannot be split (all variables assigned)
+        """
+        cube = list(cube)
+        solver = self.solver
+        while True:
+            if not self.enter(cube):
+                self.refuted += 1
+                return []
+            level = solver.level
+            free = [v for v in self.order if solver.assigns[v] == UNASSIGN][:self.candidates]
+            if not free:
+                return [cube]
+            best, best_score, failed = None, -1, None
+            for var in free:
+                counts = []
+                for lit in (var, -var):
+                    before = len(solver.trail)
+                    counts.append(len(solver.trail) - before if self.decide(lit) else None)
+                    solver.backtrack(level)
+                if counts[0] is None or counts[1] is None:
+                    failed = (var, counts)
+                    break
+                score = (counts[0] + 1) * (counts[1] + 1)
+                if score > best_score:
+                    best, best_score = var, score
+            if failed is None:
+                return [cube + [best], cube + [-best]]
+            var, counts = failed
+            if counts[0] is None and counts[1] is None:
+                self.refuted += 1
+                return []
+            cube.append(-var if counts[0] is None else var)
+
+    def cubes(self, count):
+        """
+        Splits the formula into up to `count` cubes, breadth first
+            :returns: list of cubes (list of int), empty if the formula is UNSAT
+        """
+        queue = deque([[]])
+        done = []
+        while queue and len(queue) + len(done) < count:
+            cube = queue.popleft()
+            parts = self.split(cube)
+            if parts == [cube]:
+                done.append(cube)
+            else:
+                queue.extend(parts)
+        logger.info('%s cubes, %s refuted', len(queue) + len(done), self.refuted)
+        return done + list(queue)
+
+
+def make_job(filename, cube, heuristics='VariableStateIndependentDecayingSumSolver',
+             restart='glucose', phase_saving=True, binary_cache=False):
+    """
+    A job solves the formula under the assumptions of a cube. Jobs are plain
+    dicts, so they can be written to JSON files and run by a batch queue.
+    """
+    return {'filename': os.path.abspath(filename), 'cube': list(cube),
+            'heuristics': heuristics, 'restart': restart,
+            'phase_saving': phase_saving, 'binary_cache': binary_cache}
+
+
+def solve_job(job):
+    """
+    Solves a job
+        :returns: dict of the cube, sat, the answer (if SAT) and the time spent
+    """
+    start = time.time()
+    solver = getattr(solvers, job['heuristics'])(
+        job['filename'], restart=restarts.STRATEGIES[job['restart']](),
+        phase_saving=job['phase_saving'], binary_cache=job['binary_cache'])
+    sat = solver.solve(job['cube'])
+    spent = time.time() - start
+    return {'cube': job['cube'], 'sat': sat, 'time': spent,
+            'answer': solver.output_answer(sat, spent) if sat else None}
+
+
+def write_jobs(jobs, directory):
+    """ Writes the jobs as JSON files, cube-0.json, cube-1.json, ... """
+    os.makedirs(directory, exist_ok=True)
+    names = []
+    for i, job in enumerate(jobs):
+        names.append(os.path.join(directory, 'cube-{}.json'.format(i)))
+        with open(names[-1], 'w') as f:
+            json.dump(job, f)
+    return names
+
+
+def read_job(filename):
+    with open(filename) as f:
+        return json.load(f)
+
+
+def run_job(conn, job):
+    try:
+        conn.send(solve_job(job))
+    except Exception as e:
+        conn.send(e)
+    conn.close()
+
+
+def conquer(splitter, jobs, processes=None, time_limit=10, max_splits=3):
+    """
+    Solves the jobs in parallel processes, and stops at the first SAT one.
+    A job still running after `time_limit` seconds is stopped, its cube split
+    in 2 and both solved as new jobs, with twice the time limit. After
+    `max_splits` splits of a cube, its jobs have no time limit.
+        :param splitter: Splitter of the formula, to re-split slow cubes
+        :param jobs: list of jobs (see `make_job`)
+        :param processes: number of parallel processes, the number of CPUs by default
+        :param time_limit: time limit of the first jobs, in seconds
+        :param max_splits: number of times a cube may be re-split
+        :returns: (sat, answer of the SAT job or None, number of jobs solved)
+    """
+    processes = processes or os.cpu_count() or 1
+    pending = deque((job, 0) for job in jobs)  # (job, number of splits)
+    running = {}  # connection -> (job, splits, process, deadline)
+    solved = 0
+    try:
+        while pending or running:
+            while pending and len(running) < processes:
+                job, splits = pending.popleft()
+                receiver, sender = multiprocessing.Pipe(duplex=False)
+                process = multiprocessing.Process(target=run_job, args=(sender, job), daemon=True)
+                process.start()
+                sender.close()
+                deadline = (time.time() + time_limit * 2 ** splits
+                            if splits < max_splits else float('inf'))
+                running[receiver] = (job, splits, process, deadline)
+
+            timeout = min(d for _, _, _, d in running.values()) - time.time()
+            ready = wait(list(running), None if timeout == float('inf') else max(0, timeout))
+            now = time.time()
+            for conn in list(running):
+                job, splits, process, deadline = running[conn]
+                if conn in ready:
+                    result = conn.recv()
+                elif now >= deadline:
+                    process.kill()
+                    result = None
+                else:
+                    continue
+                process.join()
+                conn.close()
+                del running[conn]
+                if isinstance(result, Exception):
+                    raise result
+                if result is None:
+                    parts = splitter.split(job['cube'])
+                    logger.info('cube %s timed out, split in %s', job['cube'], len(parts))
+                    if parts == [job['cube']]:  # cannot be split, solve it without limit
+                        splits = max_splits - 1
+                    pending.extend((dict(job, cube=cube), splits + 1) for cube in parts)
+                    continue
+                solved += 1
+                logger.info('cube %s: %s in %.2f s', result['cube'],
+                            'SAT' if result['sat'] else 'UNSAT', result['time'])
+                if result['sat']:
+                    return True, result['answer'], solved
+        return False, None, solved
+    finally:
+        for _, _, process, _ in running.values():
+            process.kill()
+            process.join()
@@ -0,0 +1,296 @@
+"""
+Streaming DIMACS CNF reader, and a binary cache format for parsed formulas
+"""
+import bz2
+import gzip
+import lzma
+import mmap
+import os
+import re
+import struct
+import time
+from array import array
+from pkg.utils.exceptions import FileFormatError
+from pkg.utils.logger import set_logger
+
+logger = set_logger()
+
+CHUNK_SIZE = 1 << 22
+HEADER = re.compile(rb'^[ \t]*p[ \t]+cnf[ \t]+(\S+)[ \t]+(\S+)[ \t]*\r?$', re.M)
+COMMENT = re.compile(rb'^[ \t]*c.*$', re.M)
+END = re.compile(rb'^[ \t]*%', re.M)  # SATLIB files end with a line of %
+XOR = re.compile(rb'^[ \t]*x(.*)$', re.M)  # XOR clauses, as read by CryptoMiniSat
+COMPRESSIONS = [
+    (b'\x1f\x8b', gzip.open),
+    (b'BZh', bz2.open),
+    (b'\xfd7zXZ\x00', lzma.open),
+]
+
+
+class ClauseBuffer:
+    """
+    Clauses stored flat: the literals of all clauses in one int array, and the
+    start offset of every clause in another (with the end offset last). Iterating
+    gives the clauses as tuples of int. The XOR clauses of the formula, if any,
+    are kept apart in `xors` (see `xor_constraint`).
+    """
+
+    def __init__(self, lits=None, starts=None):
+        self.lits = lits if lits is not None else array('i')
+        self.starts = starts if starts is not None else array('q', [0])
+        self.xors = []
+
+    def __len__(self):
+        return len(self.starts) - 1
+
+    def __getitem__(self, index):
+        return tuple(self.lits[self.starts[index]:self.starts[index + 1]])
+
+    def __iter__(self):
+        lits, starts = self.lits, self.starts
+        for i in range(len(starts) - 1):
+            yield tuple(lits[starts[i]:starts[i + 1]])
+
+    def __repr__(self):
+        return 'ClauseBuffer({} clauses, {} literals)'.format(len(self), len(self.lits))
+
+    def append(self, clause):
+        if not isinstance(self.lits, array):  # views on a memory-mapped file
+            self.lits, self.starts = array('i', self.lits), array('q', self.starts)
+        self.lits.extend(clause)
+        self.starts.append(len(self.lits))
+
+
+def xor_constraint(lits):
+    """
+    Normalizes an XOR clause, which is TRUE when an odd number of its literals
+    are TRUE: a negative literal flips the parity, and a variable twice cancels out.
+        :param lits: iterable of int
+        :returns: (sorted tuple of the variables, parity): the XOR of the
+                  variables is TRUE iff the parity is 1
+    """
+    variables = set()
+    parity = 1
+    for lit in lits:
+        variables ^= {abs(lit)}
+        parity ^= lit < 0
+    return tuple(sorted(variables)), parity
+
+
+def open_cnf(filename):
+    """
+    Opens a file for binary reading, decompressing .gz, .bz2 and .xz files.
+    A binary stream (with a `read` method) is returned as it is.
+    """
+    if hasattr(filename, 'read'):
+        return filename
+    with open(filename, 'rb') as f:
+        magic = f.read(6)
+    for prefix, opener in COMPRESSIONS:
+        if magic.startswith(prefix):
+            return opener(filename, 'rb')
+    return open(filename, 'rb')
+
+
+def read_dimacs(filename, chunk_size=CHUNK_SIZE):
+    """
+    Reads a DIMACS CNF format file chunk by chunk. A clause is the literals up to
+    the next 0, so clauses may span several lines or share a line. Lines starting
+    with c are comments, and a line starting with % ends the formula. A line
+    starting with x is an XOR clause, its literals up to 0 on the same line, as
+    in CryptoMiniSat: it is TRUE when an odd number of its literals are TRUE.
+        :param filename: the file name, may be compressed with gzip, bzip2 or xz,
+                         or a binary stream
+        :param chunk_size: the number of bytes read at a time
+        :raises FileFormatError: when file format is wrong
+        :returns: (clauses as a ClauseBuffer, variables as a set of int)
+    """
+    start_time = time.time()
+    clauses = ClauseBuffer()
+    lits, starts = clauses.lits, clauses.starts
+    variables = set()
+    header = None
+    size = 0
+    tail = b''
+    with open_cnf(filename) as f:
+        while True:
+            chunk = f.read(chunk_size)
+            size += len(chunk)
+            text = tail + chunk
+            if chunk:
+                cut = text.rfind(b'\n') + 1
+                text, tail = text[:cut], text[cut:]
+            end = END.search(text)
+            if end:
+                text = text[:end.start()]
+            text = COMMENT.sub(b'', text)
+            if header is None:
+                match = HEADER.search(text)
+                if match is None or text[:match.start()].strip():
+                    if text.strip() or end or not chunk:
+                        raise FileFormatError(
+                            'Number of literals and clauses are not declared properly.')
+                    continue
+                try:
+                    header = tuple(map(int, match.groups()))
+                except ValueError:
+                    raise FileFormatError(
+                        'Number of literals and clauses are not declared properly.')
+                text = text[match.end():]
+            if b'x' in text:
+                for line in XOR.findall(text):
+                    try:
+                        numbers = list(map(int, line.split()))
+                    except ValueError as e:
+                        raise FileFormatError('XOR clauses must be made of integers: {}'.format(e))
+                    if not numbers or numbers[-1] != 0 or 0 in numbers[:-1]:
+                        raise FileFormatError('Each XOR clause must end with 0, on its line.')
+                    variables.update(map(abs, numbers[:-1]))
+                    clauses.xors.append(xor_constraint(numbers[:-1]))
+                text = XOR.sub(b'', text)
+            try:
+                numbers = array('i', map(int, text.split()))
+            except (ValueError, OverflowError) as e:
+                raise FileFormatError('Clauses must be made of integers: {}'.format(e))
+            variables.update(map(abs, numbers))
+            # the literals are the numbers without the 0s, which end the clauses
+            offset = len(lits)
+            pos, find, add_start = 0, numbers.index, starts.append
+            while True:
+                try:
+                    zero = find(0, pos)
+                except ValueError:
+                    break
+                add_start(zero + offset)
+                offset -= 1
+                pos = zero + 1
+            lits.extend(filter(None, numbers))
+            if end or not chunk:
+                break
+
+    if len(lits) != starts[-1]:
+        raise FileFormatError('Each clause must end with 0.')
+    variables.discard(0)
+    count_literals, count_clauses = header
+    if len(variables) != count_literals or len(clauses) + len(clauses.xors) != count_clauses:
+        raise FileFormatError(
+            'Unmatched literal count or clause count.'
+            ' Literals expected: {}, actual: {}.'
+            ' Clauses expected: {}, actual: {}.'
+            .format(count_literals, len(variables), count_clauses, len(clauses) + len(clauses.xors)))
+
+    spent = time.time() - start_time
+    name = os.path.basename(filename) if isinstance(filename, str) else getattr(filename, 'name', 'stream')
+    logger.info('parsed %s: %.2f MB in %.2f s (%.2f MB/s)', name,
+                size / 1e6, spent, size / 1e6 / spent if spent else 0)
+    return clauses, variables
+
+
+CNFB_MAGIC = b'CNFB'
+CNFB_VERSION = 2
+# magic, version, byte order mark, padding (0), source size, source mtime (ns),
+# number of variables, number of clauses, number of literals: 56 bytes, so the
+# int64 fields, and the offsets after the variables, are 8-byte aligned
+CNFB_HEADER = struct.Struct('=4sIiiqqqqq')
+
+
+def cnfb_path(filename):
+    """ Returns the binary cache file name of a DIMACS file: x.cnf(.gz) -> x.cnfb """
+    base, ext = os.path.splitext(filename)
+    if ext in ('.gz', '.bz2', '.xz'):
+        base, ext = os.path.splitext(base)
+    return base + '.cnfb' if ext == '.cnf' else filename + '.cnfb'
+
+
+def write_cnfb(filename, clauses, variables, source=None):
+    """
+    Writes clauses in the binary cache format: a header, then the sorted
+    variables (int32), the clause start offsets (int64) and the literals (int32),
+    in native byte order. The file is written to a temporary file first, then
+    renamed, so readers never see a partial file.
+        :param filename: the .cnfb file name
+        :param clauses: ClauseBuffer
+        :param variables: set of int
+        :param source: the DIMACS file the clauses were parsed from, its size and
+                       modification time are recorded to detect stale caches
+    """
+    stat = os.stat(source) if source else None
+    variables = array('i', sorted(variables))
+    starts = array('q', clauses.starts)
+    lits = array('i', clauses.lits)
+    tmp = '{}.{}.tmp'.format(filename, os.getpid())
+    with open(tmp, 'wb') as f:
+        f.write(CNFB_HEADER.pack(CNFB_MAGIC, CNFB_VERSION, 1, 0,
+                                 stat.st_size if stat else -1,
+                                 stat.st_mtime_ns if stat else -1,
+                                 len(variables), len(clauses), len(lits)))
+        variables.tofile(f)
+        if len(variables) % 2:
+            f.write(b'\0' * 4)  # the header is 8-byte aligned, so are the int64 offsets
+        starts.tofile(f)
+        lits.tofile(f)
+    os.replace(tmp, filename)
+
+
+def read_cnfb(filename, source=None):
+    """
+    Reads a binary cache file by memory-mapping it: the clauses are views on the
+    mapped file, nothing is parsed or copied.
+        :param filename: the .cnfb file name
+        :param source: if given, the DIMACS file the cache must have been made from
+        :raises FileFormatError: when the file is not a valid cache (of source)
+        :returns: (clauses as a ClauseBuffer, variables as a set of int)
+    """
+    with open(filename, 'rb') as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(data) < CNFB_HEADER.size:
+        raise FileFormatError('{} is not a binary CNF file.'.format(filename))
+    (magic, version, order, _, size, mtime,
+     count_vars, count_clauses, count_lits) = CNFB_HEADER.unpack_from(data)
+    if magic != CNFB_MAGIC or version != CNFB_VERSION or order != 1:
+        raise FileFormatError('{} is not a binary CNF file of this machine.'.format(filename))
+    if source is not None:
+        stat = os.stat(source)
+        if (size, mtime) != (stat.st_size, stat.st_mtime_ns):
+            raise FileFormatError('{} is stale, {} changed.'.format(filename, source))
+    view = memoryview(data)
+    pos = CNFB_HEADER.size
+    variables = view[pos:pos + 4 * count_vars].cast('i')
+    pos += 4 * (count_vars + count_vars % 2)
+    starts = view[pos:pos + 8 * (count_clauses + 1)].cast('q')
+    pos += 8 * (count_clauses + 1)
+    lits = view[pos:pos + 4 * count_lits].cast('i')
+    if len(lits) != count_lits:
+        raise FileFormatError('{} is truncated.'.format(filename))
+    logger.info('loaded %s: %s clauses', os.path.basename(filename), count_clauses)
+    return ClauseBuffer(lits, starts), set(variables)
+
+
+def load_cnf(filename, binary_cache=False):
+    """
+    Reads a CNF formula from a DIMACS file, or from a binary cache file (.cnfb).
+        :param filename: the file name
+        :param binary_cache: whether to use the binary cache next to a DIMACS
+                             file, reading it when it is up to date, else writing it
+        :raises FileFormatError: when file format is wrong
+        :returns: (clauses as a ClauseBuffer, variables as a set of int)
+    """
+    if filename.endswith('.cnfb'):
+        return read_cnfb(filename)
+    if not binary_cache:
+        return read_dimacs(filename)
+    cache = cnfb_path(filename)
+    if os.path.exists(cache):
+        try:
+            return read_cnfb(cache, source=filename)
+        except FileFormatError as e:
+            logger.info('ignoring binary cache: %s', e)
+    clauses, variables = read_dimacs(filename)
+    if clauses.xors:
+        logger.info('no binary cache for %s, which has XOR clauses', filename)
+        return clauses, variables
+    try:
+        write_cnfb(cache, clauses, variables, source=filename)
+    except OSError as e:
+        logger.warning('cannot write binary cache %s: %s', cache, e)
+    return clauses, variables
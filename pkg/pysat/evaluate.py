@@ -0,0 +1,151 @@
+"""
+Bulk evaluation of a formula under many assignments at once, with NumPy
+"""
+import numpy as np
+from pkg.utils.constants import TRUE
+
+CHUNK_SIZE = 1 << 25  # clause evaluations per pass, about 32 MB of booleans
+
+
+class Evaluator:
+    """
+    Evaluates the clauses of a formula under a batch of assignments. The
+    formula is given in CSR form, as in `pkg.pysat.dimacs.ClauseBuffer`: the
+    literals of all the clauses back to back, and the start offset of each
+    clause with the end offset last. The clauses are grouped by size, and a
+    group of clauses of size k is k columns of variables: the values of a
+    column under a batch of assignments are gathered with one `np.take`, and
+    OR-ed into the values of the clauses. So there is no Python loop over
+    clauses or literals, only over the columns of the clause sizes. The batch
+    is cut into chunks of `chunk_size` clause evaluations, to bound the memory
+    taken by formulas of millions of clauses.
+    """
+
+    def __init__(self, lits, starts, chunk_size=CHUNK_SIZE):
+        """
+            :param lits: array of int, the literals of all the clauses
+            :param starts: array of int, the start offsets of the clauses,
+                           then the end offset of the last one
+            :param chunk_size: number of clause evaluations per pass
+        """
+        lits = np.asarray(lits)
+        starts = np.asarray(starts, dtype=np.int64)
+        self.clause_count = len(starts) - 1
+        self.size = int(np.abs(lits).max()) + 1 if len(lits) else 1
+        self.chunk_size = chunk_size
+        sizes = starts[1:] - starts[:-1]
+        self.groups = []  # (clauses, columns of variables, columns of negations)
+        for size in np.unique(sizes):
+            if size == 0:
+                continue  # empty clauses are always violated
+            clauses = np.nonzero(sizes == size)[0]
+            group = lits[starts[clauses][:, None] + np.arange(size)]
+            self.groups.append((clauses,
+                                [np.ascontiguousarray(np.abs(column)) for column in group.T],
+                                [np.ascontiguousarray(column < 0) for column in group.T]))
+
+    @classmethod
+    def from_clauses(cls, clauses, **kwargs):
+        """
+        Creates an evaluator from a ClauseBuffer, without copying its arrays,
+        or from an iterable of clauses.
+        """
+        if getattr(clauses, 'xors', None):
+            raise ValueError('the evaluation of XOR clauses is not supported')
+        if hasattr(clauses, 'starts'):
+            return cls(np.frombuffer(clauses.lits, dtype=np.int32),
+                       np.frombuffer(clauses.starts, dtype=np.int64), **kwargs)
+        clauses = [list(clause) for clause in clauses]
+        starts = np.cumsum([0] + [len(clause) for clause in clauses])
+        lits = [lit for clause in clauses for lit in clause]
+        return cls(np.array(lits, dtype=np.int64), starts, **kwargs)
+
+    def values(self, assignments):
+        """
+        Normalizes assignments to a 2-D boolean array.
+            :param assignments: 2-D array, one row per assignment and one column
+                                per variable (column 0 is unused): TRUE (1) or
+                                True is TRUE, anything else FALSE
+            :returns: 2-D array of bool, at least as wide as the formula
+        """
+        assignments = np.asarray(assignments)
+        if assignments.ndim != 2:
+            raise ValueError('assignments must be a 2-D array, one row per assignment')
+        values = assignments == TRUE
+        if values.shape[1] < self.size:
+            values = np.pad(values, ((0, 0), (0, self.size - values.shape[1])))
+        return values
+
+    def chunks(self, assignments):
+        """
+        Evaluates the clauses, a chunk of assignments and a group of clauses
+        at a time.
+            :param assignments: 2-D array (see `values`)
+            :returns: iterator of (first row, clauses of the group, 2-D array of
+                      bool, whether each clause of the group is satisfied by
+                      each assignment of the chunk)
+        """
+        values = self.values(assignments)
+        rows = max(1, self.chunk_size // max(1, self.clause_count))
+        for start in range(0, len(values), rows):
+            chunk = values[start:start + rows]
+            for clauses, variables, negations in self.groups:
+                satisfied = np.empty((len(chunk), len(clauses)), dtype=bool)
+                column = np.empty_like(satisfied)
+                np.take(chunk, variables[0], axis=1, out=satisfied)
+                satisfied ^= negations[0]
+                for var, negation in zip(variables[1:], negations[1:]):
+                    np.take(chunk, var, axis=1, out=column)
+                    column ^= negation
+                    satisfied |= column
+                yield start, clauses, satisfied
+
+    def satisfied(self, assignments):
+        """
+            :param assignments: 2-D array (see `values`)
+            :returns: 2-D array of bool, whether each clause is satisfied by each
+                      assignment
+        """
+        result = np.zeros((len(assignments), self.clause_count), dtype=bool)
+        for start, clauses, satisfied in self.chunks(assignments):
+            result[start:start + len(satisfied), clauses] = satisfied
+        return result
+
+    def violated_counts(self, assignments):
+        """
+        Counts the violated clauses, without keeping the value of every clause
+        under every assignment.
+            :param assignments: 2-D array (see `values`)
+            :returns: array of int, the number of clauses violated by each assignment
+        """
+        counts = np.full(len(assignments), self.clause_count, dtype=np.int64)
+        for start, _, satisfied in self.chunks(assignments):
+            counts[start:start + len(satisfied)] -= satisfied.sum(axis=1)
+        return counts
+
+    def check(self, assignments):
+        """
+            :param assignments: 2-D array (see `values`)
+            :returns: array of bool, whether each assignment satisfies the formula
+        """
+        return self.violated_counts(assignments) == 0
+
+
+def assignments_from_models(models, size=None):
+    """
+    Builds the 2-D assignments of models given as lists of literals, the
+    variables missing from a model are FALSE.
+        :param models: list of models (iterable of int)
+        :param size: number of columns, the largest variable + 1 by default
+        :returns: 2-D array of bool
+    """
+    models = [np.asarray(list(model), dtype=np.int64) for model in models]
+    if size is None:
+        size = max((int(np.abs(model).max()) for model in models if len(model)), default=0) + 1
+    assignments = np.zeros((len(models), size), dtype=bool)
+    if models:
+        rows = np.repeat(np.arange(len(models)), [len(model) for model in models])
+        lits = np.concatenate(models)
+        positive = lits > 0
+        assignments[rows[positive], lits[positive]] = True
+    return assignments
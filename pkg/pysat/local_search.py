@@ -0,0 +1,279 @@
+"""
+Stochastic local search (probSAT and WalkSAT): many random walks over complete
+assignments, run in batch with NumPy
+"""
+import os
+import time
+import numpy as np
+from pkg.pysat.dimacs import ClauseBuffer, load_cnf
+from pkg.utils.constants import TRUE, FALSE
+from pkg.utils.logger import set_logger
+
+logger = set_logger()
+
+ALGORITHMS = ['probsat', 'walksat']
+
+
+class LocalSearch:
+    """
+    Searches a model by flipping one variable at a time in each of `walks`
+    independent random assignments, all flipped together at each step. A step
+    picks a random unsatisfied clause in each walk, and a variable of it to
+    flip from the break counts of its variables (the number of clauses that
+    would become unsatisfied):
+    - probsat: a variable with probability (eps + break) ^ -cb
+    - walksat: a variable with break 0 if any, else a random one with
+      probability `noise`, else one with the least break
+    The true literal counts of the clauses, the XOR of their true variables
+    (which is the only one when the count is 1) and the break counts of the
+    variables are (walks, clauses) and (walks, variables) arrays, updated from
+    the occurrences of the flipped variables. A walk restarts from a new random
+    assignment after `restart_flips` flips. Local search cannot prove a formula
+    UNSAT, it gives up instead.
+    """
+
+    def __init__(self, filename=None, algorithm='probsat', walks=32, restart_flips=None,
+                 cb=2.38, eps=1.0, noise=0.567, seed=None, binary_cache=False, clauses=None):
+        """
+            :param filename: the DIMACS CNF file to solve, or None with `clauses`
+            :param algorithm: 'probsat' or 'walksat'
+            :param walks: number of walks run together
+            :param restart_flips: flips of a walk before it restarts, defaults to
+                                  100 times the number of variables
+            :param cb: probsat: the base of the break counts, 2.38 suits 3-SAT
+            :param eps: probsat: added to the break counts
+            :param noise: walksat: probability of a random flip
+            :param seed: the seed of the random generator
+            :param binary_cache: whether to use the binary cache of the file
+            :param clauses: ClauseBuffer or iterable of clauses (iterable of int),
+                            the formula to solve when there is no file
+        """
+        if algorithm not in ALGORITHMS:
+            raise ValueError('unknown local search algorithm: {}'.format(algorithm))
+        logger.info('========= create local search from %s =========', filename)
+        self.filename = filename
+        if filename is not None:
+            clauses, variables = load_cnf(filename, binary_cache)
+        elif not isinstance(clauses, ClauseBuffer):
+            buffer = ClauseBuffer()
+            for clause in clauses or ():
+                buffer.append(clause)
+            clauses = buffer
+        if clauses.xors:
+            raise ValueError('local search does not support XOR clauses')
+        self.var_order = sorted(set(map(abs, clauses.lits)))
+        self.algorithm = algorithm
+        self.walks = walks
+        self.size = self.var_order[-1] + 1 if self.var_order else 1
+        self.restart_flips = restart_flips or 100 * self.size
+        self.cb, self.eps, self.noise = cb, eps, noise
+        self.rng = np.random.default_rng(seed)
+        self.empty = False
+        self.load(clauses)
+        self.flips = 0  # steps, each flips one variable in every walk
+        self.restarts = 0
+        self.interrupted = False
+        self.stop_reason = None
+        self.model = None  # variable -> bool, the satisfying assignment found
+        self.best = None  # variable -> bool, the assignment with the fewest unsatisfied clauses
+        self.best_unsat = None
+
+    @classmethod
+    def from_clauses(cls, clauses, **kwargs):
+        return cls(clauses=clauses, **kwargs)
+
+    def load(self, clauses):
+        """
+        Builds the clause matrix, padded with variable 0, and the occurrences of
+        the variables, sorted by variable. Duplicate literals and tautologies
+        are removed.
+        """
+        rows = []
+        for clause in clauses:
+            clause = set(clause)
+            if any(-lit in clause for lit in clause):
+                continue
+            if not clause:
+                self.empty = True
+            rows.append(sorted(clause))
+        width = max(map(len, rows), default=1) or 1
+        lits = np.zeros((len(rows), width), dtype=np.int32)
+        for i, row in enumerate(rows):
+            lits[i, :len(row)] = row
+        self.clause_vars = np.abs(lits)
+        self.clause_signs = lits > 0
+        self.clause_mask = lits != 0
+        flat = lits[self.clause_mask]
+        owners = np.nonzero(self.clause_mask)[0]
+        order = np.argsort(np.abs(flat), kind='stable')
+        self.occ_clauses = owners[order]
+        self.occ_signs = flat[order] > 0
+        self.occ_starts = np.searchsorted(np.abs(flat)[order], np.arange(self.size + 1))
+        logger.info('local search: %s clauses, %s variables, %s walks',
+                    len(rows), len(self.var_order), self.walks)
+
+    def restart(self, rows):
+        """ Gives the walks of `rows` new random assignments """
+        assign = self.rng.random((len(rows), self.size)) < 0.5
+        self.assign[rows] = assign
+        true = (assign[:, self.clause_vars] == self.clause_signs) & self.clause_mask
+        counts = true.sum(axis=2, dtype=np.int32)
+        self.true_counts[rows] = counts
+        self.true_xor[rows] = np.bitwise_xor.reduce(np.where(true, self.clause_vars, 0), axis=2)
+        # break counts: the clauses whose only true literal is of the variable
+        walk, clause = np.nonzero(counts == 1)
+        critical = self.true_xor[rows[walk], clause]
+        self.breaks[rows] = np.bincount(walk * self.size + critical,
+                                        minlength=len(rows) * self.size
+                                        ).reshape(len(rows), self.size)
+
+    def pick(self, walks, clauses):
+        """
+        Picks a variable to flip in a clause of each walk.
+            :returns: array of the variables
+        """
+        rows = np.arange(len(walks))
+        candidates = self.clause_vars[clauses]
+        valid = self.clause_mask[clauses]
+        breaks = self.breaks[walks[:, None], candidates]
+        if self.algorithm == 'probsat':
+            weights = np.where(valid, (self.eps + breaks) ** -self.cb, 0)
+            cumulative = np.cumsum(weights, axis=1)
+            draw = self.rng.random(len(walks)) * cumulative[:, -1]
+            choice = np.argmax(cumulative > draw[:, None], axis=1)
+        else:
+            ties = self.rng.random(candidates.shape)
+            greedy = np.argmin(np.where(valid, breaks + ties * 0.5, np.inf), axis=1)
+            random = np.argmax(np.where(valid, ties, -1), axis=1)
+            noisy = self.rng.random(len(walks)) < self.noise
+            freebie = breaks[rows, greedy] == 0
+            choice = np.where(noisy & ~freebie, random, greedy)
+        return candidates[rows, choice]
+
+    def flip(self, walks, variables):
+        """ Flips a variable in each walk, and updates the counts of their clauses """
+        values = ~self.assign[walks, variables]
+        self.assign[walks, variables] = values
+        starts = self.occ_starts[variables]
+        lengths = self.occ_starts[variables + 1] - starts
+        walk = np.repeat(walks, lengths)
+        var = np.repeat(variables, lengths)
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        occurrences = np.repeat(starts, lengths) + offsets
+        clause = self.occ_clauses[occurrences]
+        made_true = self.occ_signs[occurrences] == np.repeat(values, lengths)
+        counts = self.true_counts[walk, clause]
+        before = self.true_xor[walk, clause]
+        after = before ^ var
+        self.true_counts[walk, clause] = counts + np.where(made_true, 1, -1)
+        self.true_xor[walk, clause] = after
+        # made true: 0 -> 1, the variable becomes critical, 1 -> 2, the former
+        # critical variable no longer is. made false: 1 -> 0, the variable is
+        # no longer critical, 2 -> 1, the other true variable becomes critical
+        gain = made_true & (counts == 0)
+        lose = made_true & (counts == 1)
+        unbreak = ~made_true & (counts == 1)
+        critical = ~made_true & (counts == 2)
+        np.add.at(self.breaks, (walk[gain], var[gain]), 1)
+        np.subtract.at(self.breaks, (walk[lose], before[lose]), 1)
+        np.subtract.at(self.breaks, (walk[unbreak], var[unbreak]), 1)
+        np.add.at(self.breaks, (walk[critical], after[critical]), 1)
+
+    def interrupt(self):
+        """ Makes `solve` stop at its next step, and answer UNKNOWN """
+        self.interrupted = True
+
+    def solve(self, max_flips=None, seconds=None, stall=None):
+        """
+        Runs the walks until one of them satisfies the formula.
+            :param max_flips: stop after this many steps, None for no limit
+            :param seconds: stop after this many seconds, None for no limit
+            :param stall: stop when the fewest unsatisfied clauses of any walk
+                          did not improve for this many steps, None for never
+            :returns: True if a model is found (see `model`), False if the
+                      formula has an empty clause, else None (UNKNOWN, see
+                      `stop_reason`)
+        """
+        self.stop_reason = None
+        if self.empty:
+            return False
+        walks, clauses = self.walks, len(self.clause_vars)
+        self.assign = np.zeros((walks, self.size), dtype=bool)
+        self.true_counts = np.zeros((walks, clauses), dtype=np.int32)
+        self.true_xor = np.zeros((walks, clauses), dtype=np.int32)
+        self.breaks = np.zeros((walks, self.size), dtype=np.int32)
+        everyone = np.arange(walks)
+        self.restart(everyone)
+        # walk i restarts at steps i * restart_flips / walks modulo restart_flips
+        stagger = everyone * self.restart_flips // walks
+        deadline = time.perf_counter() + seconds if seconds is not None else float('inf')
+        self.best_unsat, improved = clauses + 1, 0
+        step = 0
+        while True:
+            unsat = self.true_counts == 0
+            counts = unsat.sum(axis=1)
+            best = int(np.argmin(counts))
+            if counts[best] < self.best_unsat:
+                self.best_unsat, improved = int(counts[best]), step
+                self.best = self.assign[best].copy()
+            if counts[best] == 0:
+                self.model = self.best
+                logger.info('model found by walk %s after %s flips', best, step)
+                return True
+            if max_flips is not None and step >= max_flips:
+                self.stop_reason = 'flips'
+            elif stall is not None and step - improved >= stall:
+                self.stop_reason = 'stalled'
+            elif self.interrupted:
+                self.stop_reason = 'interrupted'
+            elif step % 256 == 0 and time.perf_counter() >= deadline:
+                self.stop_reason = 'time'
+            if self.stop_reason:
+                logger.info('local search stopped (%s) after %s flips, best: %s unsatisfied clauses',
+                            self.stop_reason, step, self.best_unsat)
+                return None
+            # a random unsatisfied clause in each walk: the k-th one, k < counts
+            k = (self.rng.random(walks) * counts).astype(np.int64)
+            picked = np.argmax(np.cumsum(unsat, axis=1) > k[:, None], axis=1)
+            self.flip(everyone, self.pick(everyone, picked))
+            step += 1
+            self.flips += 1
+            due = np.nonzero((step + stagger) % self.restart_flips == 0)[0]
+            if len(due):
+                self.restart(due)
+                self.restarts += len(due)
+
+    def seed_phases(self, solver):
+        """
+        Sets the saved phases of a CDCL solver to the best assignment found, so
+        that its decisions start from it.
+            :param solver: a `pkg.pysat.solver.Solver` of the same formula
+        """
+        if self.best is None:
+            return
+        for var in self.var_order:
+            if var < len(solver.phases):
+                solver.phases[var] = TRUE if self.best[var] else FALSE
+
+    def output_answer(self, sat, time):
+        """
+            :param sat: True if SAT, False if UNSAT, None if UNKNOWN
+            :param time: the time spent
+        """
+        answer = os.linesep.join([
+            'c ====================',
+            'c pysat local search ({}) reading from {}',
+            'c ====================',
+            's {}',
+            'v {}',
+            'c Done (time: {:.2f} s, flips: {} in each of {} walks, restarts: {})'
+        ])
+        values = ' '.join(['{}{}'.format('' if self.model[k] else '-', k)
+                           for k in self.var_order]) if sat else ''
+        answer = answer.format(self.algorithm, self.filename,
+                               {True: 'SATISFIABLE', False: 'UNSATISFIABLE'}.get(sat, 'UNKNOWN'),
+                               values, time, self.flips, self.walks, self.restarts)
+        if sat is None:
+            answer += os.linesep + 'c Stopped: {} (best: {} unsatisfied clauses)'.format(
+                self.stop_reason, self.best_unsat)
+        return answer
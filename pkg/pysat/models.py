@@ -0,0 +1,91 @@
+"""
+Enumeration of all the models of a formula
+"""
+from pkg.utils.constants import TRUE
+from pkg.utils.logger import set_logger
+
+logger = set_logger()
+
+BLOCKING = ['decisions', 'clause']
+
+
+class ModelEnumerator:
+    """
+    Finds the models of a formula one after another with the same solver, so
+    the learnt clauses and the heuristics state are kept from a model to the
+    next. The next model must differ on the projection variables:
+    - clause: the negation of the model, on the projection variables, is
+      added to the formula as a blocking clause
+    - decisions: no clause is added. The decisions that led to a model imply
+      it (the solver decides the projection variables first, see
+      `Solver.priority`), and the search goes on by chronological
+      backtracking over them: the last decision not flipped yet is flipped,
+      and the ones after it dropped. The path of decisions is passed to the
+      solver as assumptions, so the flipped decisions only constrain the
+      searches under them, and a path without models is cut down to the
+      assumptions in conflict (see `Solver.core`). The formula does not grow
+      with the models, and the learnt clauses stay consequences of it.
+    """
+
+    def __init__(self, solver, projection=None, blocking='decisions', max_models=None):
+        """
+            :param solver: a solver of the formula, without simplification
+            :param projection: list of the variables models are told apart by,
+                               all the variables by default
+            :param blocking: 'decisions' or 'clause'
+            :param max_models: stop after this many models, None for no limit
+        """
+        if blocking not in BLOCKING:
+            raise ValueError('unknown blocking: {}'.format(blocking))
+        self.solver = solver
+        self.projection = sorted(projection) if projection is not None else None
+        self.blocking = blocking
+        self.max_models = max_models
+        self.count = 0
+        self.complete = False  # whether all the models were found
+
+    def __iter__(self):
+        """
+        Yields the models, as lists of the TRUE literals of the projection
+        variables. Stops when all of them are found (then `complete` is True),
+        at `max_models`, or when the solver answers UNKNOWN.
+        """
+        solver = self.solver
+        solver.add_vars(self.projection or ())
+        projection = self.projection if self.projection is not None else list(solver.var_order)
+        if self.blocking == 'decisions' and self.projection is not None:
+            solver.priority = list(projection)
+        projected = set(projection)
+        path, flipped = [], []  # the decisions of the search, and whether each was flipped
+        while self.max_models is None or self.count < self.max_models:
+            sat = solver.solve(path if self.blocking == 'decisions' else ())
+            if sat is None:
+                return
+            if sat:
+                self.count += 1
+                model = [v if solver.assigns[v] == TRUE else -v for v in projection]
+                if self.blocking == 'clause':
+                    logger.debug('model %s', self.count)
+                    yield model
+                    solver.add_clause([-lit for lit in model])
+                    continue
+                decisions = [solver.trail[start] for start in solver.trail_lim[len(path):]
+                             if abs(solver.trail[start]) in projected]
+                path += decisions
+                flipped += [False] * len(decisions)
+                logger.debug('model %s, under %s', self.count, path)
+                yield model
+            elif self.blocking == 'clause':
+                self.complete = True
+                return
+            else:
+                # no model under the path, nor under its first assumption in conflict
+                depth = max(map(path.index, solver.core), default=-1) + 1
+                del path[depth:], flipped[depth:]
+            while flipped and flipped[-1]:
+                path.pop()
+                flipped.pop()
+            if not path:
+                self.complete = True
+                return
+            path[-1], flipped[-1] = -path[-1], True
@@ -0,0 +1,114 @@
+"""
+Portfolio solving: several solver configurations race on the same formula
+"""
+import multiprocessing
+import os
+import random
+import time
+from collections import namedtuple
+from pkg.pysat import branch_heuristics as solvers
+from pkg.pysat import restarts
+from pkg.utils.logger import set_logger
+
+logger = set_logger()
+
+# the heuristics and restart strategies configurations are picked from, most
+# robust first, so that small portfolios get the strongest configurations
+HEURISTICS = [
+    'VariableStateIndependentDecayingSumSolver',
+    'DynamicLargestIndividualSumSolver',
+    'FrequentVarsFirstSolver',
+    'RandomChoiceSolver',
+    'OrderedChoiceSolver',
+]
+RESTARTS = ['glucose', 'luby', 'none', 'geometric']
+
+Config = namedtuple('Config', ['heuristics', 'seed', 'restart'])
+
+
+def configurations(size):
+    """
+    Makes `size` different configurations. Heuristics and restart strategies are
+    cycled together, as their counts are coprime, the first 20 configurations
+    are all their combinations.
+        :param size: number of configurations
+        :returns: list of Config
+    """
+    return [Config(HEURISTICS[i % len(HEURISTICS)], i, RESTARTS[i % len(RESTARTS)])
+            for i in range(size)]
+
+
+def describe(config):
+    return '{} seed={} restart={}'.format(*config)
+
+
+def solve_config(filename, index, config, results, options, exchange=None):
+    """
+    Solves the formula with one configuration, in a worker process, and puts
+    (index, sat, time, answer) on `results`, or (index, None, 0, error) if the
+    solver raised an exception. With an `exchange`, the worker shares its
+    learnt clauses with the others.
+    """
+    try:
+        random.seed(config.seed)
+        if exchange is not None:
+            options = dict(options, sharing=exchange.worker(index))
+        solver = getattr(solvers, config.heuristics)(
+            filename, restart=restarts.STRATEGIES[config.restart](), **options)
+        sat, spent, answer = solver.run()
+        if exchange is not None:
+            solver.sharing.publish(solver.stats)
+        results.put((index, sat, spent, answer))
+    except Exception as e:
+        results.put((index, None, 0, e))
+
+
+def race(filename, configs, jobs=None, exchange=None, **options):
+    """
+    Solves the formula with every configuration in parallel, up to `jobs` processes
+    at a time, and returns the first answer. The processes still running are then
+    terminated. A configuration only starts when a running one failed.
+        :param filename: the DIMACS CNF file to solve
+        :param configs: list of Config
+        :param jobs: maximum number of processes, the number of CPUs by default
+        :param exchange: `pkg.pysat.sharing.ClauseExchange` with a ring per
+                         configuration, for the workers to share their learnt
+                         clauses, None to race them independently
+        :param options: other keyword arguments of the solvers
+        :raises Exception: the error of the last configuration, if all of them failed
+        :returns: (winning Config, sat, time, answer)
+    """
+    jobs = min(jobs or os.cpu_count() or 1, len(configs))
+    results = multiprocessing.Queue()
+    waiting = list(enumerate(configs))
+    running = {}
+
+    def start():
+        index, config = waiting.pop(0)
+        process = multiprocessing.Process(
+            target=solve_config, args=(filename, index, config, results, options, exchange),
+            daemon=True)
+        process.start()
+        running[index] = process
+
+    start_time = time.time()
+    try:
+        while waiting and len(running) < jobs:
+            start()
+        while running:
+            index, sat, spent, answer = results.get()
+            running.pop(index).join()
+            if sat is None:
+                logger.warning('%s failed: %r', describe(configs[index]), answer)
+                if not running and not waiting:
+                    raise answer
+                if waiting:
+                    start()
+                continue
+            logger.info('%s won after %.2f s', describe(configs[index]), time.time() - start_time)
+            return configs[index], sat, spent, answer
+    finally:
+        for process in running.values():
+            process.terminate()
+        for process in running.values():
+            process.join()
@@ -0,0 +1,256 @@
+"""
+CNF simplification before search
+"""
+import time
+from pkg.utils.logger import set_logger
+
+logger = set_logger()
+
+STAGES = ['units', 'pure', 'subsume', 'eliminate', 'probe']
+
+
+class Simplifier:
+    """
+    Simplifies a set of clauses with occurrence lists (literal -> clauses):
+    - units: assigns unit clauses, removes the satisfied clauses and the false literals
+    - pure: assigns the literals whose negation appears nowhere
+    - subsume: backward subsumption, and self-subsuming resolution (strengthening)
+    - eliminate: bounded variable elimination, replaces the clauses of a variable
+                 by their resolvents when that does not add clauses
+    - probe: failed literal probing, a literal whose propagation conflicts is FALSE
+
+    The assigned literals (`assigned`) hold in a model of the simplified clauses.
+    The clauses removed by variable elimination are kept on a stack, to give the
+    eliminated variables their values once a model is found (`extend_model`).
+    """
+
+    def __init__(self, clauses, stages=STAGES, max_resolvent=20, max_occurrences=16,
+                 probe_limit=1000):
+        """
+            :param clauses: iterable of clauses (iterable of int)
+            :param stages: names of the stages to run, in `STAGES` order
+            :param max_resolvent: longest resolvent variable elimination may add
+            :param max_occurrences: variables occurring more often are not eliminated
+            :param probe_limit: maximum number of variables to probe
+        """
+        self.stages = [s for s in STAGES if s in stages]
+        self.max_resolvent = max_resolvent
+        self.max_occurrences = max_occurrences
+        self.probe_limit = probe_limit
+        self.clauses = []  # clause index -> frozenset of int, None once removed
+        self.occurs = {}  # literal -> set of clause indices
+        self.values = {}  # variable -> TRUE literal, for the assigned variables
+        self.assigned = []  # assigned literals, in order
+        self.pending = []  # unit literals to assign
+        self.eliminated = []  # eliminated variables
+        self.stack = []  # (witness literal, clause) removed by variable elimination
+        self.report = []  # (stage, seconds, clauses removed, variables removed)
+        self.unsat = False
+        for clause in clauses:
+            clause = frozenset(clause)
+            if not any(-lit in clause for lit in clause):
+                self.add(clause)
+
+    def __iter__(self):
+        """ Iterates the remaining clauses """
+        return (c for c in self.clauses if c is not None)
+
+    def count_clauses(self):
+        return sum(1 for c in self.clauses if c is not None)
+
+    def count_vars(self):
+        return len(set(abs(lit) for lit, occ in self.occurs.items() if occ))
+
+    def add(self, clause):
+        if not clause:
+            self.unsat = True
+            return
+        if len(clause) == 1:
+            self.pending.extend(clause)
+        index = len(self.clauses)
+        self.clauses.append(clause)
+        for lit in clause:
+            self.occurs.setdefault(lit, set()).add(index)
+            self.occurs.setdefault(-lit, set())
+
+    def remove(self, index):
+        for lit in self.clauses[index]:
+            self.occurs[lit].discard(index)
+        self.clauses[index] = None
+
+    def strengthen(self, index, lit):
+        """ Removes a FALSE (or redundant) literal from a clause """
+        clause = self.clauses[index] - {lit}
+        self.occurs[lit].discard(index)
+        self.clauses[index] = clause
+        if not clause:
+            self.unsat = True
+        elif len(clause) == 1:
+            self.pending.extend(clause)
+
+    def run(self, stop=None):
+        """
+        Runs the stages in order, assigning the found units after each of them.
+            :param stop: called before each stage, the stages left are skipped
+                         once it returns True (the clauses are simplified by
+                         the stages run so far)
+            :returns: False if the clauses are found UNSAT, else True
+        """
+        for stage in self.stages:
+            if stop is not None and stop():
+                logger.info('stopped before %s', stage)
+                break
+            start, clauses, variables = time.time(), self.count_clauses(), self.count_vars()
+            getattr(self, stage)()
+            self.units()
+            self.report.append((stage, time.time() - start,
+                                clauses - self.count_clauses(), variables - self.count_vars()))
+            logger.info('%s: %.3f s, %s clauses and %s variables removed', *self.report[-1])
+            if self.unsat:
+                return False
+        return True
+
+    def units(self):
+        while self.pending and not self.unsat:
+            lit = self.pending.pop()
+            value = self.values.get(abs(lit))
+            if value is not None:
+                self.unsat = value != lit
+                continue
+            self.values[abs(lit)] = lit
+            self.assigned.append(lit)
+            for index in list(self.occurs[lit]):
+                self.remove(index)
+            for index in list(self.occurs[-lit]):
+                self.strengthen(index, -lit)
+
+    def pure(self):
+        changed = True
+        while changed and not self.unsat:
+            changed = False
+            for lit, occ in list(self.occurs.items()):
+                if occ and not self.occurs[-lit] and abs(lit) not in self.values:
+                    self.pending.append(lit)
+                    self.units()
+                    changed = True
+
+    def subsume(self):
+        """
+        Clause C subsumes D if C is a subset of D, then D is removed. If C is a
+        subset of D except for one literal l, with -l in D, then -l is removed
+        from D (self-subsuming resolution). Both kinds of D contain the literal of
+        C with the fewest occurrences, or its negation.
+        """
+        occurs, clauses = self.occurs, self.clauses
+        queue = sorted((i for i, c in enumerate(clauses) if c is not None),
+                       key=lambda i: len(clauses[i]), reverse=True)
+        while queue and not self.unsat:
+            i = queue.pop()
+            c = clauses[i]
+            if c is None:
+                continue
+            best = min(c, key=lambda l: len(occurs[l]) + len(occurs[-l]))
+            for lit in (best, -best):
+                for j in list(occurs[lit]):
+                    d = clauses[j]
+                    if j == i or d is None or len(d) < len(c):
+                        continue
+                    diff = [l for l in c if l not in d]
+                    if not diff:
+                        self.remove(j)
+                    elif len(diff) == 1 and -diff[0] in d:
+                        self.strengthen(j, -diff[0])
+                        queue.append(j)  # the shorter clause may subsume others
+            self.units()
+
+    def eliminate(self):
+        occurs, clauses = self.occurs, self.clauses
+        candidates = sorted(
+            (lit for lit in occurs if lit > 0 and lit not in self.values),
+            key=lambda v: len(occurs[v]) * len(occurs[-v]))
+        for var in candidates:
+            if self.unsat:
+                break
+            pos, neg = list(occurs[var]), list(occurs[-var])
+            if not pos and not neg or var in self.values:
+                continue
+            if len(pos) + len(neg) > self.max_occurrences:
+                continue
+            resolvents = set()
+            for i in pos:
+                for j in neg:
+                    resolvent = (clauses[i] - {var}) | (clauses[j] - {-var})
+                    if not any(-lit in resolvent for lit in resolvent):
+                        resolvents.add(resolvent)
+                if (len(resolvents) > len(pos) + len(neg) or
+                        any(len(r) > self.max_resolvent for r in resolvents)):
+                    break
+            else:
+                for i in pos:
+                    self.stack.append((var, clauses[i]))
+                    self.remove(i)
+                for j in neg:
+                    self.stack.append((-var, clauses[j]))
+                    self.remove(j)
+                for resolvent in resolvents:
+                    self.add(resolvent)
+                self.eliminated.append(var)
+                self.units()
+
+    def probe(self):
+        """ Probes the variables of binary clauses, both ways """
+        candidates = sorted(set(abs(lit) for c in self.clauses if c is not None and len(c) == 2
+                                for lit in c))
+        for var in candidates[:self.probe_limit]:
+            for lit in (var, -var):
+                if self.unsat or var in self.values:
+                    break
+                if not self.propagates(lit):
+                    logger.fine('failed literal: %s', lit)
+                    self.pending.append(-lit)
+                    self.units()
+
+    def propagates(self, lit):
+        """
+        Unit propagates `lit` over the clauses, without changing them.
+            :returns: False on conflict, else True
+        """
+        values = {abs(lit): lit}
+        queue = [lit]
+        while queue:
+            true_lit = queue.pop()
+            for index in self.occurs[-true_lit]:
+                unassigned = None
+                for l in self.clauses[index]:
+                    value = values.get(abs(l), self.values.get(abs(l)))
+                    if value == l:
+                        break
+                    if value is None:
+                        if unassigned is not None:
+                            break
+                        unassigned = l
+                else:
+                    if unassigned is None:
+                        return False
+                    values[abs(unassigned)] = unassigned
+                    queue.append(unassigned)
+        return True
+
+    def extend_model(self, value):
+        """
+        Gives values to the eliminated variables, so that all the clauses they
+        were removed with are satisfied.
+            :param value: function, literal -> True if the literal is TRUE
+            :returns: the TRUE literals of the eliminated variables
+        """
+        model = {}
+
+        def is_true(lit):
+            return model[abs(lit)] == lit if abs(lit) in model else value(lit)
+
+        for var in self.eliminated:
+            model[var] = -var
+        for witness, clause in reversed(self.stack):
+            if not any(is_true(lit) for lit in clause):
+                model[abs(witness)] = witness
+        return list(model.values())
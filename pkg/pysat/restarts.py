@@ -0,0 +1,121 @@
+"""
+Restart strategies for the CDCL solver
+"""
+from collections import deque
+
+
+class NoRestart:
+    """ Never restarts """
+
+    def conflict(self, lbd):
+        """
+        Records a conflict, and tells whether the solver should restart now.
+            :param lbd: the LBD of the clause learnt from the conflict
+            :returns: True to restart
+        """
+        return False
+
+    def state(self):
+        """ The counters of the strategy, as JSON values, for checkpoints """
+        return dict((name, list(value) if isinstance(value, deque) else value)
+                    for name, value in vars(self).items())
+
+    def restore(self, state):
+        """ Restores the counters saved by `state` """
+        for name, value in state.items():
+            current = getattr(self, name, None)
+            setattr(self, name, deque(value, maxlen=current.maxlen)
+                    if isinstance(current, deque) else value)
+
+
+class LubyRestart(NoRestart):
+    """
+    Restarts after `unit` * luby(i) conflicts in the i-th run, where luby is the
+    sequence 1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8, ...
+    """
+
+    def __init__(self, unit=100):
+        self.unit = unit
+        self.runs = 0
+        self.conflicts = 0
+        self.limit = unit * luby(0)
+
+    def conflict(self, lbd):
+        self.conflicts += 1
+        if self.conflicts < self.limit:
+            return False
+        self.runs += 1
+        self.conflicts = 0
+        self.limit = self.unit * luby(self.runs)
+        return True
+
+
+class GeometricRestart(NoRestart):
+    """ Restarts after `first` conflicts, and the limit grows by `factor` after each restart """
+
+    def __init__(self, first=100, factor=1.5):
+        self.factor = factor
+        self.conflicts = 0
+        self.limit = first
+
+    def conflict(self, lbd):
+        self.conflicts += 1
+        if self.conflicts < self.limit:
+            return False
+        self.conflicts = 0
+        self.limit *= self.factor
+        return True
+
+
+class GlucoseRestart(NoRestart):
+    """
+    Glucose dynamic restarts: restarts when the average LBD of the last `window`
+    learnt clauses, scaled by `k`, is above the average LBD of all learnt clauses,
+    i.e. when the recent learnt clauses are worse than usual.
+    """
+
+    def __init__(self, window=50, k=0.8):
+        self.k = k
+        self.recent = deque(maxlen=window)
+        self.recent_sum = 0
+        self.total_sum = 0
+        self.total_count = 0
+
+    def conflict(self, lbd):
+        if len(self.recent) == self.recent.maxlen:
+            self.recent_sum -= self.recent[0]
+        self.recent.append(lbd)
+        self.recent_sum += lbd
+        self.total_sum += lbd
+        self.total_count += 1
+        if (len(self.recent) < self.recent.maxlen or
+                self.recent_sum / len(self.recent) * self.k <= self.total_sum / self.total_count):
+            return False
+        self.recent.clear()
+        self.recent_sum = 0
+        return True
+
+
+def luby(i):
+    """
+    Returns the i-th (0-based) number of the Luby sequence
+        :param i: index in the sequence
+        :returns: 1, 1, 2, 1, 1, 2, 4, ... for i = 0, 1, 2, ...
+    """
+    size, seq = 1, 0
+    while size < i + 1:
+        seq += 1
+        size = 2 * size + 1
+    while size - 1 != i:
+        size = (size - 1) >> 1
+        seq -= 1
+        i = i % size
+    return 1 << seq
+
+
+STRATEGIES = {
+    'none': NoRestart,
+    'luby': LubyRestart,
+    'geometric': GeometricRestart,
+    'glucose': GlucoseRestart,
+}
@@ -0,0 +1,291 @@
+"""
+Solver service: a pool of warm worker processes solving jobs sent over stdin
+or a Unix socket, one JSON object per line
+"""
+import io
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+from collections import deque
+from multiprocessing.connection import wait
+from pkg.pysat import branch_heuristics as solvers
+from pkg.pysat import restarts
+from pkg.pysat.budget import Budget
+from pkg.pysat.dimacs import read_dimacs
+from pkg.utils.logger import set_logger
+
+logger = set_logger()
+
+
+def solve_request(job):
+    """
+    Solves a job of the service. A job is a dict with:
+    - id: anything, returned with the result
+    - cnf: the DIMACS text of the formula, or file: the path of a DIMACS file
+    - heuristics: the name of a solver class (default FrequentVarsFirstSolver)
+    - restart: a restart strategy of `pkg.pysat.restarts.STRATEGIES` (default none)
+    - phase_saving: bool (default True)
+    - budget: dict of the arguments of `pkg.pysat.budget.Budget`, learnt_memory
+      being in MB as `--max-learnt-memory` (default none)
+    - assumptions: list of int (default none)
+        :returns: dict of the id, sat (True, False or None if UNKNOWN), the time
+                  spent, and the answer in the format of `Solver.output_answer`,
+                  or of the id and the error
+    """
+    try:
+        start = time.time()
+        if 'cnf' in job:
+            clauses, _ = read_dimacs(io.BytesIO(job['cnf'].encode()))
+            name = 'job {}'.format(job.get('id'))
+        else:
+            clauses, _ = read_dimacs(job['file'])
+            name = job['file']
+        budget = dict(job.get('budget') or {})
+        if budget.get('learnt_memory') is not None:
+            budget['learnt_memory'] *= 1e6
+        solver = getattr(solvers, job.get('heuristics', 'FrequentVarsFirstSolver')).from_clauses(
+            clauses, restart=restarts.STRATEGIES[job.get('restart', 'none')](),
+            phase_saving=job.get('phase_saving', True),
+            budget=Budget(**budget) if budget else None)
+        solver.filename = name
+        sat = solver.solve(job.get('assumptions', ()))
+        spent = time.time() - start
+        return {'id': job.get('id'), 'sat': sat, 'time': spent,
+                'answer': solver.output_answer(sat, spent)}
+    except Exception as e:
+        return {'id': job.get('id'), 'error': '{}: {}'.format(type(e).__name__, e)}
+
+
+def work(conn, level):
+    """ The loop of a worker process: solves the jobs received until None """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl-C stops the server, which stops the workers
+    logger.setLevel(level)
+    while True:
+        job = conn.recv()
+        if job is None:
+            break
+        conn.send(solve_request(job))
+
+
+class WorkerPool:
+    """
+    Worker processes started once and kept for all the jobs, so the jobs do not
+    pay for the start of the interpreter and the imports. Jobs are queued by
+    `submit` from any thread, and a dispatcher thread sends them to the idle
+    workers, and calls the callbacks of the jobs with their results, which must
+    not block. A worker that dies is replaced, and its job gets an error.
+    """
+
+    def __init__(self, processes=None):
+        """
+            :param processes: number of workers, the number of CPUs by default
+        """
+        self.processes = processes or os.cpu_count() or 1
+        self.pending = deque()  # (job, callback)
+        self.lock = threading.Lock()
+        self.idle = []  # connections to the idle workers
+        self.busy = {}  # connection -> (job, callback)
+        self.workers = {}  # connection -> process
+        self.wakeup, self.waker = multiprocessing.Pipe(duplex=False)
+        self.closed = False
+        for _ in range(self.processes):
+            self.start_worker()
+        self.dispatcher = threading.Thread(target=self.dispatch, daemon=True)
+        self.dispatcher.start()
+
+    def start_worker(self):
+        conn, child = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=work, args=(child, logger.level), daemon=True)
+        process.start()
+        child.close()
+        self.workers[conn] = process
+        self.idle.append(conn)
+
+    def submit(self, job, callback):
+        """
+        Queues a job.
+            :param job: dict (see `solve_request`)
+            :param callback: called with the result, from the dispatcher thread
+        """
+        with self.lock:
+            if self.closed:
+                raise ValueError('the pool is closed')
+            self.pending.append((job, callback))
+        self.waker.send_bytes(b'')
+
+    def cancel(self, callback):
+        """
+        Drops the jobs queued with a callback, and not sent to a worker yet.
+            :returns: the number of jobs dropped
+        """
+        with self.lock:
+            kept = deque((job, other) for job, other in self.pending if other != callback)
+            dropped = len(self.pending) - len(kept)
+            self.pending = kept
+        return dropped
+
+    def dispatch(self):
+        while True:
+            with self.lock:
+                while self.pending and self.idle:
+                    conn = self.idle.pop()
+                    job, callback = self.pending.popleft()
+                    conn.send(job)
+                    self.busy[conn] = (job, callback)
+                if self.closed and not self.pending and not self.busy:
+                    return
+            for conn in wait([self.wakeup] + list(self.busy)):
+                if conn is self.wakeup:
+                    conn.recv_bytes()
+                    continue
+                job, callback = self.busy.pop(conn)
+                try:
+                    result = conn.recv()
+                    self.idle.append(conn)
+                except (EOFError, OSError):
+                    logger.warning('worker of job %s died, restarting it', job.get('id'))
+                    self.workers.pop(conn).join()
+                    conn.close()
+                    self.start_worker()
+                    result = {'id': job.get('id'), 'error': 'worker died'}
+                try:
+                    callback(result)
+                except Exception:
+                    logger.exception('the callback of job %s failed', job.get('id'))
+
+    def close(self):
+        """ Waits for the jobs queued, then stops the workers """
+        with self.lock:
+            self.closed = True
+        self.waker.send_bytes(b'')
+        self.dispatcher.join()
+        for conn, process in self.workers.items():
+            conn.send(None)
+            process.join()
+            conn.close()
+
+
+class Stream:
+    """
+    Reads jobs from a text stream, and writes their results to another as they
+    complete, so a client can send many jobs without waiting (pipelining). The
+    results may come back in another order than the jobs, the ids tell them
+    apart. The results are written by a thread of the stream, so a client slow
+    to read them only blocks its own stream, not the dispatcher of the pool.
+    Once the output fails (the client is gone), the jobs of the stream still
+    queued are dropped, and the results of the others are discarded.
+    """
+
+    def __init__(self, pool, output):
+        self.pool = pool
+        self.output = output
+        self.lock = threading.Lock()
+        self.done = threading.Condition(self.lock)
+        self.running = 0
+        self.broken = False
+        self.results = queue.SimpleQueue()  # results to write, then None
+        self.writer = threading.Thread(target=self.write_results, daemon=True)
+        self.writer.start()
+
+    def write(self, result):
+        """ Queues a result to write, called by the dispatcher of the pool """
+        self.results.put(result)
+
+    def write_results(self):
+        while True:
+            result = self.results.get()
+            if result is None:
+                break
+            dropped = 0
+            if not self.broken:
+                try:
+                    self.output.write(json.dumps(result) + '\n')
+                    self.output.flush()
+                except (OSError, ValueError) as e:  # ValueError: the output is closed
+                    logger.info('client gone (%s), dropping its jobs', e)
+                    self.broken = True
+                    dropped = self.pool.cancel(self.write)
+            with self.lock:
+                self.running -= 1 + dropped
+                self.done.notify_all()
+
+    def serve(self, lines):
+        """ Submits the jobs of the lines, then waits for their results """
+        try:
+            self.submit_lines(lines)
+            with self.lock:
+                while self.running:
+                    self.done.wait()
+        finally:
+            self.results.put(None)
+            self.writer.join()
+
+    def submit_lines(self, lines):
+        for line in lines:
+            if self.broken:
+                break
+            if not line.strip():
+                continue
+            with self.lock:
+                self.running += 1
+            try:
+                job = json.loads(line)
+                if not isinstance(job, dict):
+                    raise ValueError('a job must be a JSON object')
+            except ValueError as e:
+                self.write({'error': 'invalid job: {}'.format(e)})
+                continue
+            self.pool.submit(job, self.write)
+
+
+def serve_stdio(pool):
+    """ Solves the jobs of stdin, and writes their results to stdout """
+    Stream(pool, sys.stdout).serve(sys.stdin)
+
+
+def serve_socket(pool, path):
+    """
+    Listens on a Unix socket, each connection is a stream of jobs (see `Stream`),
+    served by its own thread, until the process is interrupted.
+    """
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            Stream(pool, io.TextIOWrapper(self.wfile, write_through=True)).serve(
+                io.TextIOWrapper(self.rfile))
+
+    if os.path.exists(path):
+        os.unlink(path)
+    with socketserver.ThreadingUnixStreamServer(path, Handler) as server:
+        server.daemon_threads = True
+        logger.info('serving on %s with %s workers', path, pool.processes)
+        try:
+            server.serve_forever()
+        finally:
+            os.unlink(path)
+
+
+def submit_all(path, jobs):
+    """
+    A client of the socket: sends all the jobs on one connection, then reads
+    the results as they come.
+        :param path: the Unix socket of the service
+        :param jobs: iterable of jobs (dict)
+        :returns: iterator of the results (dict)
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(path)
+        with client.makefile('rw') as f:
+            for job in jobs:
+                f.write(json.dumps(job) + '\n')
+            f.flush()
+            client.shutdown(socket.SHUT_WR)
+            for line in f:
+                yield json.loads(line)
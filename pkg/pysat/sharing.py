@@ -0,0 +1,187 @@
+"""
+Clause sharing between parallel solvers: each worker exports its short learnt
+clauses to its own ring buffer in shared memory, and imports the clauses of
+the other workers when it is back at level 0
+"""
+from array import array
+from multiprocessing import shared_memory
+
+COUNTERS = ['head', 'exported', 'imported', 'useful']  # the int64 header of a ring
+CAPACITY = 1 << 16  # int32 per ring
+MAX_SIZE = 8  # longest clause exported
+MAX_LBD = 3  # largest LBD of a clause exported
+
+
+def checksum(lits):
+    """ The hash of a sorted clause, as an int32 """
+    return (hash(lits) & 0xffffffff) - (1 << 31)
+
+
+class ClauseRing:
+    """
+    A ring buffer of clauses in shared memory, with one writer and any number
+    of readers, and no lock. The header holds int64 counters (see `COUNTERS`),
+    the first one (the head) being the number of ints ever written, then come
+    `capacity` int32. A clause is written as its size, its LBD, its checksum and
+    its sorted literals, wrapping around at the end of the ring, and the head
+    is moved past it only once it is written. Each reader keeps its own
+    position in the ring: when the writer is a whole lap ahead, the clauses in
+    between are lost. A reader checks the head again after copying clauses, and
+    drops them if the writer may have overwritten them meanwhile, then checks
+    the checksum of each clause, so that it never imports a torn clause.
+    """
+
+    def __init__(self, capacity=CAPACITY, name=None):
+        """
+            :param capacity: number of int32 of the ring
+            :param name: the shared memory of an existing ring, None to create one
+        """
+        header = 8 * len(COUNTERS)
+        self.capacity = capacity
+        self.memory = shared_memory.SharedMemory(name=name, create=name is None,
+                                                 size=header + 4 * capacity)
+        self.counters = self.memory.buf[:header].cast('q')
+        self.ints = self.memory.buf[header:header + 4 * capacity].cast('i')
+
+    def __getstate__(self):
+        return self.memory.name, self.capacity
+
+    def __setstate__(self, state):
+        name, capacity = state
+        self.__init__(capacity, name)
+
+    @property
+    def head(self):
+        return self.counters[0]
+
+    def write(self, lits, lbd, check):
+        """
+        Appends a clause, overwriting the oldest ones.
+            :param lits: tuple of int, sorted
+            :param check: its checksum
+        """
+        entry = array('i', [len(lits), lbd, check])
+        entry.extend(lits)
+        if len(entry) > self.capacity:
+            return
+        head = self.counters[0]
+        start = head % self.capacity
+        split = min(len(entry), self.capacity - start)
+        self.ints[start:start + split] = entry[:split]
+        self.ints[:len(entry) - split] = entry[split:]
+        self.counters[0] = head + len(entry)
+
+    def read(self, position):
+        """
+        Reads the clauses written since `position`.
+            :returns: (the head, list of (tuple of int, LBD, checksum))
+        """
+        head = self.counters[0]
+        if head - position > self.capacity:
+            return head, []  # lapped
+        start, end = position % self.capacity, head % self.capacity
+        if start <= end and head - position < self.capacity:
+            data = self.ints[start:end].tolist()
+        else:
+            data = self.ints[start:].tolist() + self.ints[:end].tolist()
+        if self.counters[0] - position > self.capacity:
+            return self.counters[0], []  # overwritten while copying
+        clauses = []
+        i = 0
+        while i + 3 <= len(data):
+            size, lbd, check = data[i:i + 3]
+            lits = tuple(data[i + 3:i + 3 + size])
+            i += 3 + size
+            if len(lits) == size and checksum(lits) == check:
+                clauses.append((lits, lbd, check))
+        return head, clauses
+
+    def close(self):
+        self.counters.release()
+        self.ints.release()
+        self.memory.close()
+
+
+class ClauseExchange:
+    """
+    The rings of the workers of a parallel run, one per worker, created by the
+    parent process before starting the workers, which get their `Sharing`.
+    """
+
+    def __init__(self, workers, capacity=CAPACITY, max_size=MAX_SIZE, max_lbd=MAX_LBD):
+        """
+            :param workers: number of workers
+            :param capacity: number of int32 of the ring of each worker
+            :param max_size: longest learnt clause exported
+            :param max_lbd: largest LBD of a learnt clause exported
+        """
+        self.rings = [ClauseRing(capacity) for _ in range(workers)]
+        self.max_size = max_size
+        self.max_lbd = max_lbd
+
+    def worker(self, index):
+        return Sharing(self.rings, index, self.max_size, self.max_lbd)
+
+    def totals(self):
+        """ Sums the counters of the workers (see `Sharing.publish`) """
+        return dict((name, sum(ring.counters[i] for ring in self.rings))
+                    for i, name in enumerate(COUNTERS) if i)
+
+    def close(self):
+        """ Frees the shared memory, once the workers are done """
+        for ring in self.rings:
+            ring.close()
+            ring.memory.unlink()
+
+
+class Sharing:
+    """
+    The clause exchange seen from one worker, given to its solver: learnt
+    clauses up to `max_size` literals and `max_lbd` are written to the ring of
+    the worker, and the clauses of the rings of the other workers are read
+    from where the worker stopped. A clause exported or imported once is not
+    exported or imported again, by its hash.
+    """
+
+    def __init__(self, rings, index, max_size=MAX_SIZE, max_lbd=MAX_LBD):
+        self.own = rings[index]
+        self.peers = [ring for i, ring in enumerate(rings) if i != index]
+        self.positions = [0] * len(self.peers)
+        self.max_size = max_size
+        self.max_lbd = max_lbd
+        self.known = set()  # checksums of the clauses exported or imported
+
+    def export(self, clause, lbd):
+        """
+        Exports a learnt clause, if short enough and of a small enough LBD.
+            :returns: whether the clause was exported
+        """
+        if len(clause) > self.max_size or lbd > self.max_lbd:
+            return False
+        lits = tuple(sorted(clause))
+        check = checksum(lits)
+        if check in self.known:
+            return False
+        self.known.add(check)
+        self.own.write(lits, lbd, check)
+        return True
+
+    def receive(self):
+        """
+        Reads the clauses the other workers exported since the last call.
+            :returns: list of (tuple of int, LBD)
+        """
+        received = []
+        for i, peer in enumerate(self.peers):
+            self.positions[i], clauses = peer.read(self.positions[i])
+            for lits, lbd, check in clauses:
+                if check not in self.known:
+                    self.known.add(check)
+                    received.append((lits, lbd))
+        return received
+
+    def publish(self, stats):
+        """ Copies the sharing counters of a solver to the ring of the worker """
+        self.own.counters[1] = stats.exported
+        self.own.counters[2] = stats.imported
+        self.own.counters[3] = stats.useful_imports
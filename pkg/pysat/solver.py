@@ -1,143 +1,772 @@
 """
 SAT solver using CDCL
 """
+import logging
 import os
+import random
 import time
-from collections import deque
+from array import array
+from bisect import bisect_left, insort
+from itertools import islice
+from pkg.pysat.arena import ClauseArena, HEADER
+from pkg.pysat.cache import fingerprint as cache_fingerprint
+from pkg.pysat.dimacs import ClauseBuffer, load_cnf, xor_constraint
+from pkg.pysat.preprocess import Simplifier
+from pkg.pysat.restarts import NoRestart
+from pkg.pysat.stats import Stats
 from pkg.utils.constants import TRUE, FALSE, UNASSIGN
-from pkg.utils.exceptions import FileFormatError
 from pkg.utils.logger import set_logger
+try:
+    from pkg.pysat.xor import GaussMatrix, detect_xors
+except ImportError:  # NumPy is only needed by XOR constraints
+    GaussMatrix = detect_xors = None
 
 logger = set_logger()
 
 
 class Solver:
 
-    def __init__(self, filename):
+    def __init__(self, filename=None, first_reduce=2000, reduce_inc=300, max_glue=2,
+                 restart=None, phase_saving=True, binary_cache=False, simplify=(),
+                 progress=0, clauses=None, budget=None, sharing=None, checkpoint=None,
+                 cache=None, find_xors=False):
+        """
+            :param filename: the DIMACS CNF file to solve, or None with `clauses`
+            :param first_reduce: number of conflicts before the learnt clauses
+                                 are reduced for the first time
+            :param reduce_inc: the interval between 2 reductions grows by this
+                               number of conflicts after each reduction
+            :param max_glue: learnt clauses with an LBD up to this are never deleted
+            :param restart: the restart strategy (see `pkg.pysat.restarts`),
+                            defaults to never restart
+            :param phase_saving: whether decisions reuse the last value of a variable
+            :param binary_cache: whether to load the formula from (or save it to) a
+                                 binary .cnfb file next to the DIMACS file
+            :param simplify: the simplification stages to run before search
+                             (see `pkg.pysat.preprocess.STAGES`), none by default
+            :param progress: print a progress line every this many seconds
+                             during search, 0 for none
+            :param clauses: iterable of clauses (iterable of int), the formula
+                            to solve when there is no file
+            :param budget: the resource limits of each call to `solve` (see
+                           `pkg.pysat.budget.Budget`), defaults to no limit
+            :param sharing: the clause exchange of a parallel worker (see
+                            `pkg.pysat.sharing.Sharing`), None to solve alone
+            :param checkpoint: saves the state of the search periodically (see
+                               `pkg.pysat.checkpoint.Checkpoint`), None for never
+            :param cache: the results of the formulas solved before (see
+                          `pkg.pysat.cache.ResultCache`), used by `run`, None for none
+            :param find_xors: whether to look for the XOR constraints encoded
+                              in the clauses, to propagate them by Gaussian
+                              elimination (see `pkg.pysat.xor`), as the XOR
+                              clauses of the file; off by default, and not
+                              with `simplify`
+        """
+        if sharing is not None and simplify:
+            raise ValueError('clause sharing is not supported with simplification,'
+                             ' which may eliminate the variables of the shared clauses')
+        if checkpoint is not None and simplify:
+            raise ValueError('checkpoints are not supported with simplification,'
+                             ' whose eliminated clauses are not saved')
         logger.info('========= create pysat from %s =========', filename)
         self.filename = filename
-        self.cnf, self.vars = Solver.read_file(filename)
-        self.learnts = set()
-        self.assigns = dict.fromkeys(list(self.vars), UNASSIGN)
+        self.stats = Stats()
+        self.progress = progress
+        self.tracing = False  # whether the hot loops log, set when solving starts
+        start = time.perf_counter()
+        if filename is None:
+            self.cnf = ClauseBuffer()
+            for clause in clauses or ():
+                self.cnf.append(clause)
+            self.cnf.xors.extend(getattr(clauses, 'xors', ()))
+            self.vars = set(map(abs, self.cnf.lits))
+            self.vars.update(var for variables, _ in self.cnf.xors for var in variables)
+        else:
+            self.cnf, self.vars = Solver.read_file(filename, binary_cache)
+        if self.cnf.xors and simplify:
+            raise ValueError('XOR clauses are not supported with simplification')
+        if self.cnf.xors and GaussMatrix is None:
+            raise ValueError('XOR clauses need NumPy')
+        self.stats.times['parse'] = time.perf_counter() - start
+        self.learnts = []  # clause references of the learnt clauses
+        self.learnt_lbds = {}  # learnt clause reference -> LBD
+        self.learnt_activity = {}  # learnt clause reference -> activity
+        self.learnt_inc = 1.0
+        self.learnt_sizes = []  # (conflicts, learnt clauses) after each reduction
+        self.learnt_ints = 0  # arena ints taken by the learnt clauses
+        self.reduce_interval = first_reduce
+        self.reduce_inc = reduce_inc
+        self.max_glue = max_glue
+        self.next_reduce = first_reduce
+        self.var_order = sorted(self.vars)
+        size = self.var_order[-1] + 1 if self.var_order else 1
+        # variable -> value / decision level / reason clause reference (-1 if none)
+        self.assigns = array('b', [UNASSIGN]) * size
+        self.levels = array('i', [-1]) * size
+        self.reasons = array('i', [-1]) * size
+        self.phases = array('b', [UNASSIGN]) * size  # variable -> last value
+        self.seen = array('b', [0]) * size  # variable -> marked by conflict analysis
+        self.phase_saving = phase_saving
+        self.restart = restart if restart is not None else NoRestart()
         self.level = 0
-        self.nodes = dict((k, ImplicationNode(k, UNASSIGN)) for k in list(self.vars))
-        self.branching_vars = set()
-        self.branching_history = {}  # level -> branched variable
-        self.propagate_history = {}  # level -> propagate variables list
-        self.branching_count = 0
+        self.trail = array('i')  # assigned literals, in assignment order
+        self.trail_lim = array('i')  # decision level -> start position in trail
+        self.qhead = 0  # position in trail of the next literal to propagate
+        self.next_var_pos = 0  # var_order before this position is all assigned
+        self.simplify = simplify
+        self.simplifier = None
+        self.preprocessed = False
+        self.core = []  # the failed assumptions, after an UNSAT answer
+        self.budget = budget
+        self.interrupted = False
+        self.stop_reason = None  # why the last call to solve answered UNKNOWN
+        self.priority = []  # variables decided before the heuristics pick any
+        self.at_most_ones = []  # native at-most-one constraints, lists of int
+        self.amo_watches = {}  # literal -> indexes of the constraints it is in
+        self.amo_reasons = {}  # variable -> reason slot in the arena, see `add_at_most_one`
+        self.sharing = sharing
+        self.imported = set()  # references of the imported clauses not used by conflict analysis yet
+        self.checkpoint = checkpoint
+        self.cache = cache
+        self.cache_hit = None  # (kind of key, cached entry, model) when `run` answered from the cache
+        self.find_xors = find_xors and not simplify and detect_xors is not None
+        self.xors = list(self.cnf.xors)  # XOR constraints, of the file, added or found
+        self.gauss = None  # the matrix of the XOR constraints, built when solving
+        self.xor_reasons = {}  # variable -> reason clause reference of its last XOR implication
+        self.xor_propagations = -1  # propagations when the XOR constraints were last propagated
+        self.load_clauses(self.cnf)
+
+    @classmethod
+    def from_clauses(cls, clauses, **kwargs):
+        """
+        Creates a solver from clauses in memory, instead of a DIMACS file.
+            :param clauses: iterable of clauses (iterable of int)
+            :param kwargs: the other arguments of the solver
+            :returns: the solver
+        """
+        return cls(clauses=clauses, **kwargs)
+
+    @property
+    def branching_count(self):
+        return self.stats.decisions
+
+    @property
+    def propagation_count(self):
+        return self.stats.propagations
+
+    @property
+    def conflict_count(self):
+        return self.stats.conflicts
+
+    @property
+    def restart_count(self):
+        return self.stats.restarts
 
     def run(self):
+        """
+        Solves the formula, or finds its answer in the `cache`, and stores it
+        there when it was not. Native at-most-one constraints and XOR clauses
+        are not part of the formula that is cached, so the cache is not used
+        with them. A cached model is not assigned, the solver is left at level
+        0 for more solving, with the model as its phases.
+            :returns: (sat, the time spent, the answer in the DIMACS output format)
+        """
         start_time = time.time()
-        sat = self.solve()
+        cache = self.cache if not self.at_most_ones and not self.cnf.xors else None
+        hit = None
+        if cache is not None:
+            fp = cache_fingerprint(self.cnf)
+            hit = cache.lookup(self, fp)
+        self.cache_hit = hit[1:] if hit is not None else None
+        if hit is not None:
+            sat, model = hit[0], hit[3]
+            for lit in model or ():
+                self.phases[abs(lit)] = TRUE if lit > 0 else FALSE
+        else:
+            model = None
+            sat = self.solve()
+            if cache is not None and sat is not None:
+                cache.store(self, fp, sat)
         spent = time.time() - start_time
-        answer = self.output_answer(sat, spent)
-        logger.info('Equation is {}, resolved in {:.2f} s'
-                    .format('SAT' if sat else 'UNSAT', spent))
+        answer = self.output_answer(sat, spent, model)
+        if self.cache_hit is not None:
+            kind, entry, _ = self.cache_hit
+            answer += os.linesep + 'c Cache: hit ({} key), solved before in {:.2f} s ({} conflicts)'.format(
+                kind, entry['stats']['elapsed'], entry['stats']['conflicts'])
+        elif cache is not None:
+            answer += os.linesep + 'c Cache: miss'
+        logger.info('Equation is {}, resolved in {:.2f} s ({:.0f} propagations/s)'
+                    .format({True: 'SAT', False: 'UNSAT'}.get(sat, 'UNKNOWN'), spent,
+                            self.propagation_count / spent if spent else 0))
+        logger.info('learnt clauses (conflicts, size): %s, now %s',
+                    self.learnt_sizes, len(self.learnts))
+        logger.info('time per phase: %s', self.stats.times)
         return sat, spent, answer
 
-    def output_answer(self, sat, time):
+    def interrupt(self):
+        """
+        Makes `solve` stop at its next conflict or decision, and answer UNKNOWN.
+        It only sets a flag, so it can be called from another thread or from a
+        signal handler. The flag stays set until `clear_interrupt` is called.
+        """
+        self.interrupted = True
+
+    def clear_interrupt(self):
+        self.interrupted = False
+
+    def output_answer(self, sat, time, model=None):
+        """
+            :param sat: True if SAT, False if UNSAT, None if UNKNOWN
+            :param time: the time spent
+            :param model: the literals of the v line, the assignment by default
+        """
         answer = os.linesep.join([
             'c ====================',
             'c pysat reading from {}',
             'c ====================',
             's {}',
             'v {}',
-            'c Done (time: {:.2f} s, picked: {} times)'
+            'c Done (time: {:.2f} s, picked: {} times, restarted: {} times)'
         ])
-        values = ' '.join(['{}{}'.format('' if v == 1 else '-', k)
-                           for k, v in self.assigns.items()])
-        return answer.format(self.filename,
-                             'SATISFIABLE' if sat else 'UNSATISFIABLE',
-                             values if sat else '',
-                             time,
-                             self.branching_count)
+        if model is None:
+            model = [k if self.assigns[k] == TRUE else -k for k in self.var_order]
+        values = ' '.join(map(str, model))
+        answer = answer.format(self.filename,
+                               {True: 'SATISFIABLE', False: 'UNSATISFIABLE'}.get(sat, 'UNKNOWN'),
+                               values if sat else '',
+                               time,
+                               self.branching_count,
+                               self.restart_count)
+        if sat is None:
+            answer += os.linesep + 'c Stopped: {} (conflicts: {}, propagations: {})'.format(
+                self.stop_reason, self.conflict_count, self.propagation_count)
+        return answer
 
-    def solve(self):
+    def load_clauses(self, clauses):
+        """
+        Builds the clause database from scratch, skipping duplicate literals and
+        tautologies.
+            :param clauses: iterable of clauses (iterable of int)
         """
-        Returns TRUE if SAT, False if UNSAT
-        :return: whether there is a solution
+        self.arena = ClauseArena()  # all the clauses, first 2 literals are watched
+        self.watches = dict((lit, []) for v in self.vars for lit in (v, -v))
+        self.units = []  # unit clauses, enqueued at level 0 instead of watched
+        self.units_head = 0  # position in units of the first unit not enqueued yet
+        self.empty = False  # whether the formula has an empty clause
+        for clause in clauses:
+            lits = dict.fromkeys(clause)
+            if not lits:
+                self.empty = True
+            elif not any(-lit in lits for lit in lits):  # skip tautologies
+                self.attach_clause(list(lits))
+
+    def solve(self, assumptions=()):
         """
-        self.preprocess()
-        while not self.are_all_variables_assigned():
+        Returns TRUE if SAT, False if UNSAT, None if UNKNOWN: when the `budget`
+        ran out, or `interrupt` was called (see `stop_reason`).
+        The solver can be called again, after adding clauses or with other
+        assumptions: the learnt clauses and the heuristics state are kept.
+        Assumptions are decided first, one decision level each. If the formula
+        is UNSAT under the assumptions, `core` is the subset of the assumptions
+        that led to the conflict (empty if the formula is UNSAT without them).
+        :param assumptions: literals assumed TRUE for this call only
+        :return: whether there is a solution, None if unknown
+        """
+        if assumptions and self.simplify:
+            raise ValueError('assumptions are not supported with simplification,'
+                             ' which may remove or assign their variables')
+        # the log calls of the hot loops are skipped without even a level check
+        # when logging is at WARNING or above
+        self.tracing = tracing = logger.isEnabledFor(logging.INFO)
+        stats, times, clock = self.stats, self.stats.times, time.perf_counter
+        self.core = []
+        self.stop_reason = None
+        budget, sharing, checkpoint = self.budget, self.sharing, self.checkpoint
+        if budget is not None:
+            budget.start(self)
+        if checkpoint is not None:
+            checkpoint.start()
+        assumptions = list(assumptions)
+        self.add_vars(abs(lit) for lit in assumptions)
+        self.backtrack(0)
+        if not self.preprocessed:
+            start = clock()
+            self.preprocess()
+            self.preprocessed = True
+            times['preprocess'] += clock() - start
+        if self.gauss is None and self.xors:
+            self.gauss = GaussMatrix(self.xors)
+        self.xor_propagations = -1
+        if self.empty:
+            return False
+        for lit in islice(self.units, self.units_head, None):
+            if self.compute_value(lit) == FALSE:
+                self.empty = True
+                return False
+            if self.compute_value(lit) == UNASSIGN:
+                self.assign(lit)
+        self.units_head = len(self.units)
+        next_progress = clock() + self.progress
+        while True:
+            start = clock()
             conf_cls = self.unit_propagate()
+            times['propagate'] += clock() - start
+            if conf_cls is None and self.gauss is not None and stats.propagations != self.xor_propagations:
+                start = clock()
+                conf_cls = self.propagate_xors()
+                times['gauss'] += clock() - start
+                if conf_cls is None and self.qhead < len(self.trail):
+                    continue
             if conf_cls is not None:
                 # there is conflict in unit propagation
-                logger.fine('implication nodes: \n%s', self.nodes)
+                start = clock()
+                if tracing:
+                    logger.fine('trail: %s', self.trail)
                 lvl, learnt = self.conflict_analyze(conf_cls)
-                logger.info('level reset to %s', lvl)
-                logger.debug('learnt: %s', learnt)
+                if tracing:
+                    logger.info('level reset to %s', lvl)
+                    logger.debug('learnt: %s', learnt)
+                analyzed = clock()
+                times['analyze'] += analyzed - start
                 if lvl < 0:
+                    self.empty = True  # a conflict at level 0, UNSAT for good
                     return False
-                self.learnts.add(learnt)
                 self.backtrack(lvl)
-                self.level = lvl
+                start = clock()
+                times['backtrack'] += start - analyzed
+                lbd = self.add_learnt(learnt)
+                stats.conflicts += 1
+                if sharing is not None and sharing.export(learnt, lbd):
+                    stats.exported += 1
+                times['analyze'] += clock() - start
+                if stats.conflicts >= self.next_reduce:
+                    self.reduce_learnts()
+                if self.restart.conflict(lbd):
+                    if tracing:
+                        logger.info('restarting after %s conflicts', stats.conflicts)
+                    stats.restarts += 1
+                    start = clock()
+                    self.backtrack(0)
+                    times['backtrack'] += clock() - start
+                if sharing is not None and self.level == 0:
+                    self.import_shared()
+                    if self.empty:
+                        return False
+                if checkpoint is not None and checkpoint.due():
+                    checkpoint.save(self)
+                if self.progress and clock() >= next_progress:
+                    print(stats.progress_line(), flush=True)
+                    next_progress = clock() + self.progress
+                if budget is not None:
+                    self.stop_reason = budget.exceeded(self)
+                    if self.stop_reason is not None:
+                        return None
+                if self.interrupted:
+                    self.stop_reason = 'interrupted'
+                    return None
+            elif self.level < len(assumptions):
+                # the next assumption gets its own decision level, even if it
+                # is already TRUE, so that levels match assumptions
+                lit = assumptions[self.level]
+                if self.compute_value(lit) == FALSE:
+                    self.core = self.analyze_final(lit)
+                    return False
+                self.trail_lim.append(len(self.trail))
+                self.level += 1
+                if self.compute_value(lit) == UNASSIGN:
+                    self.assign(lit)
             elif self.are_all_variables_assigned():
                 break
+            elif self.interrupted:
+                self.stop_reason = 'interrupted'
+                return None
             else:
+                if budget is not None:
+                    self.stop_reason = budget.exceeded(self)
+                    if self.stop_reason is not None:
+                        return None
                 # branching
+                self.trail_lim.append(len(self.trail))
                 self.level += 1
-                self.branching_count += 1
-                bt_var, bt_val = self.pick_branching_variable()
-                logger.info('--------decision level: %s ---------', self.level)
-                self.assigns[bt_var] = bt_val
-                self.branching_vars.add(bt_var)
-                self.branching_history[self.level] = bt_var
-                self.propagate_history[self.level] = deque()
-                self.update_graph(bt_var)
-                logger.info('picking %s to be %s', bt_var, 'TRUE' if bt_val == TRUE else 'FALSE')
-                logger.debug('branching variables: %s', self.branching_history)
-
-            logger.debug('propagate variables: %s', self.propagate_history)
-            logger.debug('learnts: \n%s', self.learnts)
+                stats.decisions += 1
+                if self.priority:
+                    bt_var, bt_val = self.pick_priority_variable()
+                else:
+                    bt_var, bt_val = self.pick_branching_variable()
+                self.assign(bt_var if bt_val == TRUE else -bt_var)
+                if tracing:
+                    logger.info('--------decision level: %s ---------', self.level)
+                    logger.info('picking %s to be %s', bt_var, 'TRUE' if bt_val == TRUE else 'FALSE')
+
+            if tracing:
+                logger.debug('trail: %s', self.trail)
+                logger.debug('learnts: \n%s', self.learnts)
+        self.reconstruct_model()
         return True
 
-    def preprocess(self):
-        """ Injects before solving """
-        pass
+    def import_shared(self):
+        """
+        Adds the clauses learnt by the other workers (see `sharing`), at level
+        0: the clauses satisfied at level 0 are skipped, and the FALSE literals
+        removed. An imported clause is counted as useful once it is used by
+        conflict analysis, or if it becomes a unit or the empty clause.
+        """
+        stats = self.stats
+        for clause, lbd in self.sharing.receive():
+            if any(abs(lit) >= len(self.assigns) for lit in clause):
+                continue  # not a variable of this formula
+            lits = self.root_literals(clause)
+            if lits is None:
+                continue
+            stats.imported += 1
+            cref = self.add_root_learnt(lits, lbd)
+            if cref is None:
+                stats.useful_imports += 1
+            else:
+                self.imported.add(cref)
+            if self.empty:
+                break
+        self.sharing.publish(stats)
 
-    @staticmethod
-    def read_file(filename):
+    def root_literals(self, clause):
         """
-        Reads a DIMACS CNF format file, returns clauses (set of frozenset) and
-        literals (set of int).
-            :param filename: the file name
-            :raises FileFormatError: when file format is wrong
-            :returns: (clauses, literals)
+        Simplifies a clause by the level 0 assignments, the solver being at level 0.
+            :returns: list of the literals not FALSE, None if one is TRUE
+        """
+        values = [self.compute_value(lit) for lit in clause]
+        if TRUE in values:
+            return None
+        return [lit for lit, value in zip(clause, values) if value == UNASSIGN]
+
+    def add_root_learnt(self, lits, lbd, activity=None):
+        """
+        Adds a learnt clause at level 0, simplified by `root_literals`, from
+        another solver or a checkpoint. A unit is assigned, and without any
+        literal, the formula is UNSAT (see `empty`).
+            :param lits: list of int, all unassigned
+            :param activity: the activity of the clause, the current increment by default
+            :returns: the clause reference, None for a unit or the empty clause
+        """
+        if len(lits) <= 1:
+            if lits:
+                self.attach_clause(lits, learnt=True)
+                self.assign(lits[0])
+            else:
+                self.empty = True
+            return None
+        cref = self.attach_clause(lits, learnt=True)
+        self.learnts.append(cref)
+        self.learnt_ints += HEADER + len(lits)
+        self.learnt_lbds[cref] = min(lbd, len(lits))
+        self.learnt_activity[cref] = self.learnt_inc if activity is None else activity
+        return cref
+
+    def snapshot(self):
         """
-        with open(filename) as f:
-            lines = [
-                line.strip().split() for line in f.readlines()
-                if (not (line.startswith('c') or
-                         line.startswith('%') or
-                         line.startswith('0'))
-                    and line != '\n')
-            ]
-
-        if lines[0][:2] == ['p', 'cnf']:
-            count_literals, count_clauses = map(int, lines[0][-2:])
+        The state of the search, to resume it later (see `pkg.pysat.checkpoint`):
+        the level 0 assignments, the learnt clauses with their LBDs and
+        activities, the saved phases, the state of the heuristics and of the
+        restart strategy, and the statistics. The decisions are not saved, the
+        search resumes from level 0.
+            :returns: (metadata as JSON values, dict of name -> array)
+        """
+        root = self.trail[:self.trail_lim[0]] if self.trail_lim else self.trail
+        lits, starts = array('i'), array('q', [0])
+        for cref in self.learnts:
+            lits.extend(self.arena[cref])
+            starts.append(len(lits))
+        scalars, values = self.heuristics_state()
+        meta = {
+            'heuristics': type(self).__name__,
+            'heuristics_state': scalars,
+            'restart': type(self.restart).__name__,
+            'restart_state': self.restart.state(),
+            'stats': self.stats.state(),
+            'learnt_inc': self.learnt_inc,
+            'reduce_interval': self.reduce_interval,
+            'next_reduce': self.next_reduce,
+        }
+        arrays = {
+            'root': array('i', root),
+            'phases': array('b', self.phases),
+            'learnt_starts': starts,
+            'learnt_lits': lits,
+            'lbds': array('i', [self.learnt_lbds[c] for c in self.learnts]),
+            'activities': array('d', [self.learnt_activity[c] for c in self.learnts]),
+            'heuristics': values,
+        }
+        return meta, arrays
+
+    def resume(self, snapshot):
+        """
+        Restores a state saved by `snapshot`, before calling `solve`: the level
+        0 assignments and the learnt clauses are added at level 0, as the
+        clauses of `import_shared`. The state of the heuristics and of the
+        restart strategy is only restored if they are the same as the ones saved.
+            :param snapshot: (metadata, arrays), as returned by `snapshot`
+        """
+        meta, arrays = snapshot
+        self.backtrack(0)
+        if not self.preprocessed:
+            self.preprocess()
+            self.preprocessed = True
+        for lit in arrays['root']:
+            value = self.compute_value(lit)
+            if value == FALSE:
+                self.empty = True
+            elif value == UNASSIGN:
+                self.assign(lit)
+        lits, starts = arrays['learnt_lits'], arrays['learnt_starts']
+        for i, (lbd, activity) in enumerate(zip(arrays['lbds'], arrays['activities'])):
+            clause = self.root_literals(lits[starts[i]:starts[i + 1]])
+            if clause is not None:
+                self.add_root_learnt(clause, lbd, activity)
+        size = min(len(self.phases), len(arrays['phases']))
+        self.phases[:size] = arrays['phases'][:size]
+        if meta['heuristics'] == type(self).__name__:
+            self.restore_heuristics(meta['heuristics_state'], arrays['heuristics'])
         else:
-            raise FileFormatError('Number of literals and clauses are not declared properly.')
+            logger.info('the checkpoint is of %s, its heuristics state is not restored',
+                        meta['heuristics'])
+        if meta['restart'] == type(self.restart).__name__:
+            self.restart.restore(meta['restart_state'])
+        self.stats.restore(meta['stats'])
+        self.learnt_inc = meta['learnt_inc']
+        self.reduce_interval = meta['reduce_interval']
+        self.next_reduce = meta['next_reduce']
+
+    def analyze_final(self, lit):
+        """
+        Finds the assumptions that imply the negation of an assumption, by going
+        back from it through the reasons on the trail. Every decision above level
+        0 is an assumption when this is called.
+            :param lit: the assumption that is FALSE
+            :returns: list of int, the assumptions in conflict, `lit` included
+        """
+        core = [lit]
+        if self.levels[abs(lit)] == 0:
+            return core
+        seen = {abs(lit)}
+        for x in reversed(self.trail[self.trail_lim[0]:]):
+            var = abs(x)
+            if var not in seen:
+                continue
+            reason = self.reasons[var]
+            if reason == -1:
+                core.append(x)
+            else:
+                seen.update(abs(l) for l in self.arena[reason]
+                            if self.levels[abs(l)] > 0)
+        return core
+
+    def add_vars(self, variables):
+        """
+        Adds new variables: grows the arrays indexed by variable, and tells the
+        heuristics if they are set up already (see `on_new_vars`).
+            :param variables: iterable of int, the ones known already are skipped
+        """
+        new = sorted(set(variables) - self.vars)
+        if not new:
+            return
+        self.vars.update(new)
+        for var in new:
+            insort(self.var_order, var)
+            self.watches[var] = []
+            self.watches[-var] = []
+        grow = new[-1] + 1 - len(self.assigns)
+        if grow > 0:
+            self.assigns.extend([UNASSIGN] * grow)
+            self.levels.extend([-1] * grow)
+            self.reasons.extend([-1] * grow)
+            self.phases.extend([UNASSIGN] * grow)
+            self.seen.extend([0] * grow)
+        self.next_var_pos = min(self.next_var_pos, bisect_left(self.var_order, new[0]))
+        if self.preprocessed:
+            self.on_new_vars(new)
+
+    def add_clause(self, clause):
+        """
+        Adds a clause to the formula, between 2 calls to `solve`. The solver goes
+        back to level 0, so the clause is simplified by the root level assignments.
+            :param clause: iterable of int
+        """
+        if self.simplifier is not None:
+            raise ValueError('clauses cannot be added after simplification,'
+                             ' which may have eliminated their variables')
+        lits = list(dict.fromkeys(clause))
+        self.cnf.append(lits)
+        self.add_vars(abs(lit) for lit in lits)
+        self.backtrack(0)
+        if any(-lit in lits for lit in lits):
+            return
+        values = [self.compute_value(lit) for lit in lits]
+        if TRUE in values:
+            return
+        lits = [lit for lit, value in zip(lits, values) if value == UNASSIGN]
+        if not lits:
+            self.empty = True
+        else:
+            self.attach_clause(lits)
+
+    def add_at_most_one(self, literals):
+        """
+        Adds a native at-most-one constraint: when one of its literals becomes
+        TRUE, the others are assigned FALSE, without the n(n-1)/2 binary clauses
+        of the pairwise encoding. The reason of such an assignment is still a
+        binary clause for conflict analysis: each variable of the constraints
+        has a 2-literal slot in the arena, which is rewritten when the variable
+        is assigned by a constraint. The constraints are not part of `cnf`.
+            :param literals: iterable of int
+        """
+        if self.simplify:
+            raise ValueError('at-most-one constraints are not supported with simplification')
+        lits = list(dict.fromkeys(literals))
+        self.add_vars(abs(lit) for lit in lits)
+        self.backtrack(0)
+        index = len(self.at_most_ones)
+        self.at_most_ones.append(lits)
+        for lit in lits:
+            self.amo_watches.setdefault(lit, []).append(index)
+            if abs(lit) not in self.amo_reasons:
+                self.amo_reasons[abs(lit)] = self.arena.add([lit, -lit])
+        true = [lit for lit in lits if self.compute_value(lit) == TRUE]
+        if len(true) > 1:
+            self.empty = True
+        elif true:
+            self.units.extend(-lit for lit in lits if lit != true[0])
+
+    def add_xor(self, literals):
+        """
+        Adds an XOR constraint, TRUE when an odd number of its literals are
+        TRUE, as an XOR clause of the file (see `pkg.pysat.dimacs.xor_constraint`).
+        It is propagated by Gaussian elimination, without the 2^(n-1) clauses of
+        its CNF encoding. The constraints are kept in `cnf.xors`.
+            :param literals: iterable of int
+        """
+        if self.simplify:
+            raise ValueError('XOR constraints are not supported with simplification')
+        if GaussMatrix is None:
+            raise ValueError('XOR constraints need NumPy')
+        constraint = xor_constraint(literals)
+        self.add_vars(constraint[0])
+        self.backtrack(0)
+        self.cnf.xors.append(constraint)
+        self.xors.append(constraint)
+        self.gauss = None
+
+    def propagate_xors(self):
+        """
+        Propagates the XOR constraints by Gauss-Jordan elimination (see
+        `pkg.pysat.xor.GaussMatrix`), once unit propagation is done. The reason
+        of an implied literal is a clause added to the arena, not watched, which
+        replaces the reason of the previous XOR implication of the variable.
+            :returns: None if no conflict is detected, else the conflict clause
+        """
+        self.xor_propagations = self.stats.propagations
+        conflict, implied = self.gauss.propagate(self.assigns)
+        if conflict is not None:
+            self.stats.xor_conflicts += 1
+            return conflict
+        for lit, reason in implied:
+            self.stats.xor_implications += 1
+            if self.level == 0:
+                self.assign(lit)
+                continue
+            old = self.xor_reasons.get(abs(lit))
+            if old is not None:
+                self.arena.delete(old)
+            self.xor_reasons[abs(lit)] = cref = self.arena.add(reason)
+            self.assign(lit, cref)
+        return None
 
-        literals = set()
-        clauses = set()
+    def propagate_at_most_one(self, lit):
+        """
+        Assigns FALSE the other literals of the at-most-one constraints of a
+        literal that became TRUE.
+            :returns: None if no conflict is detected, else the conflict clause
+        """
+        assigns, lits = self.assigns, self.arena.lits
+        for index in self.amo_watches[lit]:
+            for other in self.at_most_ones[index]:
+                if other == lit:
+                    continue
+                value = assigns[abs(other)]
+                if value == UNASSIGN:
+                    slot = self.amo_reasons[abs(other)] + HEADER
+                    lits[slot] = -other
+                    lits[slot + 1] = -lit
+                    self.assign(-other, slot - HEADER)
+                elif value ^ (other < 0) == TRUE:
+                    return [-other, -lit]
+        return None
+
+    def preprocess(self):
+        """
+        Injects before solving, once. Finds the XOR constraints encoded in the
+        clauses, if `find_xors`. Simplifies the clauses with the `simplify` stages,
+        and rebuilds the clause database from the simplified clauses. Variables
+        eliminated by the simplification are assigned FALSE at level 0 until
+        `reconstruct_model` gives them their values. The stages left are skipped
+        once the time of the `budget` is out.
+        """
+        if self.find_xors:
+            found = detect_xors(self.cnf)
+            known = set(self.xors)
+            self.xors.extend(constraint for constraint in found if constraint not in known)
+            logger.info('%s XOR constraints found in the clauses', len(found))
+        if not self.simplify:
+            return
+        self.simplifier = Simplifier(self.cnf, self.simplify)
+        if not self.simplifier.run(self.budget.expired if self.budget is not None else None):
+            self.empty = True
+            return
+        self.load_clauses(self.simplifier)
+        self.units.extend(self.simplifier.assigned)
+        self.units.extend(-v for v in self.simplifier.eliminated)
+
+    def reconstruct_model(self):
+        """ Gives their values to the variables eliminated by the simplification """
+        if self.simplifier is None:
+            return
+        for lit in self.simplifier.extend_model(lambda l: self.compute_value(l) == TRUE):
+            self.assigns[abs(lit)] = TRUE if lit > 0 else FALSE
+
+    def on_conflict(self, variables):
+        """ Injects after a conflict is analyzed, with the variables involved in it """
+        pass
 
-        for line in lines[1:]:
-            if line[-1] != '0':
-                raise FileFormatError('Each line of clauses must end with 0.')
-            clause = frozenset(map(int, line[:-1]))
-            literals.update(map(abs, clause))
-            clauses.add(clause)
+    def on_backtrack(self, variables):
+        """ Injects after backtracking, with the variables just unassigned """
+        pass
 
-        if len(literals) != count_literals or len(lines) - 1 != count_clauses:
-            raise FileFormatError(
-                'Unmatched literal count or clause count.'
-                ' Literals expected: {}, actual: {}.'
-                ' Clauses expected: {}, actual: {}.'
-                    .format(count_literals, len(literals), count_clauses, len(clauses)))
+    def on_new_vars(self, variables):
+        """ Injects after variables are added, once the solver is preprocessed """
+        pass
 
+    def heuristics_state(self):
+        """
+        The state of the heuristics to save in checkpoints, once preprocessed.
+            :returns: (dict of JSON values, array of float)
+        """
+        return {}, array('d')
+
+    def restore_heuristics(self, scalars, values):
+        """ Restores the state saved by `heuristics_state`, once preprocessed """
+        pass
+
+    @staticmethod
+    def read_file(filename, binary_cache=False):
+        """
+        Reads a DIMACS CNF format file, returns clauses (ClauseBuffer, iterating
+        tuples of int) and literals (set of int).
+            :param filename: the file name, may be compressed, or a .cnfb file
+            :param binary_cache: whether to use the binary cache of the file
+            :raises FileFormatError: when file format is wrong
+            :returns: (clauses, literals)
+        """
+        clauses, literals = load_cnf(filename, binary_cache)
         logger.fine('clauses: %s', clauses)
         logger.fine('literals: %s', literals)
-
         return clauses, literals
 
     def compute_value(self, literal):
@@ -149,13 +778,15 @@ class Solver:
         """
         value = self.assigns[abs(literal)]
         value = value if value == UNASSIGN else value ^ (literal < 0)
-        logger.finest('value: %s', value)
+        if self.tracing:
+            logger.finest('value: %s', value)
         return value
 
     def compute_clause(self, clause):
         values = list(map(self.compute_value, clause))
         value = UNASSIGN if UNASSIGN in values else max(values)
-        logger.finest('clause: %s, value: %s', clause, value)
+        if self.tracing:
+            logger.finest('clause: %s, value: %s', clause, value)
         return value
 
     def compute_cnf(self):
@@ -171,13 +802,16 @@ class Solver:
             :param clause: set of ints
             :returns: (is_clause_a_unit, the_literal_to_assign, the clause)
         """
-        logger.finest('clause: %s', clause)
+        tracing = self.tracing
+        if tracing:
+            logger.finest('clause: %s', clause)
         values = []
         unassigned = None
 
         for literal in clause:
             value = self.compute_value(literal)
-            logger.finest('value of %s: %s', literal, value)
+            if tracing:
+                logger.finest('value of %s: %s', literal, value)
             values.append(value)
             unassigned = literal if value == UNASSIGN else unassigned
 
@@ -185,74 +819,217 @@ class Solver:
                   values.count(UNASSIGN) == 1) or
                  (len(clause) == 1
                   and values.count(UNASSIGN) == 1))
-        logger.finest('%s: %s', clause, (check, unassigned))
-        logger.finest('assignments: %s', self.assigns)
+        if tracing:
+            logger.finest('%s: %s', clause, (check, unassigned))
+            logger.finest('assignments: %s', self.assigns)
         return check, unassigned
 
-    def assign(self, literal):
-        """ Assign the variable so that literal is TRUE """
+    def assign(self, literal, reason=-1):
+        """
+        Assign the variable so that literal is TRUE, and queue it on the trail
+        for propagation.
+            :param literal: the literal to make TRUE
+            :param reason: the reason clause reference, -1 for a branching decision
+        """
+        var = abs(literal)
+        self.assigns[var] = TRUE if literal > 0 else FALSE
+        self.levels[var] = self.level
+        self.reasons[var] = reason
+        self.trail.append(literal)
+
+    def attach_clause(self, clause, learnt=False):
+        """
+        Adds a clause to the clause database and watches its first 2 literals.
+        Unit clauses are not watched, they are kept in `units` instead.
+            :param clause: list of int, watched literals first
+            :param learnt: whether the clause is learnt
+            :returns: the clause reference, None for a unit clause
+        """
+        if len(clause) == 1:
+            self.units.append(clause[0])
+            return None
+        cref = self.arena.add(clause, learnt)
+        self.watches[clause[0]].append(cref)
+        self.watches[clause[1]].append(cref)
+        return cref
+
+    def detach_clause(self, cref):
+        """ Removes a clause from its watches and marks it deleted in the arena """
+        lits = self.arena.lits
+        self.watches[lits[cref + HEADER]].remove(cref)
+        self.watches[lits[cref + HEADER + 1]].remove(cref)
+        self.arena.delete(cref)
 
-    def update_graph(self, var, clause=None):
-        node = self.nodes[var]
-        node.value = self.assigns[var]
-        node.level = self.level
+    def collect_garbage(self):
+        """
+        Compacts the arena, and updates all the clause references: the watches,
+        the reasons and the learnt clauses.
+        """
+        moved = self.arena.compact()
+        for watchers in self.watches.values():
+            watchers[:] = [moved[cref] for cref in watchers]
+        for lit in self.trail:
+            var = abs(lit)
+            if self.reasons[var] != -1:
+                self.reasons[var] = moved[self.reasons[var]]
+        self.learnts = [moved[c] for c in self.learnts]
+        self.amo_reasons = dict((v, moved[c]) for v, c in self.amo_reasons.items())
+        self.learnt_lbds = dict((moved[c], v) for c, v in self.learnt_lbds.items())
+        self.learnt_activity = dict((moved[c], v) for c, v in self.learnt_activity.items())
+        self.imported = set(moved[c] for c in self.imported)
+        self.xor_reasons = dict((v, moved[c]) for v, c in self.xor_reasons.items())
+        logger.info('arena compacted to %s ints', len(self.arena))
 
-        # update parents
-        if clause:  # clause is None, meaning this is branching, no parents to update
-            for v in [abs(lit) for lit in clause if abs(lit) != var]:
-                node.parents.append(self.nodes[v])
-                self.nodes[v].children.append(node)
-            node.clause = clause
-            logger.fine('node %s has parents: %s', var, node.parents)
+    def add_learnt(self, clause):
+        """
+        Attaches a learnt clause after backtracking, and assigns its only
+        unassigned literal (the UIP) with the learnt clause as reason.
+        The LBD (literal block distance) of the clause is the number of distinct
+        decision levels among its literals.
+                :param clause: (list of int) the clause learnt from the conflict, the
+                           UIP first, then the literal assigned at the highest level
+            :returns: the LBD of the learnt clause
+        """
+        cref = self.attach_clause(clause, learnt=True)
+        if cref is None:
+            self.assign(clause[0])
+            self.stats.learnt(1, 1)
+            return 1
+        self.learnts.append(cref)
+        self.learnt_ints += HEADER + len(clause)
+        # the UIP is unassigned now, but it was on its own level
+        lbd = len(set(self.levels[abs(l)] for l in clause[1:])) + 1
+        self.stats.learnt(len(clause), lbd)
+        self.learnt_lbds[cref] = lbd
+        self.learnt_activity[cref] = self.learnt_inc
+        self.assign(clause[0], cref)
+        return lbd
+
+    def bump_learnt(self, cref):
+        activity = self.learnt_activity
+        activity[cref] += self.learnt_inc
+        if cref in self.imported:
+            self.imported.discard(cref)
+            self.stats.useful_imports += 1
+        if activity[cref] > 1e20:
+            for c in self.learnts:
+                activity[c] *= 1e-20
+            self.learnt_inc *= 1e-20
+
+    def is_locked(self, cref):
+        """ Checks if a clause is the reason of a current assignment """
+        lit = self.arena.lits[cref + HEADER]
+        return self.reasons[abs(lit)] == cref and self.compute_value(lit) == TRUE
+
+    def reduce_learnts(self):
+        """
+        Deletes the worst half of the learnt clauses, by LBD and then by activity.
+        Glue clauses (LBD up to `max_glue`) and the clauses that are reasons of
+        current assignments are kept. The next reduction is scheduled
+        `reduce_inc` conflicts further than the previous interval.
+        """
+        lbds, activity = self.learnt_lbds, self.learnt_activity
+        candidates = sorted(
+            (c for c in self.learnts if lbds[c] > self.max_glue and not self.is_locked(c)),
+            key=lambda c: (-lbds[c], activity[c]))
+        deleted = set(candidates[:len(candidates) // 2])
+        for cref in deleted:
+            self.learnt_ints -= HEADER + self.arena.size(cref)
+            self.detach_clause(cref)
+            del lbds[cref]
+            del activity[cref]
+        self.learnts = [c for c in self.learnts if c not in deleted]
+        self.imported -= deleted
+        if self.arena.wasted * 2 > len(self.arena):
+            self.collect_garbage()
+        self.stats.reductions += 1
+        self.learnt_sizes.append((self.stats.conflicts, len(self.learnts)))
+        self.reduce_interval += self.reduce_inc
+        self.next_reduce = self.stats.conflicts + self.reduce_interval
+        logger.info('learnt clauses reduced to %s (%s deleted) after %s conflicts',
+                    len(self.learnts), len(deleted), self.stats.conflicts)
 
     def unit_propagate(self):
         """
-        A unit clause has all of its literals but 1 assigned to 0. Then, the sole
-        unassigned literal must be assigned to value 1. Unit propagation is the
-        process of iteratively applying the unit clause rule.
-        :return: None if no conflict is detected, else return the literal
+        Propagates the literals on the trail that are not propagated yet. Only the
+        clauses watching the negation of a propagated literal are visited: each of
+        them either watches another non-FALSE literal, or is a unit clause (the
+        other watched literal is propagated), or is a conflict.
+        :return: None if no conflict is detected, else return the conflict clause
         """
-        while True:
-            propagate_queue = deque()
-            for clause in [x for x in self.cnf.union(self.learnts)]:
-                c_val = self.compute_clause(clause)
-                if c_val == TRUE:
+        assigns, watches, trail = self.assigns, self.watches, self.trail
+        arena = self.arena.lits
+        amo_watches = self.amo_watches
+        tracing = self.tracing
+        start = self.qhead
+        while self.qhead < len(trail):
+            false_lit = -trail[self.qhead]
+            self.qhead += 1
+            if amo_watches and -false_lit in amo_watches:
+                conflict = self.propagate_at_most_one(-false_lit)
+                if conflict is not None:
+                    self.stats.propagations += self.qhead - start
+                    self.qhead = len(trail)
+                    return conflict
+            watchers = watches[false_lit]
+            i = j = 0
+            end = len(watchers)
+            while i < end:
+                cref = watchers[i]
+                i += 1
+                w0 = cref + HEADER
+                # make sure the false literal is the second watched literal
+                if arena[w0] == false_lit:
+                    arena[w0] = arena[w0 + 1]
+                    arena[w0 + 1] = false_lit
+                first = arena[w0]
+                value = assigns[abs(first)]
+                if value != UNASSIGN and value ^ (first < 0) == TRUE:
+                    watchers[j] = cref
+                    j += 1
                     continue
-                if c_val == FALSE:
-                    return clause
+                # look for a new literal to watch
+                for k in range(w0 + 2, w0 + arena[cref]):
+                    lit = arena[k]
+                    value = assigns[abs(lit)]
+                    if value == UNASSIGN or value ^ (lit < 0) == TRUE:
+                        arena[w0 + 1] = lit
+                        arena[k] = false_lit
+                        watches[lit].append(cref)
+                        break
                 else:
-                    is_unit, unit_lit = self.is_unit_clause(clause)
-                    if not is_unit:
-                        continue
-                    prop_pair = (unit_lit, clause)
-                    if prop_pair not in propagate_queue:
-                        propagate_queue.append(prop_pair)
-            if not propagate_queue:
-                return None
-            logger.fine('propagate_queue: %s', propagate_queue)
-
-            for prop_lit, clause in propagate_queue:
-                prop_var = abs(prop_lit)
-                self.assigns[prop_var] = TRUE if prop_lit > 0 else FALSE
-                logger.fine('propagated %s to be %s', prop_var, self.assigns[prop_var])
-                self.update_graph(prop_var, clause=clause)
-                try:
-                    self.propagate_history[self.level].append(prop_lit)
-                except KeyError:
-                    pass  # propagated at level 0
+                    watchers[j] = cref
+                    j += 1
+                    if assigns[abs(first)] != UNASSIGN:
+                        # all literals are FALSE, keep the remaining watchers
+                        watchers[j:] = watchers[i:end]
+                        self.stats.propagations += self.qhead - start
+                        self.qhead = len(trail)
+                        return self.arena[cref]
+                    if tracing:
+                        logger.fine('propagated %s from %s', first, self.arena[cref])
+                    self.assign(first, cref)
+            del watchers[j:]
+        self.stats.propagations += self.qhead - start
+        return None
 
     def get_unit_clauses(self):
         return list(filter(lambda x: x[0], map(self.is_unit_clause, self.cnf)))
 
     def are_all_variables_assigned(self):
-        all_assigned = all(var in self.assigns for var in self.vars)
-        none_unassigned = not any(var for var in self.vars if self.assigns[var] == UNASSIGN)
-        return all_assigned and none_unassigned
+        return len(self.trail) == len(self.var_order)
 
     def all_unassigned_vars(self):
-        return filter(
-            lambda v: v in self.assigns and self.assigns[v] == UNASSIGN,
-            self.vars)
+        """
+        Iterates the unassigned variables in ascending order, skipping the
+        leading variables that are known to be assigned.
+        """
+        assigns, order = self.assigns, self.var_order
+        pos = self.next_var_pos
+        while pos < len(order) and assigns[order[pos]] != UNASSIGN:
+            pos += 1
+        self.next_var_pos = pos
+        return filter(lambda v: assigns[v] == UNASSIGN, islice(order, pos, None))
 
     # def pick_branching_variable(self, bt_var=None, bt_val=None):
     def pick_branching_variable(self):
@@ -263,135 +1040,175 @@ class Solver:
         var = next(self.all_unassigned_vars())
         return var, TRUE
 
+    def pick_priority_variable(self):
+        """
+        Picks the first unassigned variable of `priority`, or lets the
+        heuristics pick once they are all assigned.
+        :return: variable, value assigned
+        """
+        assigns = self.assigns
+        for var in self.priority:
+            if assigns[var] == UNASSIGN:
+                return var, self.pick_phase(var)
+        return self.pick_branching_variable()
+
+    def pick_phase(self, var):
+        """
+        Picks the value of a branching variable: its last value if phase saving
+        is on and it was assigned before, else a random one.
+        :return: TRUE or FALSE
+        """
+        phase = self.phases[var]
+        if phase == UNASSIGN or not self.phase_saving:
+            return random.sample([TRUE, FALSE], 1)[0]
+        return phase
+
     def conflict_analyze(self, conf_cls):
         """
-        Analyze the most recent conflict and learn a new clause from the conflict.
-        - Find the cut in the implication graph that led to the conflict
-        - Derive a new clause which is the negation of the assignments that led to the conflict
+        Analyze the most recent conflict and learn a new clause from the conflict,
+        by resolving the conflict clause with the reasons of its literals of the
+        current level, in reverse trail order, until only one literal of the
+        current level is left: the first unique implication point (UIP).
+        The variables already resolved or in the learnt clause are marked in
+        `seen`, and the literals of lower levels go to the learnt clause directly.
+        The learnt clause is then minimized (see `minimize`).
 
         Returns a decision level to be backtracked to.
-        :param conf_cls: (set of int) the clause that introduces the conflict
-        :return: ({int} level to backtrack to, {set(int)} clause learnt)
-        """
-        def next_recent_assigned(clause):
-            """
-            According to the assign history, separate the latest assigned variable
-            with the rest in `clause`
-            :param clause: {set of int} the clause to separate
-            :return: ({int} variable, [int] other variables in clause)
-            """
-            for v in reversed(assign_history):
-                if v in clause or -v in clause:
-                    return v, [x for x in clause if abs(x) != abs(v)]
-
+        :param conf_cls: (list of int) the clause that introduces the conflict
+        :return: ({int} level to backtrack to, {list of int} clause learnt, the
+                 UIP first, then a literal of the level to backtrack to)
+        """
         if self.level == 0:
             return -1, None
 
-        logger.fine('conflict clause: %s', conf_cls)
-
-        assign_history = [self.branching_history[self.level]] + list(self.propagate_history[self.level])
-        logger.fine('assign history for level %s: %s', self.level, assign_history)
-
-        pool_lits = conf_cls
-        done_lits = set()
-        curr_level_lits = set()
-        prev_level_lits = set()
+        tracing = self.tracing
+        if tracing:
+            logger.fine('conflict clause: %s', conf_cls)
 
+        seen, levels, reasons, trail = self.seen, self.levels, self.reasons, self.trail
+        learnt = [0]  # room for the UIP
+        involved = []
+        clause = conf_cls
+        pending = 0  # literals of the current level left to resolve
+        index = len(trail) - 1
+        var = 0
         while True:
-            logger.fine('-------')
-            logger.fine('pool lits: %s', pool_lits)
-            for lit in pool_lits:
-                if self.nodes[abs(lit)].level == self.level:
-                    curr_level_lits.add(lit)
-                else:
-                    prev_level_lits.add(lit)
-
-            logger.fine('curr level lits: %s', curr_level_lits)
-            logger.fine('prev level lits: %s', prev_level_lits)
-            if len(curr_level_lits) == 1:
+            for lit in clause:
+                v = abs(lit)
+                if not seen[v] and v != var and levels[v] > 0:
+                    seen[v] = 1
+                    involved.append(v)
+                    if levels[v] >= self.level:
+                        pending += 1
+                    else:
+                        learnt.append(lit)
+            # the next literal of the current level to resolve, latest first
+            while not seen[abs(trail[index])]:
+                index -= 1
+            uip = trail[index]
+            index -= 1
+            var = abs(uip)
+            seen[var] = 0
+            pending -= 1
+            if pending == 0:
                 break
+            reason = reasons[var]
+            if reason in self.learnt_activity:
+                self.bump_learnt(reason)
+            clause = self.arena[reason]
+        learnt[0] = -uip
+        if tracing:
+            logger.fine('learnt before minimization: %s', learnt)
 
-            last_assigned, others = next_recent_assigned(curr_level_lits)
-            logger.fine('last assigned: %s, others: %s', last_assigned, others)
-
-            done_lits.add(abs(last_assigned))
-            curr_level_lits = set(others)
-
-            pool_clause = self.nodes[abs(last_assigned)].clause
-            pool_lits = [
-                l for l in pool_clause if abs(l) not in done_lits
-            ] if pool_clause is not None else []
+        learnt = self.minimize(learnt)
+        # the literal of the highest level goes second, to be watched
+        level = 0  # a unit learnt is asserted at the root level
+        for i in range(1, len(learnt)):
+            if levels[abs(learnt[i])] > level:
+                level = levels[abs(learnt[i])]
+                learnt[1], learnt[i] = learnt[i], learnt[1]
 
-            logger.fine('done lits: %s', done_lits)
+        self.learnt_inc /= 0.999
+        self.on_conflict(involved)
+        return level, learnt
 
-        learnt = frozenset([l for l in curr_level_lits.union(prev_level_lits)])
-        if prev_level_lits:
-            level = max([self.nodes[abs(x)].level for x in prev_level_lits])
-        else:
-            level = self.level - 1
+    def minimize(self, learnt):
+        """
+        Recursive learnt clause minimization: removes the literals implied by
+        the other literals of the clause, i.e. whose reasons only lead to literals
+        of the clause (or of level 0). Clears `seen` of the clause literals.
+            :param learnt: list of int, UIP first, with the other literals seen
+            :returns: the minimized clause
+        """
+        seen, levels = self.seen, self.levels
+        abstract = 0  # the levels of the clause, as a bit set of levels modulo 32
+        for lit in learnt[1:]:
+            abstract |= 1 << (levels[abs(lit)] & 31)
+        cleared = [abs(lit) for lit in learnt[1:]]
+        kept = [learnt[0]]
+        for lit in learnt[1:]:
+            if self.reasons[abs(lit)] == -1 or not self.is_redundant(lit, abstract, cleared):
+                kept.append(lit)
+        for var in cleared:
+            seen[var] = 0
+        self.stats.minimized_literals += len(learnt) - len(kept)
+        return kept
 
-        return level, learnt
+    def is_redundant(self, lit, abstract, cleared):
+        """
+        Checks if a literal of the learnt clause is implied by the others, by
+        following reasons depth first. The variables found redundant stay seen,
+        and are added to `cleared` to be unmarked later.
+            :param lit: a literal with a reason
+            :param abstract: the levels of the learnt clause (see `minimize`)
+            :param cleared: list of the seen variables
+            :returns: True if the literal can be removed from the learnt clause
+        """
+        seen, levels, reasons, arena = self.seen, self.levels, self.reasons, self.arena
+        stack = [abs(lit)]
+        top = len(cleared)
+        while stack:
+            var = stack.pop()
+            for other in arena[reasons[var]]:
+                v = abs(other)
+                if v == var or seen[v] or levels[v] == 0:
+                    continue
+                if reasons[v] != -1 and abstract & (1 << (levels[v] & 31)):
+                    seen[v] = 1
+                    stack.append(v)
+                    cleared.append(v)
+                else:
+                    # a decision, or a level without literals in the clause
+                    for u in cleared[top:]:
+                        seen[u] = 0
+                    del cleared[top:]
+                    return False
+        return True
 
     def backtrack(self, level):
         """
         Non-chronologically backtrack ("back jump") to the appropriate decision level,
         where the first-assigned variable involved in the conflict was assigned
         """
-        logger.debug('backtracking to %s', level)
-        for var, node in self.nodes.items():
-            if node.level <= level:
-                node.children[:] = [child for child in node.children if child.level <= level]
-            else:
-                node.value = UNASSIGN
-                node.level = -1
-                node.parents = []
-                node.children = []
-                node.clause = None
-                self.assigns[node.variable] = UNASSIGN
-
-        self.branching_vars = set([
-            var for var in self.vars
-            if (self.assigns[var] != UNASSIGN
-                and len(self.nodes[var].parents) == 0)
-        ])
+        if self.tracing:
+            logger.debug('backtracking to %s', level)
+        if level >= self.level:
+            return
+        start = self.trail_lim[level]
+        unassigned = [abs(lit) for lit in self.trail[start:]]
+        for var in unassigned:
+            self.phases[var] = self.assigns[var]
+            self.assigns[var] = UNASSIGN
+            self.levels[var] = -1
+            self.reasons[var] = -1
+        del self.trail[start:]
+        del self.trail_lim[level:]
+        self.level = level
+        self.qhead = start
+        if unassigned:  # assumption levels may be empty
+            self.next_var_pos = min(self.next_var_pos,
+                                    bisect_left(self.var_order, min(unassigned)))
+        self.on_backtrack(unassigned)
 
-        levels = list(self.propagate_history.keys())
-        for k in levels:
-            if k <= level:
-                continue
-            del self.branching_history[k]
-            del self.propagate_history[k]
-
-        logger.finer('after backtracking, graph:\n%s', self.nodes)
-
-
-class ImplicationNode:
-    """
-    Represents a node in an implication graph. Each node contains
-    - its value
-    - its implication children (list)
-    - parent nodes (list)
-    """
-
-    def __init__(self, variable, value):
-        self.variable = variable
-        self.value = value
-        self.level = -1
-        self.parents = []
-        self.children = []
-        self.clause = None
-
-    def all_parents(self):
-        parents = set(self.parents)
-        for parent in self.parents:
-            for p in parent.all_parents():
-                parents.add(p)
-        return list(parents)
-
-    def __str__(self):
-        sign = '+' if self.value == TRUE else '-' if self.value == FALSE else '?'
-        return "[{}{}:L{}, {}p, {}c, {}]".format(
-            sign, self.variable, self.level, len(self.parents), len(self.children), self.clause)
-
-    def __repr__(self):
-        return str(self)
+        if self.tracing:
+            logger.finer('after backtracking, trail: %s', self.trail)
@@ -0,0 +1,97 @@
+"""
+Statistics of a solver run
+"""
+import json
+import time
+
+PHASES = ['parse', 'preprocess', 'propagate', 'gauss', 'analyze', 'backtrack']
+
+
+class Stats:
+    """
+    Counters of the search, the sizes and LBDs of the learnt clauses, and the
+    time spent in each phase of the solver (see `PHASES`), in seconds.
+    """
+
+    def __init__(self):
+        self.decisions = 0
+        self.propagations = 0
+        self.conflicts = 0
+        self.restarts = 0
+        self.reductions = 0
+        self.learnts = 0  # learnt clauses, including the deleted ones
+        self.learnt_literals = 0
+        self.minimized_literals = 0  # literals removed by learnt clause minimization
+        self.max_learnt_size = 0
+        self.lbd_sum = 0
+        self.lbds = {}  # LBD -> number of learnt clauses
+        self.exported = 0  # learnt clauses shared with the other workers
+        self.imported = 0  # clauses of the other workers added
+        self.useful_imports = 0  # imported clauses used by conflict analysis, or units
+        self.xor_implications = 0  # literals implied by Gaussian elimination
+        self.xor_conflicts = 0  # conflicts found by Gaussian elimination
+        self.times = dict.fromkeys(PHASES, 0.0)
+        self.start_time = time.perf_counter()
+
+    def learnt(self, size, lbd):
+        self.learnts += 1
+        self.learnt_literals += size
+        self.max_learnt_size = max(self.max_learnt_size, size)
+        self.lbd_sum += lbd
+        self.lbds[lbd] = self.lbds.get(lbd, 0) + 1
+
+    def state(self):
+        """ The counters, as JSON values, for checkpoints: the elapsed time replaces the start """
+        state = dict(vars(self), elapsed=self.elapsed())
+        del state['start_time']
+        return state
+
+    def restore(self, state):
+        """ Restores the counters saved by `state`, the elapsed time goes on from there """
+        state = dict(state)
+        self.start_time = time.perf_counter() - state.pop('elapsed')
+        state['lbds'] = dict((int(lbd), count) for lbd, count in state['lbds'].items())
+        state['times'] = dict(dict.fromkeys(PHASES, 0.0), **state['times'])
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    def elapsed(self):
+        return time.perf_counter() - self.start_time
+
+    def as_dict(self):
+        elapsed = self.elapsed()
+        return {
+            'decisions': self.decisions,
+            'propagations': self.propagations,
+            'conflicts': self.conflicts,
+            'restarts': self.restarts,
+            'reductions': self.reductions,
+            'learnts': self.learnts,
+            'average_learnt_size': self.learnt_literals / self.learnts if self.learnts else 0,
+            'max_learnt_size': self.max_learnt_size,
+            'minimized_literals': self.minimized_literals,
+            'average_lbd': self.lbd_sum / self.learnts if self.learnts else 0,
+            'lbds': dict(sorted(self.lbds.items())),
+            'exported': self.exported,
+            'imported': self.imported,
+            'useful_imports': self.useful_imports,
+            'xor_implications': self.xor_implications,
+            'xor_conflicts': self.xor_conflicts,
+            'times': dict(self.times),
+            'elapsed': elapsed,
+            'propagations_per_second': self.propagations / elapsed if elapsed else 0,
+        }
+
+    def dump(self, filename):
+        """ Writes the statistics to a JSON file """
+        with open(filename, 'w') as f:
+            json.dump(self.as_dict(), f, indent=2)
+
+    def progress_line(self):
+        """ Returns a one line summary, as a DIMACS comment """
+        elapsed = self.elapsed()
+        return ('c {:9.2f} s | {:>9} decisions | {:>9} conflicts | {:>10} propagations'
+                ' ({:.0f}/s) | {:>5} restarts | avg LBD {:.2f}'.format(
+                    elapsed, self.decisions, self.conflicts, self.propagations,
+                    self.propagations / elapsed if elapsed else 0, self.restarts,
+                    self.lbd_sum / self.learnts if self.learnts else 0))
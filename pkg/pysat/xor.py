@@ -0,0 +1,183 @@
+"""
+XOR constraints: their detection in CNF, and Gauss-Jordan elimination over
+GF(2) with bit-packed NumPy matrices, to propagate them during search
+"""
+import numpy as np
+from pkg.utils.constants import TRUE, UNASSIGN
+
+MAX_SIZE = 6  # longest XOR detected, its encoding takes 2^(size-1) clauses
+MIX = np.uint64(0x9e3779b97f4a7c15)  # hashes the variables of the clauses
+POPCOUNT = np.array([bin(byte).count('1') for byte in range(256)], dtype=np.int64)
+
+
+def table_bit_counts(rows):
+    """
+    Counts the bits set in each row of a 2-D uint64 array, byte by byte with a table.
+        :returns: array of int
+    """
+    return POPCOUNT[np.ascontiguousarray(rows).view(np.uint8)].sum(axis=1)
+
+
+def bit_counts(rows):
+    """ As `table_bit_counts`, with `np.bitwise_count` (NumPy 2.0) """
+    return np.bitwise_count(rows).sum(axis=1, dtype=np.int64)
+
+
+if not hasattr(np, 'bitwise_count'):  # NumPy before 2.0
+    bit_counts = table_bit_counts
+
+
+def detect_xors(clauses, max_size=MAX_SIZE):
+    """
+    Finds the XOR constraints encoded in clauses: an XOR of k variables takes
+    the 2^(k-1) clauses over the k variables whose numbers of negative literals
+    have the same parity, each one ruling out an assignment of the wrong
+    parity. So the clauses of each size are grouped by their variables, and a
+    group with all the sign patterns of one parity is an XOR, all with NumPy:
+    the clauses whose variables are not those of enough other clauses (by a
+    hash) are dropped first, then the others are sorted. The clauses are kept
+    in the formula.
+        :param clauses: ClauseBuffer, or iterable of clauses (iterable of int)
+        :param max_size: the longest XOR to look for
+        :returns: list of (sorted tuple of variables, parity), as
+                  `pkg.pysat.dimacs.xor_constraint`
+    """
+    if hasattr(clauses, 'starts'):
+        lits = np.frombuffer(clauses.lits, dtype=np.int32)
+        starts = np.frombuffer(clauses.starts, dtype=np.int64)
+    else:
+        clauses = [list(clause) for clause in clauses]
+        lits = np.array([lit for clause in clauses for lit in clause], dtype=np.int64)
+        starts = np.cumsum([0] + [len(clause) for clause in clauses])
+    sizes = np.diff(starts)
+    clause_counts = np.bincount(sizes, minlength=max_size + 1)
+    xors = []
+    for size in range(3, max_size + 1):
+        if clause_counts[size] < 1 << (size - 1):
+            continue
+        group = lits[starts[:-1][sizes == size][:, None] + np.arange(size)]
+        # only the clauses whose variables, hashed in any order, are those of enough clauses
+        mixed = np.abs(group).astype(np.uint64) * MIX
+        mixed ^= mixed >> np.uint64(29)
+        _, inverse, counts = np.unique(mixed.sum(axis=1), return_inverse=True, return_counts=True)
+        group = group[counts[inverse] >= 1 << (size - 1)]
+        group = np.take_along_axis(group, np.argsort(np.abs(group), axis=1), axis=1)
+        variables = np.abs(group)
+        distinct = (variables[:, 1:] != variables[:, :-1]).all(axis=1)
+        variables, negative = variables[distinct], group[distinct] < 0
+        signs = (negative << np.arange(size)).sum(axis=1)
+        # the variables, the parity of the negative literals, then the signs of each clause
+        keys = np.unique(np.column_stack([variables, negative.sum(axis=1) & 1, signs]), axis=0)
+        runs, counts = np.unique(keys[:, :-1], axis=0, return_counts=True)
+        for run in runs[counts == 1 << (size - 1)].tolist():
+            xors.append((tuple(run[:-1]), run[-1] ^ 1))
+    return xors
+
+
+class GaussMatrix:
+    """
+    XOR constraints as a matrix over GF(2): a row per constraint, a column per
+    variable, packed 64 columns to a uint64 word, and the parity of each row
+    (the XOR of the variables of a row is its parity). The matrix is kept in
+    reduced row echelon form by Gauss-Jordan elimination: each row has a pivot
+    column, in no other row. Adding a row to another keeps the constraints the
+    same, so the form is never undone on backtracking. During search, a row
+    whose pivot is assigned gets a new pivot among its unassigned columns (see
+    `propagate`), so the rows with unassigned variables all have an unassigned
+    pivot: such a row left with one unassigned variable implies its value, and
+    a row left with none and the wrong parity is a conflict, and no sum of rows
+    would find more. A row is the sum of original rows, so it is itself an XOR
+    implied by the constraints, whose assigned variables give the reason clause
+    of the implication.
+    """
+
+    def __init__(self, xors):
+        """
+            :param xors: list of (iterable of variables, parity)
+        """
+        self.columns = sorted(set(var for variables, _ in xors for var in variables))
+        index = dict((var, i) for i, var in enumerate(self.columns))
+        self.words = (len(self.columns) + 63) // 64
+        bits = np.zeros((len(xors), self.words * 64), dtype=bool)
+        for row, (variables, _) in enumerate(xors):
+            for var in variables:
+                bits[row, index[var]] ^= True
+        self.rows = self.pack(bits)
+        self.parities = np.array([parity for _, parity in xors], dtype=np.uint8)
+        self.variables = np.array(self.columns, dtype=np.int64)
+        self.pivots = np.full(len(xors), -1, dtype=np.int64)  # row -> pivot column, -1 for an empty row
+        self.bits = np.zeros(self.words * 64, dtype=bool)  # buffer of the columns to pack
+        for row in range(len(xors)):
+            words = np.flatnonzero(self.rows[row])
+            if len(words):
+                self.pivot(row, words[0], self.rows[row, words[0]])
+
+    def __len__(self):
+        return len(self.rows)
+
+    @staticmethod
+    def pack(bits):
+        """ Packs the last axis of a boolean array into uint64 words, column 0 in bit 0 """
+        packed = np.packbits(bits, axis=-1, bitorder='little')
+        return np.ascontiguousarray(packed).view('<u8').astype(np.uint64)
+
+    def unpack(self, rows):
+        """ The columns of packed rows, as a 2-D boolean array """
+        bits = np.unpackbits(rows.astype('<u8').view(np.uint8), axis=-1, bitorder='little')
+        return bits[..., :len(self.columns)].astype(bool)
+
+    def pivot(self, row, word, bits):
+        """
+        Makes the lowest column of some bits of a row its pivot, and eliminates
+        the column from the other rows.
+            :param word: the index of the word of the column
+            :param bits: the bits of the word, at least one set
+        """
+        bit = int(bits) & -int(bits)
+        self.pivots[row] = word * 64 + bit.bit_length() - 1
+        others = np.flatnonzero(self.rows[:, word] & np.uint64(bit))
+        others = others[others != row]
+        self.rows[others] ^= self.rows[row]
+        self.parities[others] ^= self.parities[row]
+
+    def propagate(self, assigns):
+        """
+        Moves the pivots off the assigned columns, and finds the implications
+        and conflicts of the rows under an assignment.
+            :param assigns: variable -> TRUE, FALSE or UNASSIGN (array of int8)
+            :returns: (conflict, implied): a conflict clause, all its literals
+                      FALSE, or None, and a list of (literal, reason clause,
+                      the literal first and the others FALSE)
+        """
+        values = np.frombuffer(assigns, dtype=np.int8)[self.variables]
+        size = len(self.columns)
+        self.bits[:size] = values == UNASSIGN
+        free = self.pack(self.bits)
+        rows, pivots = self.rows, self.pivots
+        counts = bit_counts(rows & free)
+        moved = (pivots >= 0) & (counts > 0)
+        moved[moved] = values[pivots[moved]] != UNASSIGN
+        if moved.any():
+            for row in np.flatnonzero(moved):
+                unassigned = rows[row] & free  # other pivots may have changed the row
+                words = np.flatnonzero(unassigned)
+                if len(words):
+                    self.pivot(row, words[0], unassigned[words[0]])
+            counts = bit_counts(rows & free)
+        true = values == TRUE
+        self.bits[:size] = true
+        # the parity left for the unassigned variables of each row
+        left = self.parities ^ (bit_counts(rows & self.pack(self.bits)) & 1).astype(np.uint8)
+        conflicts = np.flatnonzero((counts == 0) & (left == 1))
+        implied = np.flatnonzero(counts == 1)
+        if not len(conflicts) and not len(implied):
+            return None, []
+        # the literals of the variables that are FALSE
+        false = np.where(true, -self.variables, self.variables)
+        if len(conflicts):
+            return false[self.unpack(rows[conflicts[0]])].tolist(), []
+        reasons = self.unpack(rows[implied])
+        columns = pivots[implied]
+        reasons[np.arange(len(implied)), columns] = False
+        lits = np.where(left[implied] == 1, self.variables[columns], -self.variables[columns]).tolist()
+        return None, [(lit, [lit] + false[reason].tolist()) for lit, reason in zip(lits, reasons)]
@@ -0,0 +1,108 @@
+"""
+Indexed binary heap used to order variables by a score
+"""
+from array import array
+
+
+class IndexedHeap:
+    """
+    A binary max-heap of non-negative ints (variables), ordered by `scores[item]`,
+    ties broken by the smaller item first. The position of every item is indexed,
+    so membership checks are O(1), and re-ordering an item after its score changed
+    is O(log n).
+    """
+
+    def __init__(self, scores, items=()):
+        """
+            :param scores: indexable of numbers, item -> score, may be changed
+                           by the caller as long as `update` is called afterwards
+            :param items: the items to put in the heap initially
+        """
+        self.scores = scores
+        self.heap = array('i')
+        self.indices = array('i', [-1]) * len(scores)  # item -> position in heap
+        self.rebuild(items)
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __contains__(self, item):
+        return self.indices[item] >= 0
+
+    def before(self, a, b):
+        scores = self.scores
+        return scores[a] > scores[b] or (scores[a] == scores[b] and a < b)
+
+    def push(self, item):
+        if self.indices[item] >= 0:
+            return
+        self.indices[item] = len(self.heap)
+        self.heap.append(item)
+        self.sift_up(len(self.heap) - 1)
+
+    def grow(self, size):
+        """ Makes room for the items below `size`, after `scores` was extended """
+        if size > len(self.indices):
+            self.indices.extend([-1] * (size - len(self.indices)))
+
+    def top(self):
+        return self.heap[0]
+
+    def pop(self):
+        """ Removes and returns the item with the highest score """
+        heap = self.heap
+        item = heap[0]
+        last = heap.pop()
+        self.indices[item] = -1
+        if heap:
+            heap[0] = last
+            self.indices[last] = 0
+            self.sift_down(0)
+        return item
+
+    def update(self, item):
+        """ Restores the heap order after the score of `item` changed """
+        pos = self.indices[item]
+        if pos >= 0:
+            self.sift_up(pos)
+            self.sift_down(self.indices[item])
+
+    def rebuild(self, items):
+        for item in self.heap:
+            self.indices[item] = -1
+        self.heap = array('i', items)
+        for pos, item in enumerate(self.heap):
+            self.indices[item] = pos
+        for pos in reversed(range(len(self.heap) // 2)):
+            self.sift_down(pos)
+
+    def sift_up(self, pos):
+        heap, indices = self.heap, self.indices
+        item = heap[pos]
+        while pos > 0:
+            parent = (pos - 1) >> 1
+            if not self.before(item, heap[parent]):
+                break
+            heap[pos] = heap[parent]
+            indices[heap[pos]] = pos
+            pos = parent
+        heap[pos] = item
+        indices[item] = pos
+
+    def sift_down(self, pos):
+        heap, indices = self.heap, self.indices
+        item = heap[pos]
+        size = len(heap)
+        while True:
+            child = 2 * pos + 1
+            if child >= size:
+                break
+            if child + 1 < size and self.before(heap[child + 1], heap[child]):
+                child += 1
+            if not self.before(heap[child], item):
+                break
+            heap[pos] = heap[child]
+            indices[heap[pos]] = pos
+            pos = child
+        heap[pos] = item
+        indices[item] = pos
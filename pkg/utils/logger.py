@@ -37,8 +37,9 @@ def set_logger(level='DEBUG'):
     """
     log = logging.getLogger(__name__)
     log.setLevel(level)
-    handler = logging.StreamHandler(sys.stdout)
-    formatter = logging.Formatter('[%(funcName)s][%(levelname)s]: %(message)s')
-    handler.setFormatter(formatter)
-    log.addHandler(handler)
+    if not log.handlers:  # the logger is shared by all the modules
+        handler = logging.StreamHandler(sys.stdout)
+        formatter = logging.Formatter('[%(funcName)s][%(levelname)s]: %(message)s')
+        handler.setFormatter(formatter)
+        log.addHandler(handler)
     return log
\ No newline at end of file
@@ -0,0 +1,63 @@
+"""
+Profiling helpers: cProfile, and a sampling profiler writing flame graph stacks
+"""
+import cProfile
+import signal
+from collections import Counter
+
+
+class SamplingProfiler:
+    """
+    Samples the Python stack of the main thread every `interval` seconds of CPU
+    time (with SIGPROF, so Unix only), and counts the samples per stack. The
+    result is written in the collapsed stack format ("outer;inner count" lines)
+    read by flamegraph.pl, speedscope and inferno.
+    """
+
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.samples = Counter()
+
+    def sample(self, signum, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append('{} ({}:{})'.format(code.co_name, code.co_filename, code.co_firstlineno))
+            frame = frame.f_back
+        self.samples[';'.join(reversed(stack))] += 1
+
+    def __enter__(self):
+        self.previous = signal.signal(signal.SIGPROF, self.sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        return self
+
+    def __exit__(self, *exc):
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, self.previous)
+
+    def write(self, filename):
+        with open(filename, 'w') as f:
+            for stack, count in self.samples.most_common():
+                f.write('{} {}\n'.format(stack, count))
+
+
+def profile(function, filename, flamegraph=False, interval=0.001):
+    """
+    Calls `function` under a profiler, and writes the profile to `filename`.
+        :param function: function without arguments
+        :param filename: output file, cProfile stats (for pstats, snakeviz, ...)
+                         or collapsed stacks if `flamegraph`
+        :param flamegraph: whether to sample stacks instead of using cProfile,
+                           sampling has a lower overhead
+        :param interval: the sampling interval in seconds, for `flamegraph`
+        :returns: what `function` returns
+    """
+    if flamegraph:
+        with SamplingProfiler(interval) as sampler:
+            result = function()
+        sampler.write(filename)
+        return result
+    profiler = cProfile.Profile()
+    result = profiler.runcall(function)
+    profiler.dump_stats(filename)
+    return result
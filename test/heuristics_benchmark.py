@@ -1,54 +1,278 @@
+"""
+Benchmarks the heuristics on the test suites, in parallel processes.
+
+Every run (suite instance x heuristics) is a separate process, with a wall-clock
+limit and optionally a memory limit. Results are appended to a JSON lines file
+as runs finish, so an interrupted sweep resumes where it stopped when started
+again with the same results file. The README tables can be regenerated from it.
+
+    python3 -m test.heuristics_benchmark --jobs 8 --timeout 300 --readme README.md
+"""
+import argparse
+import csv
+import json
 import os
+import re
+import resource
+import time
+import multiprocessing
+from multiprocessing.connection import wait
 from pkg.pysat import solver, branch_heuristics as solvers
 
 solver.logger.setLevel('WARNING')
 
+directory = os.path.dirname(os.path.abspath(__file__))
+
+HEURISTICS = [
+    ('OrderedChoiceSolver', 'Ordered'),
+    ('RandomChoiceSolver', 'Random'),
+    ('FrequentVarsFirstSolver', '3-clause'),
+    ('DynamicLargestIndividualSumSolver', 'DLIS'),
+    ('VariableStateIndependentDecayingSumSolver', 'VSIDS'),
+]
+# (suite, number of instances, -1 for all), as in the README benchmark list
+SUITES = [('uf20-91', -1), ('uf50-218', 50), ('uf75-325', 10), ('uf150-645', 3)]
+README_SETS = ['uf20-91', 'uf50-218', 'uuf50-218', 'uf75-325', 'uf100-430',
+               'uf125-538', 'uf150-645']
+FIELDS = ['suite', 'instance', 'heuristics', 'status', 'sat', 'expected', 'correct',
+          'time', 'decisions', 'conflicts', 'propagations', 'peak_rss_mb']
+TABLES_START = '<!-- benchmark tables start -->'
+TABLES_END = '<!-- benchmark tables end -->'
+
 
-def test(test_suite, solver_name, count):
-    expected_count = 0
-    actual_sat_count = 0
-    actual_unsat_count = 0
+def expected_result(suite):
+    """ SATLIB uniform random 3-SAT suites are named uf (all SAT) or uuf (all UNSAT) """
+    if suite.startswith('uuf'):
+        return False
+    if suite.startswith('uf'):
+        return True
+    return None
 
-    time = 0
-    branches = 0
 
-    if os.path.abspath('.').endswith('test'):
-        directory = os.path.abspath(test_suite)
-    else:
-        directory = os.path.abspath(os.path.join('test', test_suite))
-    dirs = os.listdir(directory)
+def instances(suites):
+    """
+        :param suites: list of (suite, count)
+        :returns: list of (suite, instance file name)
+    """
+    runs = []
+    for suite, count in suites:
+        files = sorted(os.listdir(os.path.join(directory, suite)))
+        runs.extend((suite, f) for f in (files if count < 0 else files[:count]))
+    return runs
+
+
+def solve(conn, filename, heuristics, memory):
+    """ Runs one solver in a worker process, and sends its statistics on `conn` """
+    result = {}
     try:
-        dirs[:] = dirs[:count]
-    except IndexError:
-        pass
-    for file in dirs:
-        print(expected_count)
-        filename = os.path.abspath(os.path.join(directory, file))
-        solv = getattr(solvers, solver_name)(filename)
-        is_sat, t, answer = solv.run()
-        branches += solv.branching_count
-        time += t
-        if is_sat:
-            actual_sat_count += 1
-        else:
-            actual_unsat_count += 1
-        expected_count += 1
-
-    print(solver_name)
-    print('\tAverage time used: {:.3f} s'.format(time / expected_count))
-    print('\tAverage branch picked: {:.1f}'.format(branches / expected_count))
-
-
-def test_suite(suite, count):
-    print('------------------------')
-    print('Starting benchmarking with {} ...'.format(suite))
-    test(suite, 'OrderedChoiceSolver', count)
-    test(suite, 'RandomChoiceSolver', count)
-    test(suite, 'FrequentVarsFirstSolver', count)
-    test(suite, 'DynamicLargestIndividualSumSolver', count)
-
-
-test_suite('uf20-91', -1)
-test_suite('uf50-218', 50)
-test_suite('uf75-325', 10)
-test_suite('uf150-645', 3)
+        if memory:
+            limit = memory * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        s = getattr(solvers, heuristics)(filename)
+        start_time = time.time()
+        sat = s.solve()
+        result.update(status='ok', sat=sat, time=time.time() - start_time,
+                      decisions=s.branching_count, conflicts=s.conflict_count,
+                      propagations=s.propagation_count)
+    except MemoryError:
+        result.update(status='memout')
+    except Exception as e:
+        result.update(status='error: {!r}'.format(e))
+    result['peak_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    conn.send(result)
+    conn.close()
+
+
+def load_results(path):
+    """ Reads a JSON lines results file, skipping a truncated last line """
+    results = []
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                try:
+                    results.append(json.loads(line))
+                except ValueError:
+                    pass
+    return results
+
+
+def benchmark(runs, path, jobs, timeout, memory):
+    """
+    Solves the runs not in the results file yet, and appends their results to it
+        :param runs: list of (suite, instance, heuristics)
+        :param path: the JSON lines results file
+        :param jobs: number of parallel processes
+        :param timeout: wall-clock limit of each run, in seconds
+        :param memory: memory limit of each run, in MB, or None
+        :returns: the results of all the runs in the file
+    """
+    done = set((r['suite'], r['instance'], r['heuristics']) for r in load_results(path))
+    pending = [run for run in runs if run not in done]
+    print('{} runs, {} already done'.format(len(runs), len(runs) - len(pending)))
+    running = {}  # connection -> (run, process, deadline)
+    total, finished = len(pending), 0
+    with open(path, 'a') as out:
+        while pending or running:
+            while pending and len(running) < jobs:
+                run = pending.pop(0)
+                suite, instance, heuristics = run
+                receiver, sender = multiprocessing.Pipe(duplex=False)
+                process = multiprocessing.Process(
+                    target=solve, daemon=True,
+                    args=(sender, os.path.join(directory, suite, instance), heuristics, memory))
+                process.start()
+                sender.close()
+                running[receiver] = (run, process, time.time() + timeout)
+
+            now = time.time()
+            ready = wait(list(running), max(0, min(d for _, _, d in running.values()) - now))
+            now = time.time()
+            for conn in list(running):
+                run, process, deadline = running[conn]
+                if conn in ready:
+                    try:
+                        result = conn.recv()
+                    except EOFError:  # killed, e.g. by the kernel out of memory
+                        result = {'status': 'crash: exit code {}'.format(process.exitcode)}
+                elif now >= deadline:
+                    process.kill()
+                    result = {'status': 'timeout'}
+                else:
+                    continue
+                process.join()
+                conn.close()
+                del running[conn]
+
+                suite, instance, heuristics = run
+                result.update(suite=suite, instance=instance, heuristics=heuristics,
+                              expected=expected_result(suite))
+                result['correct'] = (None if result['status'] != 'ok' or result['expected'] is None
+                                     else result['sat'] == result['expected'])
+                out.write(json.dumps(result) + '\n')
+                out.flush()
+                finished += 1
+                print('[{}/{}] {}/{} {} {} {}'.format(
+                    finished, total, suite, instance, heuristics,
+                    result['status'], '{:.3f} s'.format(result['time']) if 'time' in result else ''))
+    return load_results(path)
+
+
+def write_csv(results, path):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def summary(results, field, fmt):
+    """
+    Makes a markdown table of the average of `field` per heuristics and suite, like
+    the README ones: columns are the README test set numbers. Averages are over
+    the finished runs, and the cells of suites with unfinished runs say so.
+    """
+    suites = [s for s in README_SETS if any(r['suite'] == s for r in results)]
+    suites += sorted(set(r['suite'] for r in results) - set(suites))
+    heuristics = [(h, name) for h, name in HEURISTICS if any(r['heuristics'] == h for r in results)]
+    columns = [str(README_SETS.index(s) + 1) if s in README_SETS else s for s in suites]
+    lines = ['| Heuristics\\Test sets | ' + ' | '.join(columns) + ' |',
+             '| :------------------: | ' + ' | '.join(':---:' for _ in columns) + ' |']
+    for h, name in heuristics:
+        cells = []
+        for suite in suites:
+            runs = [r for r in results if r['suite'] == suite and r['heuristics'] == h]
+            ok = [r[field] for r in runs if r['status'] == 'ok']
+            cell = fmt.format(sum(ok) / len(ok)) if ok else '-'
+            if len(ok) < len(runs):
+                cell += ' ({}/{} finished)'.format(len(ok), len(runs))
+            if any(r['correct'] is False for r in runs):
+                cell += ' (wrong answers)'
+            cells.append(cell if runs else '')
+        lines.append('| **{}** | '.format(name) + ' | '.join(cells) + ' |')
+    return '\n'.join(lines)
+
+
+def tables(results):
+    return '\n'.join([
+        '##### Average time used', '',
+        summary(results, 'time', '{:.3f}s'), '',
+        '##### Average branches taken', '',
+        summary(results, 'decisions', '{:.1f}')])
+
+
+def update_readme(path, text):
+    """ Replaces the benchmark tables of the README, between the table markers """
+    with open(path) as f:
+        readme = f.read()
+    pattern = re.compile(re.escape(TABLES_START) + '.*?' + re.escape(TABLES_END), re.S)
+    if not pattern.search(readme):
+        raise ValueError('{} has no benchmark table markers'.format(path))
+    readme = pattern.sub(lambda _: '\n'.join([TABLES_START, '', text, '', TABLES_END]), readme)
+    with open(path, 'w') as f:
+        f.write(readme)
+
+
+def parse_suite(text):
+    suite, _, count = text.partition(':')
+    return suite, int(count) if count else -1
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks the heuristics on the test suites.')
+    parser.add_argument(
+        '--suite',
+        action='append',
+        type=parse_suite,
+        metavar='SUITE[:COUNT]',
+        help='test suite directory to run, with the number of instances (default: all),'
+             ' may be repeated (default: ' +
+             ' '.join('{}:{}'.format(*s) for s in SUITES) + ')')
+    parser.add_argument(
+        '--heuristics',
+        nargs='+',
+        default=[h for h, _ in HEURISTICS],
+        choices=[h for h, _ in HEURISTICS],
+        help='heuristics to run (default: all)')
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=os.cpu_count(),
+        help='number of parallel runs (default: number of CPUs)')
+    parser.add_argument(
+        '--timeout',
+        type=float,
+        default=300,
+        help='wall-clock limit of a run, in seconds (default: 300)')
+    parser.add_argument(
+        '--memory',
+        type=int,
+        help='memory limit of a run, in MB (default: none)')
+    parser.add_argument(
+        '--results',
+        default='benchmark.jsonl',
+        help='JSON lines results file, the runs already in it are not run again'
+             ' (default: benchmark.jsonl)')
+    parser.add_argument(
+        '--fresh',
+        action='store_true',
+        help='discard the results file first, instead of resuming')
+    parser.add_argument(
+        '--csv',
+        help='also write the results to this CSV file')
+    parser.add_argument(
+        '--readme',
+        help='regenerate the benchmark tables of this README file')
+    args = parser.parse_args()
+
+    if args.fresh and os.path.exists(args.results):
+        os.remove(args.results)
+    runs = [(suite, instance, h)
+            for suite, instance in instances(args.suite or SUITES) for h in args.heuristics]
+    results = benchmark(runs, args.results, args.jobs, args.timeout, args.memory)
+    selected = set(runs)
+    results = [r for r in results if (r['suite'], r['instance'], r['heuristics']) in selected]
+    if args.csv:
+        write_csv(results, args.csv)
+    text = tables(results)
+    print(text)
+    if args.readme:
+        update_readme(args.readme, text)
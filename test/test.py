@@ -19,3 +19,8 @@ assert s4.compute_cnf() == 1
 s5 = solver.Solver('../test/test5.cnf')
 s5.run()
 assert s5.compute_cnf() == 1
+
+stats = s5.stats.as_dict()
+assert stats['decisions'] == s5.branching_count
+assert stats['conflicts'] == sum(stats['lbds'].values())
+assert all(t >= 0 for t in stats['times'].values())
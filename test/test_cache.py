@@ -0,0 +1,82 @@
+"""
+testing the result cache, and its keys
+"""
+import json
+import os
+import random
+import tempfile
+from pkg.pysat import solver, cache
+from pkg.pysat.branch_heuristics import VariableStateIndependentDecayingSumSolver
+from pkg.pysat.dimacs import read_dimacs
+solver.logger.setLevel('WARNING')
+
+directory = os.path.dirname(os.path.abspath(__file__))
+
+
+def shuffled(clauses, seed, rename=True):
+    """ The clauses in another order, with literals in another order, and renumbered variables """
+    rng = random.Random(seed)
+    variables = sorted(set(abs(lit) for clause in clauses for lit in clause))
+    names = dict(zip(variables, rng.sample(range(1, 2 * len(variables) + 1), len(variables))
+                     if rename else variables))
+    result = [[names[abs(lit)] * (1 if lit > 0 else -1) for lit in clause] for clause in clauses]
+    for clause in result:
+        rng.shuffle(clause)
+    rng.shuffle(result)
+    return result
+
+
+clauses = [list(clause) for clause in read_dimacs(os.path.join(directory, 'uf50-218', 'uf50-01.cnf'))[0]]
+keys = cache.fingerprint(clauses)
+assert cache.fingerprint(shuffled(clauses, 1, rename=False)) == keys
+assert cache.fingerprint(clauses + [clauses[0][::-1], [1, -1, 2]]).exact == keys.exact
+renamed = cache.fingerprint(shuffled(clauses, 2))
+assert renamed.exact != keys.exact and renamed.renamed == keys.renamed is not None
+assert cache.fingerprint(clauses[1:]).renamed != keys.renamed
+assert cache.fingerprint([[-lit for lit in clause] for clause in clauses]).renamed != keys.renamed
+# symmetric variables cannot be told apart, there is no renamed key
+assert cache.fingerprint([[1, 2], [-1, -2]]).renamed is None
+
+results = cache.ResultCache(tempfile.mkdtemp())
+
+
+def run(clauses):
+    s = VariableStateIndependentDecayingSumSolver.from_clauses(clauses, cache=results)
+    sat, _, answer = s.run()
+    if sat:
+        model = set(int(lit) for line in answer.splitlines() if line.startswith('v ') for lit in line.split()[1:])
+        assert all(any(lit in model for lit in clause) for clause in clauses)
+    return sat, s.cache_hit and s.cache_hit[0], answer
+
+
+assert run(clauses)[:2] == (True, None)
+assert run(shuffled(clauses, 3, rename=False))[:2] == (True, 'exact')
+sat, kind, answer = run(shuffled(clauses, 4))
+assert (sat, kind) == (True, 'renamed') and 'c Cache: hit (renamed key)' in answer
+# a hit does not assign the model, the solver can solve again, from its phases
+s = VariableStateIndependentDecayingSumSolver.from_clauses(clauses, cache=results)
+assert s.run()[0] and s.cache_hit and not s.trail
+assert s.solve([-3]) is not None and s.solve() and s.compute_cnf() == 1
+
+unsat = [list(clause) for clause in read_dimacs(os.path.join(directory, 'uuf50-218', 'uuf50-01.cnf'))[0]]
+assert run(unsat)[:2] == (False, None)
+assert run(shuffled(unsat, 5, rename=False))[:2] == (False, 'exact')
+assert run(shuffled(unsat, 6))[:2] == (False, 'renamed')
+
+# a damaged model is not used
+path = results.path(keys.exact)
+with open(path) as f:
+    entry = json.load(f)
+with open(path, 'w') as f:
+    json.dump(dict(entry, model=[-lit for lit in entry['model']]), f)
+os.remove(results.path(keys.renamed))
+assert run(clauses)[:2] == (True, None)
+assert run(clauses)[:2] == (True, 'exact')
+
+# the least recently used answers are evicted
+small = cache.ResultCache(tempfile.mkdtemp(), max_bytes=3 * os.path.getsize(path))
+for name in sorted(os.listdir(os.path.join(directory, 'uf20-91')))[:5]:
+    s = VariableStateIndependentDecayingSumSolver(os.path.join(directory, 'uf20-91', name), cache=small)
+    s.run()
+    assert sum(os.path.getsize(small.path(name[:-5])) for name in os.listdir(small.directory)) <= small.max_bytes
+assert 0 < len(os.listdir(small.directory)) < 10
@@ -0,0 +1,61 @@
+"""
+testing the cardinality encodings against brute force, and the native
+at-most-one constraints against their pairwise encoding
+"""
+import itertools
+import random
+from pkg.pysat import solver, branch_heuristics as solvers
+from pkg.pysat import cardinality
+from pkg.pysat.models import ModelEnumerator
+solver.logger.setLevel('WARNING')
+
+
+def models(clauses, variables):
+    """ The models of the clauses, projected on the variables """
+    s = solver.Solver.from_clauses(clauses + [[v, -v] for v in variables])
+    return set(tuple(model) for model in ModelEnumerator(s, variables))
+
+
+def assignments(variables):
+    for values in itertools.product([1, -1], repeat=len(variables)):
+        yield tuple(value * var for value, var in zip(values, variables))
+
+
+bounds = [
+    (cardinality.at_most_k, lambda count, k: count <= k),
+    (cardinality.at_least_k, lambda count, k: count >= k),
+    (cardinality.exactly_k, lambda count, k: count == k),
+]
+for n in range(1, 7):
+    variables = list(range(1, n + 1))
+    lits = [var if var % 3 else -var for var in variables]
+    for k in range(-1, n + 2):
+        for encoding in cardinality.ENCODINGS:
+            for encode, holds in bounds:
+                clauses = encode(lits, k, cardinality.VarPool(n), encoding)
+                expected = set(model for model in assignments(variables)
+                               if holds(sum(lit in model for lit in lits), k))
+                assert (models(clauses, variables) if [] not in clauses else set()) == expected, \
+                    (n, k, encoding, encode.__name__)
+
+# the encodings grow linearly, the pairwise one quadratically
+lits = list(range(1, 101))
+assert len(cardinality.at_most_one(lits, cardinality.VarPool(100), 'pairwise')) == 4950
+for encoding in ['seqcounter', 'commander', 'totalizer']:
+    assert len(cardinality.at_most_one(lits, cardinality.VarPool(100), encoding)) < 1000, encoding
+
+rng = random.Random(0)
+for _ in range(300):
+    n = rng.randint(3, 9)
+    variables = list(range(1, n + 1))
+    clauses = [[rng.choice([-1, 1]) * rng.randint(1, n) for _ in range(rng.randint(1, 3))]
+               for _ in range(rng.randint(0, 2 * n))]
+    groups = [[rng.choice([-1, 1]) * v for v in rng.sample(variables, rng.randint(2, n))]
+              for _ in range(rng.randint(1, 3))]
+    pairwise = clauses + [clause for group in groups
+                          for clause in cardinality.at_most_one(group, None, 'pairwise')]
+    s = solvers.VariableStateIndependentDecayingSumSolver.from_clauses(
+        clauses + [[v, -v] for v in variables])
+    for group in groups:
+        s.add_at_most_one(group)
+    assert set(tuple(model) for model in ModelEnumerator(s, blocking='clause')) == models(pairwise, variables)
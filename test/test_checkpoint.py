@@ -0,0 +1,83 @@
+"""
+testing the checkpoints of a search, and resuming from them
+"""
+import os
+import random
+import tempfile
+from pkg.pysat import solver, restarts
+from pkg.pysat.branch_heuristics import (VariableStateIndependentDecayingSumSolver,
+                                         FrequentVarsFirstSolver)
+from pkg.pysat.budget import Budget
+from pkg.pysat.checkpoint import Checkpoint
+from pkg.utils.exceptions import FileFormatError
+solver.logger.setLevel('WARNING')
+random.seed(0)  # the first phases are random
+
+directory = os.path.dirname(os.path.abspath(__file__))
+path = os.path.join(tempfile.mkdtemp(), 'search.ckpt')
+
+for folder, expected in [('uuf50-218', False), ('uf50-218', True)]:
+    for name in sorted(os.listdir(os.path.join(directory, folder)))[:5]:
+        filename = os.path.join(directory, folder, name)
+        first = VariableStateIndependentDecayingSumSolver(
+            filename, restart=restarts.GlucoseRestart(), budget=Budget(conflicts=20),
+            checkpoint=Checkpoint(path, interval=None))
+        sat = first.solve()
+        if sat is not None:
+            assert sat == expected
+            continue
+        first.checkpoint.save(first)
+        assert first.checkpoint.saved == 1 and os.listdir(os.path.dirname(path)) == ['search.ckpt']
+        second = VariableStateIndependentDecayingSumSolver(filename, restart=restarts.GlucoseRestart())
+        Checkpoint(path).load(second)
+        assert len(second.learnts) <= len(first.learnts) and second.stats.conflicts == 20
+        assert second.restart.total_count == first.restart.total_count
+        assert second.activity_inc == first.activity_inc
+        assert second.solve() == expected and second.stats.conflicts > 20
+        if expected:
+            assert all(second.compute_clause(clause) == 1 for clause in second.cnf)
+
+# the learnt clauses, phases and statistics survive the file
+filename = os.path.join(directory, 'uuf50-218', 'uuf50-01.cnf')
+s = VariableStateIndependentDecayingSumSolver(filename, budget=Budget(conflicts=20))
+assert s.solve() is None
+Checkpoint(path).save(s)
+t = VariableStateIndependentDecayingSumSolver(filename)
+Checkpoint(path).load(t)
+assert t.phases == s.phases and t.stats.decisions == s.stats.decisions
+assert t.stats.lbds == s.stats.lbds and t.stats.times == s.stats.times
+s.backtrack(0)
+assert t.trail == s.trail
+kept = [s.root_literals(s.arena[c]) for c in s.learnts]
+assert sorted(sorted(t.arena[c]) for c in t.learnts) == sorted(
+    sorted(lits) for lits in kept if lits is not None and len(lits) > 1)
+
+# other heuristics only get the clauses
+u = FrequentVarsFirstSolver(filename)
+Checkpoint(path).load(u)
+assert len(u.learnts) == len(t.learnts) and u.solve() is False
+
+# a checkpoint is only resumed for its formula
+for damage in ['other formula', 'truncated', 'not a checkpoint']:
+    if damage == 'truncated':
+        with open(path, 'rb') as f:
+            data = f.read()
+        with open(path, 'wb') as f:
+            f.write(data[:-10])
+        other = filename
+    elif damage == 'not a checkpoint':
+        with open(path, 'wb') as f:
+            f.write(b'p cnf 1 1\n1 0\n')
+    else:
+        other = os.path.join(directory, 'uuf50-218', 'uuf50-02.cnf')
+    try:
+        Checkpoint(path).load(VariableStateIndependentDecayingSumSolver(other))
+        assert False
+    except FileFormatError:
+        pass
+
+try:
+    VariableStateIndependentDecayingSumSolver(filename, simplify=['units'], checkpoint=Checkpoint(path))
+    assert False
+except ValueError:
+    pass
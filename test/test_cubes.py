@@ -0,0 +1,31 @@
+"""
+testing cube and conquer
+"""
+import json
+import os
+import tempfile
+from pkg.pysat import solver, cubes
+solver.logger.setLevel('WARNING')
+
+directory = os.path.dirname(os.path.abspath(__file__))
+
+filename = os.path.join(directory, 'uf75-325', 'uf75-01.cnf')
+splitter = cubes.Splitter(filename)
+found = splitter.cubes(8)
+assert 1 < len(found) <= 8
+assert len(set(map(tuple, found))) == len(found)
+jobs = [cubes.make_job(filename, cube) for cube in found]
+sat, answer, _ = cubes.conquer(splitter, jobs, processes=2)
+assert sat and 's SATISFIABLE' in answer
+
+# slow cubes are split again
+filename = os.path.join(directory, 'uuf50-218', 'uuf50-02.cnf')
+splitter = cubes.Splitter(filename)
+jobs = [cubes.make_job(filename, cube) for cube in splitter.cubes(2)]
+sat, _, solved = cubes.conquer(splitter, jobs, processes=2, time_limit=0.001)
+assert not sat
+
+# jobs go through JSON files
+names = cubes.write_jobs(jobs, tempfile.mkdtemp())
+result = cubes.solve_job(cubes.read_job(names[0]))
+assert json.loads(json.dumps(result))['sat'] is False
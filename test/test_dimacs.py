@@ -0,0 +1,64 @@
+"""
+testing the DIMACS reader
+"""
+import bz2
+import gzip
+import lzma
+import os
+import tempfile
+from array import array
+from pkg.pysat import solver
+from pkg.pysat.dimacs import CNFB_HEADER, cnfb_path, load_cnf, read_dimacs
+from pkg.utils.exceptions import FileFormatError
+solver.logger.setLevel('WARNING')
+
+directory = os.path.dirname(os.path.abspath(__file__))
+tmp = tempfile.mkdtemp()
+
+
+def write(name, content, opener=open):
+    filename = os.path.join(tmp, name)
+    with opener(filename, 'wb') as f:
+        f.write(content)
+    return filename
+
+
+clauses, literals = read_dimacs(os.path.join(directory, 'uf20-91', 'uf20-01.cnf'))
+assert len(clauses) == 91 and literals == set(range(1, 21))
+assert clauses[0] == (4, -18, 19)
+
+# clauses spanning several lines, sharing a line, duplicated, and comments in between
+cnf = b'c comment\np cnf 3 4\n1 -3\n 2 0 -1 2 0\nc another comment\n1 -3 0\n3 0\n'
+clauses, literals = read_dimacs(write('multi.cnf', cnf), chunk_size=7)
+assert list(clauses) == [(1, -3, 2), (-1, 2), (1, -3), (3,)], list(clauses)
+assert literals == {1, 2, 3}
+
+for name, opener in [('f.cnf.gz', gzip.open), ('f.cnf.bz2', bz2.open), ('f.cnf.xz', lzma.open)]:
+    assert list(read_dimacs(write(name, cnf, opener))[0]) == list(clauses)
+
+s = solver.Solver(write('sat.cnf.gz', cnf, gzip.open))
+assert s.solve() and s.compute_cnf() == 1
+
+# binary cache: written on the first load, then memory-mapped
+filename = write('cached.cnf', cnf)
+assert cnfb_path(filename).endswith('cached.cnfb')
+assert list(load_cnf(filename, binary_cache=True)[0]) == list(clauses)
+assert os.path.exists(cnfb_path(filename))
+cached, cached_literals = load_cnf(filename, binary_cache=True)
+assert list(cached) == list(clauses) and cached_literals == literals
+assert list(load_cnf(cnfb_path(filename))[0]) == list(clauses)
+# the clause offsets are 8-byte aligned in the file, after an odd number of variables too
+for content in [cnf, b'p cnf 2 2\n1 -2 0\n2 0\n']:
+    aligned = write('aligned.cnf', content)
+    cached, cached_literals = load_cnf(aligned, binary_cache=True)
+    with open(cnfb_path(aligned), 'rb') as f:
+        data = f.read()
+    pos = CNFB_HEADER.size + 4 * (len(cached_literals) + len(cached_literals) % 2)
+    assert pos % 8 == 0 and array('q', data[pos:pos + 8 * (len(cached) + 1)]) == array('q', cached.starts)
+
+for bad in [b'1 2 0\n', b'p cnf 2 1\n1 2\n', b'p cnf 2 1\n1 x 0\n', b'p cnf 2 2\n1 2 0\n']:
+    try:
+        read_dimacs(write('bad.cnf', bad))
+        assert False, bad
+    except FileFormatError:
+        pass
@@ -0,0 +1,48 @@
+"""
+testing the bulk evaluation against the solver's own evaluation
+"""
+import os
+import random
+from array import array
+import numpy as np
+from pkg.pysat import solver
+from pkg.pysat.dimacs import ClauseBuffer, read_dimacs
+from pkg.pysat.evaluate import Evaluator, assignments_from_models
+solver.logger.setLevel('WARNING')
+
+directory = os.path.dirname(os.path.abspath(__file__))
+
+rng = np.random.default_rng(0)
+for suite in ['uf20-91', 'uf50-218']:
+    for name in sorted(os.listdir(os.path.join(directory, suite)))[:5]:
+        filename = os.path.join(directory, suite, name)
+        clauses, variables = read_dimacs(filename)
+        s = solver.Solver(filename)
+        assert s.solve()
+        assignments = rng.integers(0, 2, (200, len(s.assigns)), dtype=np.int8)
+        assignments[0] = s.assigns
+        for chunk_size in [1, 5000, 1 << 25]:
+            evaluator = Evaluator.from_clauses(clauses, chunk_size=chunk_size)
+            counts = evaluator.violated_counts(assignments)
+            for row, count in zip(assignments, counts):
+                s.assigns = array('b', row.tolist())
+                assert count == sum(1 for clause in clauses if not s.compute_clause(clause))
+            assert counts[0] == 0 and list(evaluator.check(assignments)) == list(counts == 0)
+            assert (evaluator.satisfied(assignments).sum(axis=1) == len(clauses) - counts).all()
+
+# empty clauses are violated, variables missing from the models are FALSE
+clauses = ClauseBuffer()
+for clause in [[1, -2], [], [3], [-1, -3], []]:
+    clauses.append(clause)
+evaluator = Evaluator.from_clauses(clauses)
+models = assignments_from_models([[1, 2, 3], [-1], [3], []], 4)
+assert list(evaluator.violated_counts(models)) == [3, 3, 2, 3]
+assert list(Evaluator.from_clauses([[1, 2], [-1]]).violated_counts([[0, 1, 0], [0, 0, 1], [0, 0, 0]])) == [1, 0, 1]
+assert list(Evaluator.from_clauses([]).check(np.zeros((2, 1)))) == [True, True]
+
+# clauses of mixed sizes, evaluated one by one
+rng = random.Random(0)
+clauses = [[rng.choice([-1, 1]) * rng.randint(1, 30) for _ in range(rng.randint(0, 8))] for _ in range(500)]
+models = [[v * rng.choice([-1, 1]) for v in range(1, 31)] for _ in range(50)]
+counts = Evaluator.from_clauses(clauses, chunk_size=700).violated_counts(assignments_from_models(models))
+assert list(counts) == [sum(1 for clause in clauses if not set(clause) & set(model)) for model in models]
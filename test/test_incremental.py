@@ -0,0 +1,63 @@
+"""
+testing the incremental API: clauses in memory, added clauses and assumptions
+"""
+import os
+import random
+from pkg.pysat import solver, branch_heuristics as solvers
+from pkg.pysat.dimacs import read_dimacs
+solver.logger.setLevel('WARNING')
+
+directory = os.path.dirname(os.path.abspath(__file__))
+
+# a chain 1 -> 2 -> 3 -> 4
+s = solvers.VariableStateIndependentDecayingSumSolver.from_clauses([[-1, 2], [-2, 3], [-3, 4]])
+assert s.solve()
+assert s.solve([1]) and s.compute_value(4) == 1
+assert not s.solve([1, 5, -4])
+assert sorted(s.core) == [-4, 1]
+assert s.solve([-4])
+s.add_clause([-5, 1])
+assert not s.solve([5, -3])
+assert sorted(s.core) == [-3, 5]
+s.add_clause([-4])
+assert not s.solve([1]) and s.core == [1]
+s.add_clause([1])
+assert not s.solve() and s.core == []
+
+# enumerating the models of a formula, by blocking each of them
+clauses, _ = read_dimacs(os.path.join(directory, 'uf20-91', 'uf20-01.cnf'))
+s = solvers.DynamicLargestIndividualSumSolver.from_clauses(clauses)
+models = set()
+while s.solve() and len(models) < 20:
+    model = tuple(v if s.compute_value(v) == 1 else -v for v in s.var_order)
+    assert model not in models and s.compute_cnf() == 1
+    models.add(model)
+    s.add_clause([-lit for lit in model])
+assert len(models) > 1
+
+# budgets: UNKNOWN, then a retry with a bigger budget
+from pkg.pysat.budget import Budget
+budget = Budget(conflicts=10)
+random.seed(0)  # the first phases are random, some would solve it within the budget
+s = solvers.VariableStateIndependentDecayingSumSolver(
+    os.path.join(directory, 'uf75-325', 'uf75-01.cnf'), budget=budget)
+assert s.solve() is None and s.stop_reason == 'conflicts'
+assert 's UNKNOWN' in s.output_answer(None, 0)
+budget.conflicts = None
+assert s.solve() and s.compute_cnf() == 1
+s.interrupt()
+assert s.solve() is None and s.stop_reason == 'interrupted'
+s.clear_interrupt()
+assert s.solve()
+
+# the budget is also checked before the decisions, without conflicts, and the
+# time between the preprocessing stages
+s = solvers.VariableStateIndependentDecayingSumSolver.from_clauses(
+    [[2 * i - 1, 2 * i] for i in range(1, 51)], budget=Budget(propagations=10))
+assert s.solve() is None and s.stop_reason == 'propagations' and s.conflict_count == 0
+budget = Budget(seconds=0)
+s = solvers.VariableStateIndependentDecayingSumSolver(
+    os.path.join(directory, 'uf20-91', 'uf20-01.cnf'), simplify=['units', 'eliminate'], budget=budget)
+assert s.solve() is None and s.stop_reason == 'time' and s.simplifier.report == []
+budget.seconds = None
+assert s.solve() and s.compute_cnf() == 1
@@ -0,0 +1,46 @@
+"""
+testing the local search: models found on the satisfiable suites, counts kept
+up to date by the flips, and UNKNOWN on unsatisfiable formulas
+"""
+import os
+import numpy as np
+from pkg.pysat import solver, branch_heuristics as solvers
+from pkg.pysat.dimacs import read_dimacs
+from pkg.pysat.local_search import LocalSearch
+solver.logger.setLevel('WARNING')
+
+directory = os.path.dirname(os.path.abspath(__file__))
+
+for suite in ['uf20-91', 'uf50-218', 'uf100-430']:
+    for name in sorted(os.listdir(os.path.join(directory, suite)))[:10]:
+        filename = os.path.join(directory, suite, name)
+        clauses, _ = read_dimacs(filename)
+        for algorithm in ['probsat', 'walksat']:
+            walker = LocalSearch(filename, algorithm, seed=0)
+            assert walker.solve(max_flips=100000), filename
+            assert all(any(walker.model[abs(lit)] == (lit > 0) for lit in clause) for clause in clauses)
+
+# after flips and restarts, the counts are those of the assignments
+for algorithm in ['probsat', 'walksat']:
+    walker = LocalSearch(os.path.join(directory, 'uuf50-218', 'uuf50-01.cnf'), algorithm,
+                         walks=8, restart_flips=37, seed=0)
+    assert walker.solve(max_flips=500) is None and walker.stop_reason == 'flips'
+    assert walker.restarts > 0 and walker.best_unsat > 0
+    true = (walker.assign[:, walker.clause_vars] == walker.clause_signs) & walker.clause_mask
+    assert (true.sum(axis=2) == walker.true_counts).all()
+    breaks = np.zeros_like(walker.breaks)
+    for walk, clause in zip(*np.nonzero(walker.true_counts == 1)):
+        breaks[walk, walker.true_xor[walk, clause]] += 1
+    assert (breaks == walker.breaks).all()
+
+assert LocalSearch.from_clauses([[1, -1], [2], [-2, 3]]).solve()
+assert LocalSearch.from_clauses([[1], []]).solve() is False
+walker = LocalSearch.from_clauses([[1], [-1]])
+assert walker.solve(stall=100) is None and walker.stop_reason == 'stalled'
+
+# hybrid: the best assignment seeds the phases of CDCL
+walker = LocalSearch(os.path.join(directory, 'uf50-218', 'uf50-01.cnf'), seed=0)
+assert walker.solve()
+s = solvers.VariableStateIndependentDecayingSumSolver(os.path.join(directory, 'uf50-218', 'uf50-01.cnf'))
+walker.seed_phases(s)
+assert s.solve() and s.conflict_count == 0  # the decisions follow the model
@@ -0,0 +1,63 @@
+"""
+testing the enumeration of all the models, with both blockings and a projection
+"""
+import itertools
+import os
+import random
+from pkg.pysat import solver, branch_heuristics as solvers
+from pkg.pysat.dimacs import read_dimacs
+from pkg.pysat.models import ModelEnumerator
+solver.logger.setLevel('WARNING')
+
+directory = os.path.dirname(os.path.abspath(__file__))
+
+# the Einstein puzzle has a single solution
+models = ModelEnumerator(solver.Solver(os.path.join(directory, '..', 'einstein', 'einstein.cnf')))
+assert len(list(models)) == 1 and models.complete
+
+# (1 or 2) has 3 models, or 2 on the variable 1
+models = ModelEnumerator(solvers.OrderedChoiceSolver.from_clauses([[1, 2]]))
+assert sorted(map(sorted, models)) == [[-2, 1], [-1, 2], [1, 2]]
+for blocking in ['decisions', 'clause']:
+    models = ModelEnumerator(solvers.OrderedChoiceSolver.from_clauses([[1, 2]]), [1], blocking)
+    assert sorted(models) == [[-1], [1]]
+assert list(ModelEnumerator(solver.Solver.from_clauses([[1], [-1]]))) == []
+
+for name in sorted(os.listdir(os.path.join(directory, 'uf20-91')))[:10]:
+    clauses, _ = read_dimacs(os.path.join(directory, 'uf20-91', name))
+    found = {}
+    for blocking in ['decisions', 'clause']:
+        models = ModelEnumerator(solvers.VariableStateIndependentDecayingSumSolver.from_clauses(clauses),
+                                 blocking=blocking)
+        found[blocking] = [tuple(model) for model in models]
+        assert models.complete and len(found[blocking]) == len(set(found[blocking]))
+        for model in found[blocking]:
+            assert all(any(lit in model for lit in clause) for clause in clauses)
+    assert set(found['decisions']) == set(found['clause']), name
+
+    # projected on the first 5 variables: the projections of all the models
+    projection = list(range(1, 6))
+    models = ModelEnumerator(solvers.DynamicLargestIndividualSumSolver.from_clauses(clauses), projection)
+    projected = [tuple(model) for model in models]
+    assert sorted(projected) == sorted({model[:5] for model in found['clause']}), name
+
+# the decisions blocking adds no clause, and finds the (projected) models of random formulas
+random.seed(0)
+for _ in range(50):
+    n = random.randint(3, 9)
+    clauses = [[var * random.choice([1, -1]) for var in random.sample(range(1, n + 1), 3)]
+               for _ in range(random.randint(1, 3 * n))]
+    projection = sorted(random.sample(range(1, n + 1), random.randint(1, n)))
+    expected = set(tuple(var if bits[var - 1] else -var for var in projection)
+                   for bits in itertools.product([0, 1], repeat=n)
+                   if all(any(bits[abs(lit) - 1] == (lit > 0) for lit in clause) for clause in clauses))
+    s = solvers.VariableStateIndependentDecayingSumSolver.from_clauses(
+        clauses + [[var, -var] for var in range(1, n + 1)])
+    size = len(s.cnf)
+    models = ModelEnumerator(s, projection)
+    projected = [tuple(model) for model in models]
+    assert models.complete and sorted(projected) == sorted(expected) and len(s.cnf) == size
+
+models = ModelEnumerator(solvers.FrequentVarsFirstSolver(os.path.join(directory, 'uf20-91', 'uf20-01.cnf')),
+                         max_models=3)
+assert len(list(models)) == 3 and not models.complete
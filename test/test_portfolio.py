@@ -0,0 +1,26 @@
+"""
+testing the portfolio race
+"""
+import os
+from pkg.pysat import solver, portfolio
+solver.logger.setLevel('WARNING')
+
+directory = os.path.dirname(os.path.abspath(__file__))
+
+configs = portfolio.configurations(20)
+assert len(set((c.heuristics, c.restart) for c in configs)) == 20
+
+config, sat, _, answer = portfolio.race(
+    os.path.join(directory, 'uf50-218', 'uf50-01.cnf'), configs[:4], jobs=2)
+assert sat and config in configs[:4]
+assert 's SATISFIABLE' in answer
+
+_, sat, _, _ = portfolio.race(
+    os.path.join(directory, 'uuf50-218', 'uuf50-01.cnf'), configs[:3], simplify=['units'])
+assert not sat
+
+try:
+    portfolio.race(os.path.join(directory, 'missing.cnf'), configs[:2])
+    assert False
+except FileNotFoundError:
+    pass
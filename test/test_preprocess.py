@@ -0,0 +1,25 @@
+"""
+testing the simplification before search
+"""
+import os
+from pkg.pysat import solver, branch_heuristics as solvers
+from pkg.pysat.preprocess import STAGES
+solver.logger.setLevel('WARNING')
+
+directory = os.path.dirname(os.path.abspath(__file__))
+
+# the eliminated variables must still get values satisfying the original formula
+for stages in [STAGES] + [[stage] for stage in STAGES]:
+    for name in ['uf20-91/uf20-01.cnf', 'uf50-218/uf50-01.cnf', '../einstein/einstein.cnf']:
+        s = solvers.VariableStateIndependentDecayingSumSolver(
+            os.path.join(directory, name), simplify=stages)
+        assert s.solve(), (name, stages)
+        assert s.compute_cnf() == 1, (name, stages)
+
+    s = solver.Solver(os.path.join(directory, 'uuf50-218', 'uuf50-01.cnf'), simplify=stages)
+    assert not s.solve(), stages
+
+s = solver.Solver(os.path.join(directory, '..', 'einstein', 'einstein.cnf'), simplify=STAGES)
+s.solve()
+assert [stage for stage, _, _, _ in s.simplifier.report] == STAGES
+assert sum(removed for _, _, removed, _ in s.simplifier.report) > 0
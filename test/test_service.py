@@ -0,0 +1,79 @@
+"""
+testing the service: warm workers, jobs from a stream and from a Unix socket
+"""
+import io
+import json
+import os
+import random
+import socket
+import tempfile
+import threading
+from pkg.pysat import solver, service
+solver.logger.setLevel('WARNING')
+
+directory = os.path.dirname(os.path.abspath(__file__))
+uf20 = os.path.join(directory, 'uf20-91')
+
+jobs = [{'id': i, 'file': os.path.join(uf20, name), 'heuristics': 'VariableStateIndependentDecayingSumSolver'}
+        for i, name in enumerate(sorted(os.listdir(uf20))[:20])]
+jobs.append({'id': 'text', 'cnf': 'p cnf 2 2\n1 2 0\n-1 0\n', 'restart': 'luby'})
+jobs.append({'id': 'unsat', 'cnf': 'p cnf 1 2\n1 0\n-1 0\n'})
+jobs.append({'id': 'assumed', 'cnf': 'p cnf 2 1\n1 2 0\n', 'assumptions': [-1, -2]})
+jobs.append({'id': 'budget', 'file': os.path.join(directory, 'uuf50-218', 'uuf50-01.cnf'),
+             'budget': {'conflicts': 5}})
+jobs.append({'id': 'missing', 'file': os.path.join(directory, 'missing.cnf')})
+
+pool = service.WorkerPool(2)
+
+output = io.StringIO()
+service.Stream(pool, output).serve([json.dumps(job) + '\n' for job in jobs] + ['\n', '[1]\n'])
+results = [json.loads(line) for line in output.getvalue().splitlines()]
+assert len(results) == len(jobs) + 1
+by_id = dict((result['id'], result) for result in results if 'id' in result)
+assert all(by_id[i]['sat'] and 's SATISFIABLE' in by_id[i]['answer'] for i in range(20))
+assert by_id['text']['sat'] and 'v -1 2' in by_id['text']['answer']
+assert by_id['unsat']['sat'] is False and by_id['assumed']['sat'] is False
+assert by_id['budget']['sat'] is None and 'c Stopped: conflicts' in by_id['budget']['answer']
+assert by_id['missing']['error'].startswith('FileNotFoundError')
+assert any(result.get('error', '').startswith('invalid job') for result in results)
+# the learnt memory budget is in MB, as --max-learnt-memory
+random.seed(0)
+uf75 = os.path.join(directory, 'uf75-325', 'uf75-01.cnf')
+assert service.solve_request({'file': uf75, 'budget': {'learnt_memory': 1}})['sat']
+stopped = service.solve_request({'file': uf75, 'budget': {'learnt_memory': 1e-4}})
+assert stopped['sat'] is None and 'c Stopped: learnt memory' in stopped['answer']
+
+path = os.path.join(tempfile.mkdtemp(), 'pysat.sock')
+server = threading.Thread(target=service.serve_socket, args=(pool, path), daemon=True)
+server.start()
+while not os.path.exists(path):
+    server.join(0.01)
+# 2 clients pipelining their jobs on their own connection
+results = {}
+clients = [threading.Thread(target=lambda k: results.update({k: list(service.submit_all(path, jobs[:20]))}),
+                            args=(k,)) for k in range(2)]
+for client in clients:
+    client.start()
+for client in clients:
+    client.join()
+for k in range(2):
+    assert sorted(result['id'] for result in results[k]) == list(range(20))
+    assert all(result['sat'] for result in results[k])
+
+# a client gone before reading its results, and a client not reading its long
+# results, do not stop the results of the others
+gone = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+gone.connect(path)
+gone.sendall(''.join(json.dumps(job) + '\n' for job in jobs[:20]).encode())
+gone.close()
+wide = {'cnf': 'p cnf 3000 1\n{} 0\n'.format(' '.join(map(str, range(1, 3001))))}
+stalled = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+stalled.connect(path)
+stalled.sendall(''.join(json.dumps(dict(wide, id=i)) + '\n' for i in range(16)).encode())
+results = list(service.submit_all(path, jobs[:20]))
+assert sorted(result['id'] for result in results) == list(range(20))
+stalled.close()
+results = list(service.submit_all(path, jobs[:5]))
+assert sorted(result['id'] for result in results) == list(range(5))
+
+pool.close()
@@ -0,0 +1,72 @@
+"""
+testing the clause sharing between parallel workers
+"""
+import os
+import random
+from pkg.pysat import solver, portfolio, restarts, sharing
+from pkg.pysat.branch_heuristics import VariableStateIndependentDecayingSumSolver
+solver.logger.setLevel('WARNING')
+
+directory = os.path.dirname(os.path.abspath(__file__))
+
+# the ring wraps around, and a reader lapped by the writer loses the clauses in between
+ring = sharing.ClauseRing(capacity=20)
+clauses = [(1, 2), (-3, 4, 5), (-1, -6)]
+for lits in clauses:
+    ring.write(lits, 2, sharing.checksum(lits))
+position, read = ring.read(0)
+assert [lits for lits, _, _ in read] == clauses and position == ring.head == 16
+ring.write((7, 8, 9), 3, sharing.checksum((7, 8, 9)))
+position, read = ring.read(position)
+assert read == [((7, 8, 9), 3, sharing.checksum((7, 8, 9)))]
+for lits in clauses * 3:
+    ring.write(lits, 2, sharing.checksum(lits))
+assert ring.read(position) == (ring.head, [])
+position, read = ring.read(ring.head - 5)
+assert read == [((-1, -6), 2, sharing.checksum((-1, -6)))]
+ring.ints[ring.head % ring.capacity - 1] = 5  # a torn clause is dropped
+assert ring.read(ring.head - 5)[1] == []
+ring.close()
+ring.memory.unlink()
+
+# a worker imports the clauses of another at level 0, and solves with fewer
+# conflicts, from the same random first phases
+exchange = sharing.ClauseExchange(2)
+try:
+    filename = os.path.join(directory, 'uuf50-218', 'uuf50-01.cnf')
+    random.seed(0)
+    first = VariableStateIndependentDecayingSumSolver(
+        filename, restart=restarts.LubyRestart(), sharing=exchange.worker(0))
+    assert first.solve() is False and first.stats.exported > 0
+    random.seed(0)
+    second = VariableStateIndependentDecayingSumSolver(
+        filename, restart=restarts.LubyRestart(), sharing=exchange.worker(1))
+    assert second.solve() is False
+    assert second.stats.imported > 0 and second.stats.useful_imports > 0
+    assert second.stats.conflicts < first.stats.conflicts
+    assert exchange.totals()['imported'] == second.stats.imported
+    # the clauses exported are short, with a small LBD, and exported once
+    assert first.stats.exported == len(first.sharing.known) == len(exchange.worker(1).receive())
+    assert all(len(lits) <= sharing.MAX_SIZE and lbd <= sharing.MAX_LBD
+               for lits, lbd in exchange.worker(1).receive())
+finally:
+    exchange.close()
+
+exchange = sharing.ClauseExchange(1)
+try:
+    VariableStateIndependentDecayingSumSolver(filename, simplify=['units'], sharing=exchange.worker(0))
+    assert False
+except ValueError:
+    pass
+finally:
+    exchange.close()
+
+# the portfolio workers share their clauses
+for name in ['uuf50-01.cnf', 'uuf50-02.cnf']:
+    exchange = sharing.ClauseExchange(3)
+    try:
+        _, sat, _, _ = portfolio.race(os.path.join(directory, 'uuf50-218', name),
+                                      portfolio.configurations(3), jobs=3, exchange=exchange)
+        assert sat is False and exchange.totals()['exported'] > 0
+    finally:
+        exchange.close()
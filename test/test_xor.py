@@ -0,0 +1,148 @@
+"""
+testing the XOR clauses: their parsing, their detection in CNF, and their
+propagation by Gaussian elimination
+"""
+import itertools
+import os
+import random
+import tempfile
+from array import array
+from pkg.pysat import solver
+from pkg.pysat.branch_heuristics import OrderedChoiceSolver, VariableStateIndependentDecayingSumSolver
+from pkg.pysat.checkpoint import fingerprint
+from pkg.pysat.dimacs import cnfb_path, load_cnf, read_dimacs, xor_constraint
+from pkg.pysat.local_search import LocalSearch
+from pkg.pysat.xor import GaussMatrix, bit_counts, detect_xors, table_bit_counts
+from pkg.utils.constants import TRUE, FALSE, UNASSIGN
+from pkg.utils.exceptions import FileFormatError
+solver.logger.setLevel('WARNING')
+
+tmp = tempfile.mkdtemp()
+
+
+def write(name, content):
+    filename = os.path.join(tmp, name)
+    with open(filename, 'wb') as f:
+        f.write(content)
+    return filename
+
+
+def encode(variables, parity):
+    """ The CNF encoding of an XOR: a clause per assignment of the wrong parity """
+    return [[-var if sign else var for var, sign in zip(variables, signs)]
+            for signs in itertools.product([0, 1], repeat=len(variables))
+            if sum(signs) % 2 != parity]
+
+
+def satisfiable(n, clauses, xors):
+    return any(all(any(bits[abs(lit) - 1] == (lit > 0) for lit in clause) for clause in clauses)
+               and all(sum(bits[var - 1] for var in variables) % 2 == parity for variables, parity in xors)
+               for bits in itertools.product([0, 1], repeat=n))
+
+
+# a negative literal flips the parity, a variable twice cancels out
+assert xor_constraint([1, 2, 3]) == ((1, 2, 3), 1)
+assert xor_constraint([3, -1, 2]) == ((1, 2, 3), 0)
+assert xor_constraint([1, 2, -2, 4]) == ((1, 4), 0)
+
+# x lines count as clauses of the header, their variables as variables
+cnf = write('xor.cnf', b'c parity\np cnf 4 3\n1 2 0\nx1 -2 3 0\n x 2 4 4 3 0\n')
+clauses, variables = read_dimacs(cnf)
+assert list(clauses) == [(1, 2)] and variables == {1, 2, 3, 4}
+assert clauses.xors == [((1, 2, 3), 0), ((2, 3), 1)]
+for content in [b'p cnf 3 1\nx1 2 3\n', b'p cnf 3 1\nx1 a 3 0\n', b'p cnf 3 2\nx1 2 0 3 0\n']:
+    try:
+        read_dimacs(write('bad.cnf', content))
+        assert False
+    except FileFormatError:
+        pass
+# no binary cache for them, which would lose the XOR clauses
+clauses, _ = load_cnf(cnf, binary_cache=True)
+assert clauses.xors and not os.path.exists(cnfb_path(cnf))
+assert fingerprint(clauses) != fingerprint(read_dimacs(write('plain.cnf', b'p cnf 2 1\n1 2 0\n'))[0])
+try:
+    LocalSearch(cnf)
+    assert False
+except ValueError:
+    pass
+
+# detection: all the sign patterns of one parity are needed
+xor = encode((1, 2, 3), 1) + encode((2, 4, 5, 6), 0)
+assert sorted(detect_xors(xor)) == [((1, 2, 3), 1), ((2, 4, 5, 6), 0)]
+assert detect_xors(xor[1:]) == [((2, 4, 5, 6), 0)]
+assert detect_xors([[-lit for lit in clause] for clause in encode((1, 2, 3), 1)]) == [((1, 2, 3), 0)]
+assert detect_xors(read_dimacs(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                            'uf50-218', 'uf50-01.cnf'))[0]) == []
+
+# 1 xor 2 xor 3 = 1 and 2 xor 3 = 1 imply 1 = 0, the reason being the sum of the rows
+matrix = GaussMatrix([((1, 2, 3), 1), ((2, 3), 1)])
+assigns = array('b', [UNASSIGN] * 5)
+conflict, implied = matrix.propagate(assigns)
+assert conflict is None and implied == [(-1, [-1])]
+assigns[1], assigns[2] = FALSE, TRUE
+conflict, implied = matrix.propagate(assigns)
+assert conflict is None and implied == [(-3, [-3, -2])]
+assigns[3] = TRUE
+conflict, implied = matrix.propagate(assigns)
+assert implied == [] and sorted(conflict) == [-3, -2]
+# the bit counts of the rows, also without np.bitwise_count (before NumPy 2.0)
+assert bit_counts(matrix.rows).tolist() == table_bit_counts(matrix.rows).tolist() == [
+    sum(bin(int(word)).count('1') for word in row) for row in matrix.rows]
+# the pivots move off the assigned variables, with the same constraints
+assert all(matrix.pivots[row] < 0 or assigns[matrix.columns[matrix.pivots[row]]] != UNASSIGN
+           for row in range(len(matrix)))
+
+# the answers of random formulas, with XOR clauses and encoded XORs
+random.seed(0)
+for _ in range(150):
+    n = random.randint(3, 9)
+    xors = [xor_constraint([var * random.choice([1, -1]) for var in
+                            random.sample(range(1, n + 1), random.randint(2, min(5, n)))])
+            for _ in range(random.randint(1, n))]
+    clauses = [[var * random.choice([1, -1]) for var in random.sample(range(1, n + 1), 3)]
+               for _ in range(random.randint(0, 2 * n))]
+    expected = satisfiable(n, clauses, xors)
+    tautologies = [[var, -var] for var in range(1, n + 1)]  # for the variables
+    s = VariableStateIndependentDecayingSumSolver.from_clauses(clauses + tautologies)
+    for variables, parity in xors:
+        s.add_xor(list(variables[:-1]) + [variables[-1] if parity else -variables[-1]])
+    assert s.solve() == expected
+    if expected:
+        assert all(sum(s.assigns[var] == TRUE for var in variables) % 2 == parity
+                   for variables, parity in xors)
+        assert all(any(s.compute_value(lit) == TRUE for lit in clause) for clause in clauses)
+    encoded = clauses + [clause for variables, parity in xors for clause in encode(variables, parity)]
+    s = OrderedChoiceSolver.from_clauses(encoded, find_xors=True)
+    assert s.solve() == expected and bool(s.xors) == any(len(v) > 2 for v, _ in xors)
+
+# after a conflict, the backjump may give the variables of the XORs the same
+# values again, and the XORs must be checked again
+clauses = [[-1, 20], [-1, 21], [-1, 22], [1, 20], [1, 21], [1, 22]]
+for heuristics in (OrderedChoiceSolver, VariableStateIndependentDecayingSumSolver):
+    s = heuristics.from_clauses(clauses)
+    s.add_xor([-20, 21, 22])
+    assert s.solve() is False
+s = VariableStateIndependentDecayingSumSolver(write('backjump.cnf', b'p cnf 4 7\n-1 20 0\n-1 21 0\n-1 22 0\n'
+                                                                   b'1 20 0\n1 21 0\n1 22 0\nx-20 21 22 0\n'))
+assert s.solve() is False
+
+# a file with XOR clauses, solved through its x lines
+s = VariableStateIndependentDecayingSumSolver(cnf)
+assert s.solve() and s.stats.xor_implications > 0
+assert s.compute_value(1) == TRUE or s.compute_value(2) == TRUE
+assert (s.assigns[1] + s.assigns[2] + s.assigns[3]) % 2 == 0 and (s.assigns[2] + s.assigns[3]) % 2 == 1
+try:
+    VariableStateIndependentDecayingSumSolver(cnf, simplify=['units'])
+    assert False
+except ValueError:
+    pass
+
+# a random system of XORs of 4 variables, in CNF: hard for clauses alone, while
+# elimination finds it UNSAT at level 0
+random.seed(5)
+parities = [encode(sorted(random.sample(range(1, 101), 4)), random.randint(0, 1)) for _ in range(100)]
+s = VariableStateIndependentDecayingSumSolver.from_clauses((clause for xor in parities for clause in xor),
+                                                          find_xors=True)
+assert s.solve() is False and s.conflict_count == 0 and s.stats.xor_conflicts == 1
+# detection is off by default
+assert not VariableStateIndependentDecayingSumSolver.from_clauses(parities[0]).find_xors